@@ -0,0 +1,146 @@
+"""
+네트워크 없는 end-to-end 벤치마크.
+lib.fake_broker.FakeBroker 를 기록된 봉으로 진행시키면서 실제 루프 코드(PortfolioRunner.tick)를 돌리고
+  - 틱 지연 (가격 / 잔고 / 주문 조회 + 엔진 처리)
+  - 판단 지연 (StrategyEngine.handle 1회, 엔진이 내는 주문 호출 포함, p50 / p99)
+  - 초당 주문 수 (지정가 매수 + 취소)
+를 출력한다. --max-* 기준을 넘으면 종료 코드 1 (CI 회귀 검사용).
+
+    python -m bench.bench_broker TSLL_1min.csv --latency 0.002 --error-rate 0.01
+"""
+import argparse
+import logging
+import sys
+import time
+from datetime import timedelta
+
+import numpy as np
+
+from lib.ohlcv import load_yf_csv, day_bounds, bar_interval
+from lib.fake_broker import FakeBroker, FillModel
+from lib.portfolio import PortfolioRunner
+from lib.balance_cache import BalanceCache
+from lib.strategy import BrokerGateway, StrategyParams
+
+def percentiles(samples):
+    if not samples:
+        return {"n": 0, "p50": 0.0, "p99": 0.0, "max": 0.0}
+    values = np.asarray(samples)
+    return {"n": len(values), "p50": float(np.percentile(values, 50)), "p99": float(np.percentile(values, 99)),
+            "max": float(values.max())}
+
+def session_closes(bars_list):
+    """타임라인 시각 → 그날 마감 시각 (마지막 봉 + 봉 간격)"""
+    closes = []
+    for bars in bars_list:
+        starts, ends = day_bounds(bars.ts)
+        step = bar_interval(bars.ts, starts, ends)
+        closes.append(bars.ts[ends - 1] + step)
+    return np.unique(np.concatenate(closes))
+
+def run_loop(broker, symbols, params, closes):
+    """봉마다 PortfolioRunner.tick 한 번. :return: (틱 지연 목록, 판단 지연 목록) 초 단위"""
+    runner = PortfolioRunner(broker, symbols, params=params, balance=BalanceCache(broker, ttl=0))
+    decisions = []
+    for engine in runner.engines.values():
+        handle = engine.handle
+
+        def timed(event, handle=handle):
+            started = time.perf_counter()
+            handle(event)
+            decisions.append(time.perf_counter() - started)
+        engine.handle = timed
+
+    ticks = []
+    day = None
+    while True:
+        now = broker.now
+        close = closes[np.searchsorted(closes, now, side="right")]
+        if now // 86_400_000_000_000 != day:
+            if day is not None:
+                runner.close_day()
+            runner.open_day()
+            day = now // 86_400_000_000_000
+        started = time.perf_counter()
+        try:
+            runner.tick(timedelta(seconds=(close - now) / 1e9))
+        except ConnectionError:
+            pass
+        ticks.append(time.perf_counter() - started)
+        if runner.done or not broker.advance():
+            break
+    runner.close_day()
+    return ticks, decisions
+
+def run_orders(broker, symbol, count):
+    """지정가 매수 + 취소를 count 번. :return: 초당 주문 수 (매수와 취소를 각각 1건으로 셈)"""
+    gateway = BrokerGateway(broker)
+    price = broker.last(symbol) * 0.5
+    started = time.perf_counter()
+    done = 0
+    for _ in range(count):
+        try:
+            order_no = gateway.buy_limit(symbol, price, 1)
+            gateway.cancel(order_no)
+            done += 2
+        except Exception:
+            pass
+    return done / (time.perf_counter() - started)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="yfinance 포맷 CSV 파일")
+    parser.add_argument("--splits", type=int, default=40)
+    parser.add_argument("--cash", type=float, default=None, help="시작 예수금 (기본: 종목별 예산 합의 2배)")
+    parser.add_argument("--latency", type=float, default=0.0, help="호출당 지연 (초)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="호출당 추가 무작위 지연 최대값 (초)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="ConnectionError 확률")
+    parser.add_argument("--reject-rate", type=float, default=0.0, help="EGW00201 응답 확률")
+    parser.add_argument("--slippage", type=float, default=0.0, help="시장가 매도 슬리피지 배수")
+    parser.add_argument("--orders", type=int, default=2000, help="주문 처리량 측정 횟수")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-tick-p99-ms", type=float, default=None, help="틱 지연 p99 상한 (ms)")
+    parser.add_argument("--max-decision-p99-us", type=float, default=None, help="판단 지연 p99 상한 (us)")
+    parser.add_argument("--min-orders-per-sec", type=float, default=None, help="초당 주문 수 하한")
+    args = parser.parse_args(argv)
+    logging.disable(logging.ERROR)   # 주입한 오류의 traceback 은 출력하지 않음
+
+    bars_list = [b for b in (load_yf_csv(path) for path in args.files) if len(b)]
+    symbols = [b.symbol for b in bars_list]
+    # 모든 종목의 데이터가 있는 시점부터 시작
+    start = max(int(b.ts[0]) for b in bars_list)
+    cash = args.cash or sum(2 * args.splits * 2 * float(b.close.max()) for b in bars_list)
+
+    def make_broker():
+        return FakeBroker(bars_list, cash=cash, fill_model=FillModel(slippage=args.slippage), latency=args.latency,
+                          jitter=args.jitter, error_rate=args.error_rate, reject_rate=args.reject_rate,
+                          seed=args.seed, start=start)
+
+    broker = make_broker()
+    started = time.perf_counter()
+    ticks, decisions = run_loop(broker, symbols, StrategyParams(split_no=args.splits), session_closes(bars_list))
+    elapsed = time.perf_counter() - started
+    orders_per_sec = run_orders(make_broker(), symbols[0], args.orders)
+
+    tick = percentiles(ticks)
+    decision = percentiles(decisions)
+    print(f"symbols: {','.join(symbols)}  ticks: {tick['n']}  elapsed: {elapsed:.2f}s  broker: {broker.stats}")
+    print(f"tick latency      p50 {tick['p50'] * 1e3:8.3f}ms  p99 {tick['p99'] * 1e3:8.3f}ms  "
+          f"max {tick['max'] * 1e3:8.3f}ms")
+    print(f"decision latency  p50 {decision['p50'] * 1e6:8.1f}us  p99 {decision['p99'] * 1e6:8.1f}us  "
+          f"max {decision['max'] * 1e6:8.1f}us  (n={decision['n']})")
+    print(f"orders/sec        {orders_per_sec:,.0f}")
+
+    failed = []
+    if args.max_tick_p99_ms is not None and tick["p99"] * 1e3 > args.max_tick_p99_ms:
+        failed.append("tick p99")
+    if args.max_decision_p99_us is not None and decision["p99"] * 1e6 > args.max_decision_p99_us:
+        failed.append("decision p99")
+    if args.min_orders_per_sec is not None and orders_per_sec < args.min_orders_per_sec:
+        failed.append("orders/sec")
+    if failed:
+        print("FAILED:", ", ".join(failed))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
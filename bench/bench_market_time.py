@@ -0,0 +1,131 @@
+"""
+lib/market_time 마이크로벤치마크.
+pandas 기반 기존 구현과 세션 테이블(bisect) 구현의 호출당 지연시간을 비교한다.
+
+    python -m bench.bench_market_time
+"""
+import contextlib
+import io
+import random
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+from lib import market_time as mt
+
+XNYS = mt.XNYS
+
+# --------------- 기존 구현 (비교용) ---------------
+
+def _old_now_utc(check_time):
+    if check_time is None:
+        now_et = datetime.now(pytz.timezone("America/New_York"))
+    else:
+        if check_time.tzinfo is None:
+            check_time = check_time.replace(tzinfo=pytz.timezone("America/New_York"))
+        now_et = check_time.astimezone(pytz.timezone("America/New_York"))
+    return now_et.astimezone(pytz.utc)
+
+def old_is_us_market_open_now(check_time=None):
+    now_utc = _old_now_utc(check_time)
+    date_str = now_utc.strftime('%Y-%m-%d')
+    if date_str not in XNYS.sessions:
+        return False
+    market_open_utc = XNYS.opens.loc[date_str]
+    market_close_utc = XNYS.closes.loc[date_str]
+    return market_open_utc <= now_utc <= market_close_utc
+
+def old_get_remaining_market_time(check_time=None):
+    now_utc = _old_now_utc(check_time)
+    date_str = now_utc.strftime('%Y-%m-%d')
+    if date_str not in XNYS.sessions:
+        return None
+    remaining_time = XNYS.closes.loc[date_str] - now_utc
+    return remaining_time if remaining_time.total_seconds() > 0 else None
+
+def old_get_time_until_next_market_open(check_time=None):
+    now_utc = _old_now_utc(check_time) - timedelta(hours=8)
+    date_str = now_utc.strftime('%Y-%m-%d')
+    if date_str in XNYS.sessions:
+        market_open_utc = XNYS.opens.loc[date_str]
+        market_close_utc = XNYS.closes.loc[date_str]
+        if now_utc < market_open_utc:
+            return market_open_utc - now_utc
+        if now_utc > market_close_utc:
+            next_session = XNYS.sessions[XNYS.sessions > date_str].min()
+            return XNYS.opens.loc[next_session] - now_utc
+    next_session = XNYS.sessions[XNYS.sessions > date_str].min()
+    return XNYS.opens.loc[next_session] - now_utc
+
+# --------------- 동작 비교 기준 ---------------
+# 새 get_time_until_next_market_open 은 now 를 8시간 당기지 않는다 (세션 테이블이 UTC 라 보정이 필요 없음).
+# 그래서 기존 구현과는 결과가 다르고, 동작 비교는 보정 없이 now 이후 첫 개장을 구하는 pandas 기준과 한다.
+# (속도 비교는 그대로 기존 구현과 한다)
+
+def fixed_get_time_until_next_market_open(check_time=None):
+    now_utc = _old_now_utc(check_time)
+    return XNYS.opens[XNYS.opens > now_utc].iloc[0] - now_utc
+
+REFERENCES = {"get_time_until_next_market_open": fixed_get_time_until_next_market_open}
+
+# --------------- 측정 ---------------
+
+PAIRS = [
+    ("is_us_market_open_now", old_is_us_market_open_now, mt.is_us_market_open_now),
+    ("get_remaining_market_time", old_get_remaining_market_time, mt.get_remaining_market_time),
+    ("get_time_until_next_market_open", old_get_time_until_next_market_open, mt.get_time_until_next_market_open),
+]
+
+def sample_times(n, seed=0):
+    """최근 1년 범위의 임의 UTC 시각 n 개"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=pytz.utc).timestamp()
+    return [datetime.fromtimestamp(start + rng.random() * 365 * 86400, pytz.utc) for _ in range(n)]
+
+def _per_call_us(func, times):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for t in times:
+            func(t)
+        elapsed = time.perf_counter() - start
+    return elapsed / len(times) * 1e6
+
+def _same(a, b):
+    if a is None or b is None or isinstance(a, bool):
+        return a == b
+    return abs(a.total_seconds() - b.total_seconds()) < 1e-3
+
+def check_equivalence(times):
+    """
+    새 구현이 비교 기준(REFERENCES, 없으면 기존 구현)과 같은 결과인지 확인.
+    :return: {함수 이름: 기존 구현과 결과가 다른 시각 수} (기준이 따로 있는 함수만)
+    """
+    changed = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name, old, new in PAIRS:
+            reference = REFERENCES.get(name, old)
+            for t in times:
+                b = new(t)
+                assert _same(reference(t), b), (name, t, reference(t), b)
+            if reference is not old:
+                changed[name] = sum(1 for t in times if not _same(old(t), new(t)))
+    return changed
+
+def main(n_random=2000, n_session=2000):
+    random_times = sample_times(n_random)
+    for name, count in check_equivalence(random_times).items():
+        print(f"{name}: 기존 구현과 다른 결과 {count}/{len(random_times)} (의도된 수정, 보정 없는 기준과는 일치)")
+    # 한 세션 안에서 3초 간격 반복 호출 (트레이딩 루프 패턴)
+    base = datetime(2024, 3, 5, 15, 0, tzinfo=pytz.utc)
+    session_times = [base + timedelta(seconds=3 * i) for i in range(n_session)]
+
+    print(f"{'function':34s} {'pattern':8s} {'old(us)':>10s} {'new(us)':>10s} {'speedup':>8s}")
+    for name, old, new in PAIRS:
+        for pattern, times in (("random", random_times), ("session", session_times)):
+            t_old = _per_call_us(old, times[: max(len(times) // 10, 1)])
+            t_new = _per_call_us(new, times)
+            print(f"{name:34s} {pattern:8s} {t_old:10.2f} {t_new:10.2f} {t_old / t_new:7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+시작 시간 벤치마크 (장중 재시작 대비).
+새 인터프리터를 여러 번 띄워 demo0.0.2.py 의 시작 단계별 시간을 측정하고 중앙값을 출력한다.
+  - import      : demo0.0.2.py 모듈 import (lib/market_time 세션 테이블 로드 포함)
+  - table       : 세션 테이블 파일 로드 (lib/calendars/XNYS.i8)
+  - token       : token.dat 확인 (캐시된 토큰 재사용 여부 판단)
+  - first_tick  : sim 모드 첫 틱까지 (CSV → FakeBroker → 엔진 생성 → 첫 판단)
+  - wall        : 프로세스 시작부터 첫 틱까지 (인터프리터 시작 포함)
+비교용으로 exchange_calendars 로 캘린더를 만드는 시간(calendar)을 한 번 측정한다.
+--max-seconds 를 넘으면 종료 코드 1.
+
+    python -m bench.bench_startup --sim-data TSLL_1min.csv --runs 5
+"""
+import argparse
+import json
+import os
+import runpy
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHASES = ("import", "table", "token", "first_tick", "wall")
+
+def child(sim_data):
+    """한 번의 시작 과정. 단계별 시간(초)을 JSON 으로 출력"""
+    timings = {}
+    started = time.perf_counter()
+    demo = runpy.run_path(os.path.join(ROOT, "demo0.0.2.py"), run_name="demo")
+    timings["import"] = time.perf_counter() - started
+
+    from lib.market_time import SessionTable
+    t = time.perf_counter()
+    SessionTable.load("XNYS")
+    timings["table"] = time.perf_counter() - t
+
+    from lib.auth import cached_token_ttl, read_keys
+    t = time.perf_counter()
+    key_path = os.path.join(ROOT, "keys", "test.key")
+    if os.path.exists(key_path):
+        key, secret, _ = read_keys(key_path)
+        cached_token_ttl(key, secret, os.path.join(ROOT, "token.dat"))
+    timings["token"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    from lib.fake_broker import FakeBroker
+    from lib.ohlcv import load_yf_csv
+    from lib.strategy import StrategyParams, SessionOpen, PriceTick
+    bars = load_yf_csv(sim_data)
+    broker = FakeBroker([bars])
+    price = demo["get_present_stock_price"](broker, bars.symbol)
+    engine = demo["create_engine"](broker, bars.symbol, StrategyParams(), price, demo["BalanceCache"](broker))
+    engine.handle(SessionOpen(broker.now))
+    engine.handle(PriceTick(broker.now, price, 3600))
+    timings["first_tick"] = time.perf_counter() - t
+    print(json.dumps(timings))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sim-data", default=os.path.join(ROOT, "TSLL_1min.csv"), help="첫 틱에 쓸 yfinance CSV")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=None, help="wall 중앙값 상한 (초)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        child(args.sim_data)
+        return
+
+    runs = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        out = subprocess.run([sys.executable, "-m", "bench.bench_startup", "--child", "--sim-data", args.sim_data],
+                             cwd=ROOT, capture_output=True, text=True, check=True)
+        wall = time.perf_counter() - started
+        timings = json.loads(out.stdout.strip().splitlines()[-1])
+        timings["wall"] = wall
+        runs.append(timings)
+
+    for phase in PHASES:
+        values = [r[phase] for r in runs]
+        print(f"{phase:<11s} median {statistics.median(values) * 1e3:8.1f}ms  max {max(values) * 1e3:8.1f}ms")
+
+    from lib.market_time import SessionTable
+    started = time.perf_counter()
+    SessionTable.build("XNYS")
+    print(f"{'calendar':<11s}        {(time.perf_counter() - started) * 1e3:8.1f}ms  (exchange_calendars, 비교용)")
+
+    wall = statistics.median(r["wall"] for r in runs)
+    if args.max_seconds is not None and wall > args.max_seconds:
+        print(f"FAILED: wall {wall:.3f}s > {args.max_seconds}s")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
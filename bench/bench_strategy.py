@@ -0,0 +1,35 @@
+"""
+StrategyEngine 이벤트 처리 속도.
+yfinance CSV 를 PaperGateway 로 재생하여 초당 처리 이벤트 수를 출력한다.
+
+    python -m bench.bench_strategy TSLL_1min.csv --repeat 20
+"""
+import argparse
+import logging
+import time
+
+from lib.ohlcv import load_yf_csv
+from lib.strategy import StrategyEngine, StrategyParams, PaperGateway, replay_bars
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--splits", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)
+
+    params = StrategyParams(split_no=args.splits)
+    for path in args.files:
+        bars = load_yf_csv(path)
+        events = 0
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            engine = StrategyEngine(bars.symbol, PaperGateway(), params,
+                                    reservoir=params.split_no * 2 * float(bars.close[0]))
+            events += replay_bars(engine, bars)
+        elapsed = time.perf_counter() - start
+        print(f"{path}: {events} events in {elapsed:.3f}s = {events / elapsed:,.0f} events/s")
+
+if __name__ == "__main__":
+    main()
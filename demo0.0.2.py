@@ -1,230 +1,373 @@
-import time
-from datetime import datetime, timedelta
 import argparse
-from lib.market_time import *
-import mojito
+import logging
+import asyncio
+from lib.async_broker import AsyncBroker
+from lib.price_feed import PriceFeed, KIS_WS_URL, KIS_WS_URL_MOCK, issue_approval_key
+from lib.rate_limit import ThrottledBroker, RequestScheduler, REAL_RATE, MOCK_RATE
+from lib.log import setup_logging, fields
+from lib.broker_api import *
+from lib.portfolio import PortfolioRunner
+from lib.balance_cache import BalanceCache
+from lib.journal import Journal
+from lib.auth import connect, read_keys
+from lib.metrics import (REGISTRY, InstrumentedBroker, TickTimer, counter, order_listener,
+                         start_http_server)
+from lib.clock import get_clock, set_clock, VirtualClock, SimulationFinished
+from lib.scheduler import SessionScheduler, OPEN, CLOSE, TICK
+from lib.strategy import (StrategyEngine, StrategyParams, BrokerGateway, order_events, CLOSED,
+                          SessionOpen, SessionClose, PriceTick, PositionUpdate)
 
-# --------------- 글로벌 함수 (broker 함수 호출 래퍼) ---------------
-# 아래 함수들은 mojito 모듈의 API 함수를 이용하여 실제 API와 통신하는 방식으로 구현됩니다.
-# 이 함수들은 메인 트레이딩 루프에서 호출됩니다.
+log = logging.getLogger("autosell")
 
-def get_present_stock_price(broker, stock_name):
-    response = broker.fetch_price(stock_name)
-    try:
-        return float(response.get("current_price", 100))
-    except Exception:
-        return 100.0
+# --------------- 메인 트레이딩 루프 ---------------
+# 판단 로직은 lib/strategy.StrategyEngine 에 있고, 루프는 시장 시간에 맞춰 이벤트만 전달한다.
+#   개장 → SessionOpen, 매 틱 → 체결 조회(OrderFilled) + 잔고(PositionUpdate) + 현재가(PriceTick),
+#   마감 → SessionClose
+# 시각은 lib/scheduler.SessionScheduler 의 타이머(개장 / 3초 틱 / 마감 10분 전 LOC 구간 / 마감)로 받고,
+# 타이머 사이에는 잠들어 있다 (장외 시간에 3초마다 시장 시간을 확인하지 않음).
 
-def get_average_my_stock_price(broker, stock_name):
-    balance_response = broker.fetch_present_balance()
-    try:
-        avg_price = float(balance_response["output2"][0].get("avg_price", 95))
-    except Exception:
-        avg_price = 95.0
-    return avg_price
+def create_engine(broker, stock_name, params, present_price, balance, journal=None, recorder=None):
+    """
+    실전 broker 로 주문하는 StrategyEngine 생성 (예산 = split_no * 2 * 현재가격).
+    journal 이 있으면 이벤트를 기록하고, 복구된 상태가 있으면 이어서 사용한다.
+    recorder (lib.bar_store.TickRecorder) 가 있으면 현재가를 봉 데이터 저장소에 기록한다.
+    """
+    reservoir = params.split_no * 2 * present_price * params.qty
+    engine = StrategyEngine(stock_name, BrokerGateway(broker, balance), params, reservoir=reservoir)
+    if journal is not None:
+        journal.attach(engine)
+    if recorder is not None:
+        engine.listeners.append(recorder)
+    engine.listeners.append(order_listener)
+    return engine
+
+def close_out(engine, balance, now, timeout=3.0):
+    """
+    장 마감 정리: 주문체결내역 1회 조회로 마지막 체결을 반영하고, 남은 주문을 동시에 취소 (timeout 초 안에).
+    이후 SessionClose 의 취소 요청은 이미 취소된 주문이므로 다시 보내지 않는다.
+    """
+    gateway = engine.gateway
+    gateway.orders.reconcile()
+    position = balance.position(engine.symbol)
+    statuses = {no: gateway.order_status(kind, no) for kind, no in engine.pending_orders()}
+    for event in order_events(engine, statuses, position, now):
+        engine.handle(event)
+        balance.invalidate()
+    gateway.orders.cancel_all(engine.symbol, timeout=timeout)
 
-def all_sell(broker, stock_name, quantity):
-    return broker.create_market_sell_order(stock_name, quantity)
+def main_trading_loop(broker , stock_name="SOXL", split_no=40, balance=None, params=None, journal=None,
+                      recorder=None, clock=None, calendar="XNYS"):
+    """
+    메인 트레이딩 루프.
+    :param stock_name: 거래 종목 (티커)
+    :param split_no: 분할 매수 횟수 (기본 40)
+    :param balance: lib.balance_cache.BalanceCache (기본: broker 로 새로 생성)
+    :param params: lib.strategy.StrategyParams (기본: split_no 외 기본값)
+    :param journal: lib.journal.Journal (선택). 상태 기록 / --resume 복구
+    :param recorder: lib.bar_store.TickRecorder (선택). 현재가 기록
+    :param clock: lib.clock 의 시계 (기본: get_clock()). VirtualClock 이면 대기 없이 가상 시각으로 진행
+    :param calendar: 거래소 세션 테이블 (XNYS, XKRX)
+    """
+    clock = clock or get_clock()
+    balance = balance or BalanceCache(broker, clock=clock.monotonic)
+    params = params or StrategyParams(split_no=split_no)
+    engine = create_engine(broker, stock_name, params, get_present_stock_price(broker , stock_name), balance, journal,
+                           recorder)
+    gateway = engine.gateway
+    scheduler = SessionScheduler(calendar, clock=clock)
+    ticks = TickTimer(3, clock, loop="main")
+    errors = counter("loop_errors_total", "루프에서 잡힌 예외", loop="main")
 
-def half_order_info(broker , order_no):
-    # 실제 API가 지원하는 주문 정보 조회 함수가 있다면 호출할 것.
-    # 여기서는 모의 응답을 반환합니다.
-    return {"order_price": 98.0, "체결여부": True}
+    log.info("트레이딩 루프 시작", extra=fields(stock=stock_name, split_no=params.split_no, calendar=calendar))
+    try:
+        while True:
+            try:
+                timer = scheduler.wait()    # 다음 개장 / 틱 / LOC 구간 / 마감까지 대기
+                if timer is None:
+                    break
+                now = clock.time()
+                if timer.kind == OPEN:
+                    # 같은 세션에 재시작(--resume)하면 이미 낸 주문을 유지 (SessionOpen 은 세션당 한 번).
+                    # 이전 세션의 상태가 남아 있으면 (마감 처리 실패 / 며칠 뒤 --resume) 단계와 관계없이 새로 연다
+                    if not engine.opened_since(timer.session_open):
+                        engine.handle(SessionOpen(now))
+                    scheduler.schedule_tick(timer)
+                    continue
 
-def loc_order_info(broker , order_no):
-    return {"order_price": 102.0, "체결여부": True}
+                if timer.kind != CLOSE:
+                    if engine.state.phase == CLOSED:
+                        continue
+                    if timer.kind == TICK:
+                        # 다음 틱을 먼저 예약 (틱 처리 중 예외가 나도 주기가 이어지도록)
+                        scheduler.schedule_tick(timer, 3)
+                        ticks.start()
+                    position = balance.position(stock_name)  # 캐시된 잔고 (TTL / 주문 시 무효화)
+                    gateway.orders.reconcile()  # 미체결 주문 전체를 주문체결내역 1회 조회로 갱신
+                    statuses = {no: gateway.order_status(kind, no) for kind, no in engine.pending_orders()}
+                    events = order_events(engine, statuses, position, now)
+                    for event in events:
+                        engine.handle(event)
+                    if events:
+                        # 체결을 반영한 뒤 잔고를 다시 읽는다 (체결 전 스냅샷이 매도 후 수량을 되살리지 않도록)
+                        balance.invalidate()
+                        position = balance.position(stock_name)
+                    engine.handle(PositionUpdate(now, position.quantity, position.avg_price))
+                    engine.handle(PriceTick(now, get_present_stock_price(broker , stock_name), timer.remain(now)))
+                    if timer.kind == TICK:
+                        ticks.stop()
+                    if not engine.done:
+                        continue
+                ticks.reset()
 
-def condition_order_avg(broker , stock_name, price):
-    return broker.create_limit_buy_order(stock_name, price, 1)
+                # 마감 또는 잔고 부족. 정리가 실패해도 SessionClose 는 항상 전달 (PortfolioRunner.close_day 와 같음)
+                try:
+                    close_out(engine, balance, clock.time())
+                except Exception as e:
+                    errors.inc()
+                    log.exception("마감 주문 정리 중 에러: %s", e)
+                engine.handle(SessionClose(clock.time()))
+                gateway.orders.prune()     # 끝난 주문을 색인에서 제거 (PortfolioRunner 와 같이 하루 한 번)
+                log.info("세션 메트릭\n%s", REGISTRY.summary())
+                if engine.done:
+                    log.warning("잔고 부족 경고: 사용자 알림 후 종료")
+                    # 실제 환경에서는 이메일이나 HTTPS 통신으로 경고 전송
+                    break
+                log.info("오늘 거래 종료. 다음 개장까지 %.1f분 대기", (scheduler.next_in() or 0) / 60)
+            except BrokerError as e:
+                # 조회 실패 응답 (초당 거래건수 초과 등): 이번 틱만 건너뛰고 다음 틱에 다시 조회
+                errors.inc()
+                log.warning("브로커 조회 실패, 틱 건너뜀: %s", e)
+            except Exception as e:
+                errors.inc()
+                log.exception("에러 발생: %s", e)
+                clock.sleep(5)  # 에러 발생 시 잠시 대기 후 재시작
+    finally:
+        gateway.orders.close()
 
-def cancel_order(broker , order_no):
-    # DUMMY 값 사용: 실제 API에서는 org_no, quantity, order_type, price 등이 필요합니다.
-    org_no = "DUMMY_ORG"
-    quantity = 1
-    order_type = "00"
-    price = 100
-    return broker.cancel_order(org_no, order_no, quantity, True, order_type, price)
+# --------------- 비동기 트레이딩 루프 ---------------
+# 매 틱의 독립적인 조회(현재가 / 잔고 / 0.5회차·LOC 주문 정보)를 동시에 보내,
+# 틱 지연을 각 호출의 합이 아닌 가장 느린 호출 하나로 줄인다.
 
-# --------------- 메인 트레이딩 루프 ---------------
+async def fetch_tick_snapshot(abroker, balance, engine, feed=None):
+    """
+    현재가, 보유 현황, 미체결 주문 상태를 동시에 조회.
+    feed 가 있으면 현재가는 실시간 시세 셀에서 읽는다 (없거나 오래됐으면 REST 조회).
+    보유 현황은 BalanceCache 에서 읽으므로 만료 / 무효화된 경우에만 잔고를 조회한다.
+    :return: (현재가, Position, {주문번호: (체결 여부, 체결 가격)})
+    """
+    stock_name = engine.symbol
+    streamed = feed.latest(stock_name, max_age=10) if feed is not None else None
+    gateway = engine.gateway
+    price_response, position, _ = await asyncio.gather(
+        abroker.fetch_price(stock_name) if streamed is None else asyncio.sleep(0),
+        abroker.call(balance.position, stock_name),
+        abroker.call(gateway.orders.reconcile),     # 미체결 주문 전체를 주문체결내역 1회 조회로 갱신
+    )
+    present_price = parse_present_price(price_response) if streamed is None else streamed
+    statuses = {no: gateway.order_status(kind, no) for kind, no in engine.pending_orders()}
+    return present_price, position, statuses
 
-def main_trading_loop(broker , stock_name="SOXL", split_no=40):
+async def async_main_trading_loop(abroker, stock_name="SOXL", split_no=40, feed=None, balance=None, params=None,
+                                  journal=None, recorder=None, clock=None, calendar="XNYS"):
     """
-    메인 트레이딩 루프.
+    main_trading_loop 의 asyncio 버전.
+    :param abroker: lib.async_broker.AsyncBroker
     :param stock_name: 거래 종목 (티커)
     :param split_no: 분할 매수 횟수 (기본 40)
+    :param feed: lib.price_feed.PriceFeed. 지정 시 실시간 시세를 사용하고,
+                 매도/LOC 기준가를 넘으면 다음 틱을 기다리지 않고 바로 판단한다.
+    :param balance: lib.balance_cache.BalanceCache (기본: abroker.broker 로 새로 생성)
+    :param params: lib.strategy.StrategyParams (기본: split_no 외 기본값)
+    :param journal: lib.journal.Journal (선택). 상태 기록 / --resume 복구
+    :param recorder: lib.bar_store.TickRecorder (선택). 현재가 기록
+    :param clock: lib.clock 의 시계 (기본: get_clock())
+    :param calendar: 거래소 세션 테이블 (XNYS, XKRX)
     """
-    used_split = 0         # 사용한 분할 매수 회차
-    present_price = get_present_stock_price(broker , stock_name)
-    reservoir = split_no * 2 * present_price  # 예: 40 * 2 * 현재가격
-    my_stocks = 0
-
-    all_sell_order_no = None
-    half_order_active = False
-    half_order_no = None 
-    half_success = False 
-    loc_order_active = False 
-    loc_order_no = None 
-    loc_success = False 
-    out_of_amount = False
-    terminate = False
-
-    print(">> 트레이딩 루프 시작")
-    while True:
-        try:
-            time.sleep(3)  # 주기적 확인
-            if not is_us_market_open_now():
-                # 장이 열리지 않으면 다음 개장까지 대기
-                next_open = get_time_until_next_market_open()
-                if next_open:
-                    sleep_seconds = max(next_open.total_seconds(), 0)
-                    print(f"장 마감. 다음 개장까지 {sleep_seconds/60:.1f}분 대기합니다.")
-                    time.sleep(sleep_seconds)
-                continue
-
-            # 장이 열렸을 때 내부 루프 실행
-            while is_us_market_open_now():
-                now_et = datetime.now(pytz.timezone("America/New_York"))
-                remain_time = get_remaining_market_time(now_et)
-                if remain_time is None:
-                    # 장 종료됨
-                    terminate = True
-                    print(">> 정규장 종료 감지")
+    clock = clock or get_clock()
+    balance = balance or BalanceCache(abroker.broker, clock=clock.monotonic)
+    params = params or StrategyParams(split_no=split_no)
+    present_price = parse_present_price(await abroker.fetch_price(stock_name))
+    engine = create_engine(abroker.broker, stock_name, params, present_price, balance, journal, recorder)
+
+    handling = asyncio.Lock()
+
+    async def handle(event):
+        # 엔진의 주문 호출은 블로킹이므로 스레드 풀에서 실행.
+        # 조회와 달리 타임아웃을 두지 않고 한 번에 하나씩 처리 (타임아웃 후에도 스레드가 주문을 계속 내면
+        # 다음 틱의 처리와 겹쳐 0.5회차 / LOC 주문이 중복되고 상태가 꼬인다)
+        async with handling:
+            await abroker.run(engine.handle, event)
+
+    scheduler = SessionScheduler(calendar, clock=clock)
+    ticks = TickTimer(3, clock, loop="async")
+    errors = counter("loop_errors_total", "루프에서 잡힌 예외", loop="async")
+    log.info("비동기 트레이딩 루프 시작", extra=fields(stock=stock_name, split_no=params.split_no, calendar=calendar))
+    session = None      # 장중이면 마지막 타이머 (기준가 돌파 시 같은 세션에 틱 추가)
+    try:
+        while True:
+            try:
+                if feed is not None and session is not None:
+                    # 장중: 기준가 돌파 시 다음 타이머를 기다리지 않고 바로 판단
+                    if await feed.wait(stock_name, max(scheduler.next_in() or 0, 0)) is not None:
+                        scheduler.schedule_tick(session)
+                timer = await scheduler.async_wait()
+                if timer is None:
                     break
+                now = clock.time()
+                if timer.kind == OPEN:
+                    if not engine.opened_since(timer.session_open):
+                        await handle(SessionOpen(now))
+                    scheduler.schedule_tick(timer)
+                    session = timer
+                    continue
 
-                # 현재 주가 및 내 평단가 조회
-                present_stock_price = get_present_stock_price(broker , stock_name)
-                average_my_stock_price = get_average_my_stock_price(broker , stock_name)
-
-                # 남은 예산 계산 (단순 예시)
-                half_cost = half_order_info(broker , half_order_no)["order_price"] if (half_order_active and half_order_no) else 0
-                loc_cost = loc_order_info(broker , loc_order_no)["order_price"] if (loc_order_active and loc_order_no) else 0
-                remain_reservoir = reservoir - (my_stocks * average_my_stock_price) - half_cost - loc_cost
-                print(f">> 남은 예산: {remain_reservoir:.2f}")
-
-                # 매도 조건: 평단가의 10% 이상 상승 시 전량 매도
-                if average_my_stock_price > 0 and present_stock_price >= average_my_stock_price * 1.1:
-                    if all_sell_order_no is None:
-                        all_sell_order_no = all_sell(broker , stock_name)
-                        print(">> 목표 수익 도달: 전량 매도 실행")
-                
-                # 원금 소진 조건
-                if used_split < split_no * 2:
-                    if remain_reservoir < present_stock_price:
-                        if present_stock_price >= average_my_stock_price * 0.9:
-                            if all_sell_order_no is None:
-                                all_sell_order_no = all_sell(broker , stock_name)
-                                print(">> 원금 소진 조건 충족: 전량 매도 실행")
-                        else:
-                            out_of_amount = True
-                            print(">> 잔고 부족: 추가 매수 불가")
-                            break
-
-                # 0.5 회차 매수 주문 (장중 가격이 평단가 이하 혹은 첫 매수)
-                if not half_order_active:
-                    half_order_no = condition_order_avg(broker , stock_name, average_my_stock_price)
-                    half_order_active = True
-                    print(f">> 0.5회차 주문 생성: {half_order_no}")
-                elif half_order_active and not half_success:
-                    info = half_order_info(broker , half_order_no)
-                    if info.get("체결여부"):
-                        half_success = True
-                        used_split += 1
-                        print(">> 0.5회차 주문 체결됨")
-                        # 실제 체결 시 내 평단가 및 보유 주식 업데이트 필요
-                    elif not info.get("체결여부") and loc_order_active:
-                        cancel_order(broker , half_order_no)
-                        print(">> 0.5회차 주문 미체결 -> 취소 처리")
-
-                # LOC 주문 (잔여 시간이 10분 이하인 경우)
-                if remain_time is not None and remain_time <= timedelta(minutes=10):
-                    if not loc_order_active:
-                        # 조건에 따라 주문 가격 결정
-                        if present_stock_price <= average_my_stock_price * 1.15:
-                            order_price = present_stock_price
-                        else:
-                            order_price = average_my_stock_price * 1.15
-                        loc_order_no = condition_order_avg(broker , stock_name, order_price)
-                        loc_order_active = True
-                        print(f">> LOC 주문 생성: {loc_order_no}")
-                    elif loc_order_active and not loc_success:
-                        info = loc_order_info(broker , loc_order_no)
-                        if info.get("체결여부"):
-                            loc_success = True
-                            used_split += 1
-                            print(">> LOC 주문 체결됨")
-                time.sleep(3)  # 내부 루프 주기
-            # 내부 while 종료 후: 장 종료 또는 잔고 부족 등
-            if terminate:
-                if not loc_success and loc_order_no is not None:
-                    cancel_order(broker , loc_order_no)
-                    print(">> LOC 주문 취소 (장 종료 전)")
-                if all_sell_order_no is not None:
-                    cancel_order(broker , all_sell_order_no)
-                    print(">> 전량 매도 주문 취소")
-                print(">> 오늘 거래 종료, 로그 기록 후 재시작 준비")
-                # 로그 파일 생성 및 후처리 가능
-                next_open = get_time_until_next_market_open()
-                if next_open:
-                    # 다음 개장 10분 전까지 대기 (sleep 시간 계산)
-                    sleep_seconds = max(next_open.total_seconds() - 600, 0)
-                    print(f">> 다음 거래일까지 {sleep_seconds/60:.1f}분 대기")
-                    time.sleep(sleep_seconds)
-                # 거래일 재시작을 위해 변수 초기화
-                terminate = False
-                all_sell_order_no = None 
-                half_order_active = False
-                half_order_no = None 
-                half_success = False 
-                loc_order_active = False
-                loc_order_no = None 
-                loc_success = False 
-            if out_of_amount:
-                print(">> 잔고 부족 경고: 사용자 알림 후 종료")
-                # 실제 환경에서는 이메일이나 HTTPS 통신으로 경고 전송
-                break
-        except Exception as e:
-            print(f">> 에러 발생: {e}")
-            time.sleep(5)  # 에러 발생 시 잠시 대기 후 재시작
+                if timer.kind != CLOSE:
+                    if engine.state.phase == CLOSED:
+                        continue
+                    session = timer
+                    if timer.kind == TICK:
+                        scheduler.schedule_tick(timer, 3)
+                        ticks.start()
+                    # 독립 조회를 동시에 실행
+                    present_stock_price, position, statuses = await fetch_tick_snapshot(abroker, balance, engine, feed)
+                    now = clock.time()
+                    events = order_events(engine, statuses, position, now)
+                    for event in events:
+                        await handle(event)
+                    if events:
+                        # 체결을 반영한 뒤 잔고를 다시 읽는다 (체결 전 스냅샷이 매도 후 수량을 되살리지 않도록)
+                        balance.invalidate()
+                        position = await abroker.call(balance.position, stock_name)
+                    await handle(PositionUpdate(now, position.quantity, position.avg_price))
+                    await handle(PriceTick(now, present_stock_price, timer.remain(now)))
+                    if timer.kind == TICK:
+                        ticks.stop()
+                    if feed is not None:
+                        avg = engine.state.avg_price or present_stock_price
+                        feed.set_thresholds(stock_name,
+                                            above=(avg * params.take_profit, avg * params.loc_cap),
+                                            below=(avg * params.loss_floor,))
+                    if not engine.done:
+                        continue
+                ticks.reset()
+                session = None
+
+                # close_out 은 엔진 상태를 바꾸므로 handle 과 같이 타임아웃 없이 순서대로 (일괄 취소는 자체 timeout 3초).
+                # 정리가 실패해도 SessionClose 는 항상 전달
+                try:
+                    async with handling:
+                        await abroker.run(close_out, engine, balance, clock.time())
+                except Exception as e:
+                    errors.inc()
+                    log.exception("마감 주문 정리 중 에러: %s", e)
+                await handle(SessionClose(clock.time()))
+                engine.gateway.orders.prune()      # 끝난 주문을 색인에서 제거 (PortfolioRunner 와 같이 하루 한 번)
+                log.info("세션 메트릭\n%s", REGISTRY.summary())
+                if engine.done:
+                    log.warning("잔고 부족 경고: 사용자 알림 후 종료")
+                    break
+                log.info("오늘 거래 종료. 다음 개장까지 %.1f분 대기", (scheduler.next_in() or 0) / 60)
+            except BrokerError as e:
+                errors.inc()
+                log.warning("브로커 조회 실패, 틱 건너뜀: %s", e)
+            except Exception as e:
+                errors.inc()
+                log.exception("에러 발생: %s", e)
+                await clock.async_sleep(5)  # 에러 발생 시 잠시 대기 후 재시작
+    finally:
+        engine.gateway.orders.close()
 
 if __name__ == "__main__":
     # argparse를 활용해 시스템 전달 인수로 초깃값 설정
     parser = argparse.ArgumentParser(description="라오어 무한매수법 트레이딩 봇")
     parser.add_argument("--stock", type=str, default="SOXL", help="거래 종목 (티커)")
+    parser.add_argument("--stocks", type=str, default=None, help="포트폴리오 모드: 쉼표로 구분한 종목 목록 (예: SOXL,TQQQ,TSLL)")
     parser.add_argument("--splits", type=int, default=40, help="분할 매수 횟수 (기본: 40)")
-    parser.add_argument("--mode", type=str, default="test", help="모의 또는 실전 (test or real)")
+    parser.add_argument("--calendar", type=str, default=None,
+                        help="거래소 세션 테이블 (XNYS, XKRX. 기본: XNYS, sim 모드에서 .KS/.KQ 종목이면 XKRX)")
+    parser.add_argument("--mode", type=str, default="test", help="모의 또는 실전 또는 로컬 시뮬레이션 (test, real or sim)")
+    parser.add_argument("--sim-data", type=str, default=None, help="sim 모드: 재생할 yfinance 포맷 CSV (가상 시계로 진행)")
+    parser.add_argument("--sim-latency", type=float, default=0.0, help="sim 모드: 브로커 호출당 지연 (초)")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="비동기 루프 사용 (조회 동시 실행)")
+    parser.add_argument("--stream", action="store_true", help="비동기 모드에서 실시간 시세(WebSocket) 사용")
+    parser.add_argument("--timeout", type=float, default=2.0, help="비동기 모드의 브로커 호출별 타임아웃 (초)")
+    parser.add_argument("--rate", type=float, default=None, help="초당 API 호출 한도 (기본: 실전 15, 모의 2)")
+    parser.add_argument("--burst", type=float, default=None, help="순간 최대 API 호출 수 (기본: rate)")
+    parser.add_argument("--log-level", type=str, default="INFO", help="로그 레벨 (DEBUG, INFO, WARNING, ERROR)")
+    parser.add_argument("--log-file", type=str, default=None, help="로그 파일 경로 (기본: stdout)")
+    parser.add_argument("--log-json", action="store_true", help="JSON-lines 형식으로 기록")
+    parser.add_argument("--journal", type=str, default="journal", help="전략 상태 저널 디렉터리 (기본: ./journal. --resume 이 없으면 기존 파일은 <이름>.<시각> 으로 옮겨 둠)")
+    parser.add_argument("--resume", action="store_true", help="저널의 마지막 상태에서 이어서 실행 (미체결 주문 / 회차 유지)")
+    parser.add_argument("--record-ticks", type=str, default=None, help="현재가를 기록할 봉 데이터 저장소 디렉터리")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Prometheus 메트릭 HTTP 포트 (127.0.0.1, 기본: 사용 안 함)")
+    parser.add_argument("--metrics-dump", type=str, default=None, help="종료 시 메트릭(Prometheus 텍스트)을 저장할 경로")
 
     args = parser.parse_args()
-
+    if args.stream and args.mode == "sim":
+        parser.error("--stream 은 --mode sim 과 함께 사용할 수 없습니다 (시뮬레이션은 기록된 봉으로 가격을 받음)")
+    setup_logging(args.log_level, path=args.log_file, json_lines=args.log_json)
 
     mode = args.mode
-    print(f">> 초깃값: 종목={args.stock}, 분할 횟수={args.splits}")
-    if mode == "test":
-        f = open("./keys/test.key")
-        lines = f.readlines()
-        key = lines[0].strip()
-        secret = lines[1].strip()
-        acc_no = lines[2].strip()
-        f.close()
-        broker = mojito.KoreaInvestment(
-            api_key=key,
-            api_secret=secret,
-            acc_no=acc_no,
-            exchange='나스닥',
-            mock=True
-        )
-    elif mode == "real":
-        f = open("./keys/real.key")
-        lines = f.readlines()
-        key = lines[0].strip()
-        secret = lines[1].strip()
-        acc_no = lines[2].strip()
-        f.close()
-        broker = mojito.KoreaInvestment(
-            api_key=key,
-            api_secret=secret,
-            acc_no=acc_no,
-            exchange='나스닥',
-        )
-    print("계좌번호 : %s"%( acc_no))
-    print("계좌종류 : %s"%(mode ))
-    main_trading_loop(broker , stock_name=args.stock, split_no=args.splits)
\ No newline at end of file
+    log.info("초깃값: 종목=%s, 분할 횟수=%d", args.stock, args.splits)
+    if mode in ("test", "real"):
+        # 캐시된 접근 토큰(token.dat)이 유효하면 재사용, 장중 만료 전 재발급 (mojito 는 이 때만 import)
+        key, secret, acc_no = read_keys("./keys/test.key" if mode == "test" else "./keys/real.key")
+        broker = connect(key, secret, acc_no, mock=(mode == "test"))
+    elif mode == "sim":
+        # 네트워크 없이 기록된 봉으로 FakeBroker 를 돌리고, 가상 시계로 대기 시간을 건너뛴다
+        from lib.fake_broker import FakeBroker
+        from lib.ohlcv import load_yf_csv
+        bars = load_yf_csv(args.sim_data)
+        broker = FakeBroker([bars], latency=args.sim_latency)
+        acc_no = broker.acc_no
+        args.stock = bars.symbol
+        if args.calendar is None and bars.symbol.endswith((".KS", ".KQ")):
+            args.calendar = "XKRX"
+        set_clock(VirtualClock(bars.ts[0] / 1e9, until=bars.ts[-1] / 1e9 + 86_400,
+                               on_advance=broker.advance_to))
+    calendar = args.calendar or "XNYS"
+    if mode != "sim":
+        rate = args.rate or (MOCK_RATE if mode == "test" else REAL_RATE)
+        broker = ThrottledBroker(broker, RequestScheduler(rate=rate, burst=args.burst))
+    broker = InstrumentedBroker(broker)
+    if args.metrics_port is not None:
+        start_http_server(args.metrics_port)
+    log.info("계좌번호 : %s", acc_no)
+    log.info("계좌종류 : %s", mode)
+    journal = Journal(args.journal, resume=args.resume)
+    recorder = None
+    if args.record_ticks:
+        from lib.bar_store import BarStore, TickRecorder   # numpy 는 기록할 때만 import
+        recorder = TickRecorder(BarStore(args.record_ticks))
+    try:
+        if args.stocks:
+            symbols = [s.strip() for s in args.stocks.split(",") if s.strip()]
+            PortfolioRunner(broker, symbols, split_no=args.splits, journal=journal, recorder=recorder,
+                            calendar=calendar).run()
+        elif args.use_async:
+            async def run():
+                async with AsyncBroker(broker, timeout=args.timeout) as abroker:
+                    feed = None
+                    if args.stream:
+                        async def poll(symbol):
+                            return parse_present_price(await abroker.fetch_price(symbol))
+                        feed = PriceFeed([args.stock], url=KIS_WS_URL_MOCK if mode == "test" else KIS_WS_URL,
+                                         approval_key=issue_approval_key(key, secret, mock=(mode == "test")), poll=poll)
+                        feed.start()
+                    await async_main_trading_loop(abroker, stock_name=args.stock, split_no=args.splits, feed=feed,
+                                                  journal=journal, recorder=recorder, calendar=calendar)
+            asyncio.run(run())
+        else:
+            main_trading_loop(broker , stock_name=args.stock, split_no=args.splits, journal=journal, recorder=recorder,
+                              calendar=calendar)
+    except SimulationFinished:
+        log.info("시뮬레이션 종료", extra=fields(virtual_hours=round(get_clock().slept / 3600, 2),
+                                               broker=getattr(broker.broker, "stats", None)))
+    finally:
+        journal.close()
+        if recorder is not None:
+            recorder.flush()
+        log.info("메트릭 요약\n%s", REGISTRY.summary())
+        if args.metrics_dump:
+            with open(args.metrics_dump, "w") as f:
+                f.write(REGISTRY.render())
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+# --------------- 비동기 브로커 어댑터 ---------------
+# mojito.KoreaInvestment 의 블로킹 REST 호출을 스레드 풀에서 실행하여
+# 서로 독립적인 조회(현재가 / 잔고 / 주문 상태)를 동시에 보낸다.
+# mojito 는 내부적으로 requests 를 사용하므로, 스레드마다 keep-alive 연결이 재사용된다.
+
+log = logging.getLogger(__name__)
+
+class AsyncBroker:
+    """
+    동기 broker 를 감싸는 asyncio 어댑터.
+    :param broker: mojito.KoreaInvestment (또는 같은 메서드를 가진 객체)
+    :param timeout: 호출별 기본 타임아웃 (초). 초과 시 asyncio.TimeoutError
+    :param max_workers: 동시에 진행할 수 있는 REST 호출 수
+    """
+    def __init__(self, broker, timeout=2.0, max_workers=8):
+        self.broker = broker
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="broker")
+
+    async def call(self, func, *args, timeout=None, **kwargs):
+        """임의의 동기 함수를 스레드 풀에서 실행하고 타임아웃을 적용"""
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+        try:
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            log.warning("브로커 호출 타임아웃: %s", getattr(func, "__name__", func))
+            raise
+
+    async def run(self, func, *args, **kwargs):
+        """
+        타임아웃 없이 스레드 풀에서 실행. 주문을 내거나 상태를 바꾸는 호출용
+        (타임아웃으로 기다림을 버려도 스레드는 계속 실행되므로, 다음 호출과 겹치지 않도록 끝까지 기다린다)
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def fetch_price(self, symbol, timeout=None):
+        return await self.call(self.broker.fetch_price, symbol, timeout=timeout)
+
+    async def fetch_present_balance(self, timeout=None):
+        return await self.call(self.broker.fetch_present_balance, timeout=timeout)
+
+    async def create_limit_buy_order(self, symbol, price, quantity, timeout=None):
+        return await self.call(self.broker.create_limit_buy_order, symbol, price, quantity, timeout=timeout)
+
+    async def create_market_sell_order(self, symbol, quantity, timeout=None):
+        return await self.call(self.broker.create_market_sell_order, symbol, quantity, timeout=timeout)
+
+    async def cancel_order(self, org_no, order_no, quantity, total, order_type="00", price=100, timeout=None):
+        return await self.call(self.broker.cancel_order, org_no, order_no, quantity, total, order_type, price,
+                               timeout=timeout)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
@@ -0,0 +1,112 @@
+import logging
+import pickle
+import threading
+import time
+from datetime import datetime
+from lib.log import fields
+# --------------- 인증 (접근 토큰 캐시) ---------------
+# mojito.KoreaInvestment 는 생성 시 ./token.dat 의 토큰이 유효하면 읽고, 아니면 새로 발급해 저장한다.
+# 여기서는
+#   - 생성 전에 token.dat 의 남은 유효 시간을 확인해 로그로 남기고 (발급 여부를 미리 알 수 있음)
+#   - 곧 만료될 토큰(margin 초 이내)은 생성 직후 한 번 재발급하고
+#   - TokenGuard 로 장중 만료 시각을 추적해 만료 전에 재발급 (만료 응답 EGW00123 이면 재발급 후 재시도)
+#   - mojito 에 없는 해외주식 주문체결내역 조회(fetch_orders)를 lib.broker_api.OrderInquiry 로 추가
+# 한다. mojito 는 무거우므로 connect() 안에서만 import 한다.
+
+log = logging.getLogger(__name__)
+
+TOKEN_PATH = "token.dat"        # mojito 가 현재 디렉터리에 읽고 쓰는 파일
+REFRESH_MARGIN = 600            # 만료 n초 전이면 재발급
+TOKEN_EXPIRED_MSG_CODES = ("EGW00123",)     # 기간이 만료된 token 입니다
+
+def read_keys(path):
+    """키 파일 (1행 app key, 2행 app secret, 3행 계좌번호). :return: (key, secret, acc_no)"""
+    with open(path) as f:
+        lines = f.readlines()
+    return lines[0].strip(), lines[1].strip(), lines[2].strip()
+
+def load_token(path=TOKEN_PATH):
+    """token.dat 내용 (dict). 없거나 읽을 수 없으면 None"""
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError) as e:
+        log.debug("토큰 파일을 읽을 수 없습니다: %s", e)
+        return None
+
+def token_expires_at(data):
+    """만료 시각 (epoch 초). mojito 가 기록한 timestamp, 없으면 access_token_token_expired (KST)"""
+    if data.get("timestamp"):
+        return float(data["timestamp"])
+    expired = data.get("access_token_token_expired")
+    if expired:
+        return datetime.strptime(expired, "%Y-%m-%d %H:%M:%S").timestamp()
+    return 0.0
+
+def cached_token_ttl(api_key, api_secret, path=TOKEN_PATH, now=None):
+    """캐시된 토큰의 남은 유효 시간(초). 같은 앱 키의 토큰이 없으면 None"""
+    data = load_token(path)
+    if not data or data.get("api_key") != api_key or data.get("api_secret") != api_secret:
+        return None
+    return token_expires_at(data) - (time.time() if now is None else now)
+
+class TokenGuard:
+    """
+    broker 호출 전에 토큰 만료 시각을 확인해 margin 초 전에 재발급 (broker.issue_access_token).
+    알 수 없는 메서드/속성은 그대로 원래 broker 로 전달 (ThrottledBroker 와 같은 프록시 방식).
+    :param broker: mojito.KoreaInvestment
+    :param expires_at: 현재 토큰 만료 시각 (epoch 초)
+    """
+    def __init__(self, broker, expires_at, margin=REFRESH_MARGIN, path=TOKEN_PATH):
+        self.broker = broker
+        self.expires_at = expires_at
+        self.margin = margin
+        self.path = path
+        self._lock = threading.Lock()
+
+    def refresh(self, force=False):
+        with self._lock:
+            if not force and time.time() < self.expires_at - self.margin:
+                return      # 다른 스레드가 이미 재발급
+            self.broker.issue_access_token()
+            data = load_token(self.path)
+            self.expires_at = token_expires_at(data) if data else time.time() + 86_400
+            log.info("접근 토큰 재발급", extra=fields(expires_at=datetime.fromtimestamp(self.expires_at)))
+
+    def __getattr__(self, name):
+        attr = getattr(self.broker, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            if time.time() >= self.expires_at - self.margin:
+                self.refresh()
+            response = attr(*args, **kwargs)
+            if isinstance(response, dict) and response.get("msg_cd") in TOKEN_EXPIRED_MSG_CODES:
+                log.warning("토큰 만료 응답: 재발급 후 재시도", extra=fields(method=name))
+                self.refresh(force=True)
+                response = attr(*args, **kwargs)
+            return response
+        call.__name__ = name
+        setattr(self, name, call)
+        return call
+
+def connect(key, secret, acc_no, mock=False, exchange="나스닥", path=TOKEN_PATH, margin=REFRESH_MARGIN):
+    """
+    mojito.KoreaInvestment 생성 (캐시된 토큰이 유효하면 재사용) 후 OrderInquiry, TokenGuard 순으로 감싸서 반환
+    (fetch_orders 도 토큰 만료 시 재발급 후 재시도).
+    """
+    ttl = cached_token_ttl(key, secret, path)
+    if ttl is not None and ttl > 0:
+        log.info("캐시된 접근 토큰 사용", extra=fields(ttl_min=round(ttl / 60, 1)))
+    else:
+        log.info("접근 토큰 발급 (캐시 없음 / 만료 / 다른 앱 키)")
+    import mojito
+    from lib.broker_api import OrderInquiry
+    broker = OrderInquiry(mojito.KoreaInvestment(api_key=key, api_secret=secret, acc_no=acc_no, exchange=exchange,
+                                                 mock=mock))
+    data = load_token(path)
+    guard = TokenGuard(broker, token_expires_at(data) if data else 0.0, margin=margin, path=path)
+    if time.time() >= guard.expires_at - margin:
+        guard.refresh()
+    return guard
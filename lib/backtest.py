@@ -0,0 +1,239 @@
+import argparse
+import time
+from dataclasses import asdict
+import numpy as np
+from lib.ohlcv import day_bounds, bar_interval
+from lib.strategy import StrategyParams
+from lib.bar_store import load_bars
+# --------------- 무한매수법 백테스트 엔진 ---------------
+# main_trading_loop 과 같은 규칙을 과거 봉 데이터에 적용한다.
+#   - 장 시작 시 0.5회차 지정가 매수 (평단가, 첫 매수는 시가)
+#   - 마감 loc_window 분 전 LOC 매수 (min(현재가, 평단가 * loc_cap)), 종가로 체결
+#   - 평단가 * take_profit 이상이면 전량 매도
+#   - 예산 소진 시 평단가 * loss_floor 이상이면 전량 매도, 아니면 종료 (out_of_amount)
+# 하루 안의 봉 단위 계산은 NumPy 로 처리하고, 파이썬 루프는 (일 x 체결 이벤트) 단위로만 돈다.
+# 일봉에서도 쓸 수 있도록 봉 시가 / 고가 기준으로 판단하므로 StrategyEngine(replay_bars) 과 세부 규칙이 다르다 (run_backtest 참고).
+
+NS_PER_MIN = 60 * 10**9
+
+FILL_DTYPE = np.dtype([
+    ("ts", "i8"), ("bar", "i8"), ("side", "i1"),
+    ("price", "f8"), ("qty", "f8"), ("reason", "U5"),
+])
+
+class BacktestResult:
+    """
+    백테스트 결과.
+    fills 는 FILL_DTYPE 구조화 배열, 나머지는 봉 단위 배열 (해당 봉 종료 시점 상태).
+    """
+    __slots__ = ("symbol", "params", "reservoir", "ts", "close", "fills",
+                 "position", "avg_price", "used_split", "cash", "equity", "exhausted_ts")
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+    def summary(self):
+        equity = self.equity
+        peak = np.maximum.accumulate(equity) if len(equity) else equity
+        drawdown = float(((peak - equity) / peak).max()) if len(equity) else 0.0
+        final = float(equity[-1]) if len(equity) else self.reservoir
+        ret = (final / self.reservoir - 1) * 100 if self.reservoir else 0.0
+        reasons = self.fills["reason"]
+        return {
+            "symbol": self.symbol,
+            "bars": len(self.ts),
+            "reservoir": round(self.reservoir, 4),
+            "final_equity": round(final, 4),
+            "return_pct": round(ret, 4),
+            "max_drawdown_pct": round(drawdown * 100, 4),
+            "fills": len(self.fills),
+            "take_profits": int((reasons == "tp").sum()),
+            "floor_sells": int((reasons == "floor").sum()),
+            "max_used_split": int(self.used_split.max()) if len(self.used_split) else 0,
+            "exhausted": self.exhausted_ts is not None,
+        }
+
+def loc_start_index(ts, starts, ends, window_ns):
+    """각 거래일의 LOC 주문 시점 봉 인덱스 (마감 - window 이후 첫 봉)"""
+    close_ts = ts[ends - 1] + bar_interval(ts, starts, ends)
+    idx = np.searchsorted(ts, close_ts - window_ns, side="left")
+    return np.clip(idx, starts, ends - 1)
+
+def _first(mask, offset, default):
+    if mask.size == 0:
+        return default
+    j = int(mask.argmax())
+    return offset + j if mask[j] else default
+
+def run_backtest(bars, params=StrategyParams(), reservoir=None):
+    """
+    봉 데이터에 전략 규칙을 적용.
+    StrategyEngine 을 replay_bars 로 재생한 결과와는 다음이 다르다 (목표 수익 / 예산 소진 없이 분할 매수만 하는 구간은 같다):
+      - 0.5회차: 첫 매수 기준가가 첫 봉 시가이고 첫 봉부터 LOC 시점 전 봉까지 체결 판정
+        (엔진은 첫 틱 가격 = 첫 봉 종가로 주문하고, 다음 봉부터 LOC 시점 봉까지 체결)
+      - LOC 기준가: LOC 시점 봉의 시가 (엔진은 그 시점 현재가 = 봉 종가)
+      - 사용 회차가 split_no * 2 에 닿으면 0.5회차 / LOC 를 더 내지 않음 (엔진은 계속 주문하고 예산 소진 판단만 멈춤)
+      - 목표 수익: 봉 고가로 판단해 그 봉에 체결 (엔진은 틱 가격으로 판단하고 다음 봉 시가에 체결)
+      - 예산 소진: 남은 예산에서 미체결 주문 금액을 빼지 않음
+    :param bars: lib.ohlcv.Bars
+    :param params: StrategyParams
+    :param reservoir: 총 예산 (기본: split_no * 2 * 첫 종가 * qty, main_trading_loop 과 동일)
+    """
+    ts, o, h, l, c = bars.ts, bars.open, bars.high, bars.low, bars.close
+    n = len(ts)
+    starts, ends = day_bounds(ts)
+    loc_starts = loc_start_index(ts, starts, ends, int(params.loc_window_min * NS_PER_MIN))
+    qty = params.qty
+    max_split = params.split_no * 2
+    if reservoir is None:
+        reservoir = max_split * float(c[0]) * qty if n else 0.0
+
+    pos = 0.0
+    avg = 0.0
+    used = 0
+    fills = []          # (ts, bar, side, price, qty, reason)
+    states = []         # 체결 직후 (avg, used)
+    exhausted_ts = None
+
+    def fill(k, side, price, amount, reason):
+        fills.append((ts[k], k, side, price, amount, reason))
+        states.append((avg, used))
+
+    for s, e, ls in zip(starts.tolist(), ends.tolist(), loc_starts.tolist()):
+        half_end = max(ls, s + 1)
+        half_price = avg if pos > 0 else o[s]
+        half_pending = used < max_split
+        sold = False
+        i = s
+        while i < e:
+            remain = reservoir - pos * avg
+            tp = _first(h[i:e] >= avg * params.take_profit, i, e) if pos > 0 else e
+            ex = _first(c[i:e] * qty > remain, i, e) if used < max_split else e
+            hf = _first(l[i:half_end] <= half_price, i, e) if half_pending and i < half_end else e
+            k = min(tp, ex, hf)
+            if k >= e:
+                break
+            if k == tp:
+                # 목표 수익 도달: 전량 매도 (갭 상승이면 시가)
+                price = max(o[k], avg * params.take_profit)
+                amount, pos, avg, used = pos, 0.0, 0.0, 0
+                fill(k, -1, price, amount, "tp")
+                sold = True
+                break
+            if k == ex:
+                if pos > 0 and c[k] >= avg * params.loss_floor:
+                    # 원금 소진 조건 충족: 전량 매도
+                    amount, pos, avg, used = pos, 0.0, 0.0, 0
+                    fill(k, -1, c[k], amount, "floor")
+                    sold = True
+                else:
+                    # 잔고 부족: 추가 매수 불가, 종료
+                    exhausted_ts = int(ts[k])
+                break
+            # 0.5회차 지정가 체결 (갭 하락이면 시가)
+            price = min(o[k], half_price)
+            avg = (avg * pos + price * qty) / (pos + qty)
+            pos += qty
+            used += 1
+            half_pending = False
+            fill(k, 1, price, qty, "half")
+            i = k + 1
+
+        if exhausted_ts is not None:
+            break
+        if sold or used >= max_split:
+            continue
+        # LOC: 마감 window 전 시점 가격(해당 봉 시가)으로 상한을 정하고 종가로 체결
+        limit = o[ls] if pos == 0 else min(o[ls], avg * params.loc_cap)
+        last = e - 1
+        if c[last] <= limit and reservoir - pos * avg >= c[last] * qty:
+            avg = (avg * pos + c[last] * qty) / (pos + qty)
+            pos += qty
+            used += 1
+            fill(last, 1, c[last], qty, "loc")
+
+    fills = np.array(fills, dtype=FILL_DTYPE)
+    return _build_result(bars, params, reservoir, fills, states, exhausted_ts)
+
+def _build_result(bars, params, reservoir, fills, states, exhausted_ts):
+    """체결 목록에서 봉 단위 포지션 / 평단가 / 회차 / 현금 / 평가금액 배열 생성"""
+    n = len(bars)
+    signed_qty = fills["side"] * fills["qty"]
+    pos_delta = np.zeros(n)
+    cash_delta = np.zeros(n)
+    np.add.at(pos_delta, fills["bar"], signed_qty)
+    np.add.at(cash_delta, fills["bar"], -signed_qty * fills["price"])
+    position = np.cumsum(pos_delta)
+    cash = reservoir + np.cumsum(cash_delta)
+
+    state_arr = np.array(states, dtype=np.float64).reshape(-1, 2)
+    last_fill = np.searchsorted(fills["bar"], np.arange(n), side="right") - 1
+    has_fill = last_fill >= 0
+    avg_price = np.where(has_fill, state_arr[last_fill.clip(0), 0] if len(state_arr) else 0.0, 0.0)
+    used_split = np.where(has_fill, state_arr[last_fill.clip(0), 1] if len(state_arr) else 0, 0).astype(np.int64)
+
+    return BacktestResult(
+        symbol=bars.symbol, params=params, reservoir=float(reservoir),
+        ts=bars.ts, close=bars.close, fills=fills,
+        position=position, avg_price=avg_price, used_split=used_split,
+        cash=cash, equity=cash + position * bars.close, exhausted_ts=exhausted_ts,
+    )
+
+def add_param_arguments(parser):
+    defaults = StrategyParams()
+    parser.add_argument("--splits", type=int, default=defaults.split_no, help="분할 매수 횟수")
+    parser.add_argument("--take-profit", type=float, default=defaults.take_profit, help="전량 매도 배수")
+    parser.add_argument("--loss-floor", type=float, default=defaults.loss_floor, help="예산 소진 시 매도 하한 배수")
+    parser.add_argument("--loc-cap", type=float, default=defaults.loc_cap, help="LOC 주문가 상한 배수")
+    parser.add_argument("--loc-window", type=float, default=defaults.loc_window_min, help="LOC 주문 시점 (마감 n분 전)")
+    parser.add_argument("--qty", type=int, default=defaults.qty, help="회차당 주문 수량")
+
+def params_from_args(args):
+    return StrategyParams(args.splits, args.take_profit, args.loss_floor, args.loc_cap, args.loc_window, args.qty)
+
+def write_fills(path, result):
+    import csv
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["ts", "side", "price", "qty", "reason"])
+        for row in result.fills:
+            writer.writerow([np.datetime64(int(row["ts"]), "ns"), "BUY" if row["side"] > 0 else "SELL",
+                             f"{row['price']:.4f}", row["qty"], row["reason"]])
+
+def write_equity(path, result):
+    import csv
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["ts", "close", "position", "avg_price", "used_split", "cash", "equity"])
+        for i in range(len(result.ts)):
+            writer.writerow([np.datetime64(int(result.ts[i]), "ns"), result.close[i], result.position[i],
+                             round(result.avg_price[i], 4), result.used_split[i],
+                             round(result.cash[i], 4), round(result.equity[i], 4)])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="무한매수법 백테스트 (yfinance CSV)")
+    parser.add_argument("files", nargs="+", help="yfinance 포맷 CSV 파일 (--store 지정 시 종목@간격)")
+    parser.add_argument("--store", type=str, default=None, help="봉 데이터 저장소 디렉터리 (lib.bar_store)")
+    add_param_arguments(parser)
+    parser.add_argument("--fills", type=str, default=None, help="체결 내역 CSV 저장 경로 (파일 1개일 때)")
+    parser.add_argument("--equity", type=str, default=None, help="봉 단위 평가금액 CSV 저장 경로 (파일 1개일 때)")
+    args = parser.parse_args(argv)
+    params = params_from_args(args)
+
+    for path in args.files:
+        bars = load_bars(path, args.store)
+        start = time.perf_counter()
+        result = run_backtest(bars, params)
+        elapsed = time.perf_counter() - start
+        summary = result.summary()
+        summary["elapsed_ms"] = round(elapsed * 1000, 3)
+        print(path, summary)
+        if args.fills:
+            write_fills(args.fills, result)
+        if args.equity:
+            write_equity(args.equity, result)
+    print("params:", asdict(params))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import logging
+import threading
+import time
+from lib.broker_api import Position, positions_from_balance, check_response
+# --------------- 계좌 잔고 캐시 ---------------
+# 평단가 / 보유 수량은 체결이 있을 때만 바뀌므로 매 틱 fetch_present_balance 를 호출할 필요가 없다.
+# 계좌별 스냅샷을 TTL 동안 재사용하고, 주문 생성 / 취소 / 체결 시 invalidate() 로 즉시 무효화한다.
+# 스냅샷은 종목별 Position 으로 색인되어 있어 조회는 dict 조회 한 번.
+# 실패 응답(EGW00201 초당 거래건수 초과 등)은 캐시하지 않고 BrokerError 를 올린다.
+# ("보유 없음" 으로 저장되면 TTL 동안 엔진의 수량 / 평단가가 0 으로 덮이고, 미체결 매도가 체결로 보인다)
+
+log = logging.getLogger(__name__)
+
+class BalanceCache:
+    """
+    :param broker: fetch_present_balance() 를 제공하는 broker
+    :param ttl: 스냅샷 유효 시간 (초)
+    :param account: 계좌 키 (기본: broker.acc_no)
+    """
+    def __init__(self, broker, ttl=30.0, account=None, clock=time.monotonic):
+        self.broker = broker
+        self.ttl = ttl
+        self.account = account or getattr(broker, "acc_no", "default")
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._snapshots = {}    # account -> (조회 시각, {symbol: Position})
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def positions(self, account=None):
+        """계좌의 {종목: Position}. 만료됐거나 무효화됐으면 새로 조회 (실패 응답이면 BrokerError, 캐시 유지)"""
+        account = account or self.account
+        with self._lock:
+            snapshot = self._snapshots.get(account)
+            if snapshot is not None and self.clock() - snapshot[0] < self.ttl:
+                self.stats["hits"] += 1
+                return snapshot[1]
+            self.stats["misses"] += 1
+            positions = positions_from_balance(check_response(self.broker.fetch_present_balance()))
+            self._snapshots[account] = (self.clock(), positions)
+            return positions
+
+    def position(self, symbol, account=None):
+        """종목의 Position (보유하지 않으면 수량 0)"""
+        return self.positions(account).get(symbol) or Position(symbol)
+
+    def invalidate(self, account=None):
+        """주문 생성 / 취소 / 체결 후 호출. 다음 조회 때 잔고를 새로 가져온다."""
+        with self._lock:
+            self.stats["invalidations"] += 1
+            self._snapshots.pop(account or self.account, None)
@@ -0,0 +1,258 @@
+import argparse
+import os
+import threading
+import time
+import numpy as np
+from lib.ohlcv import Bars, FIELDS, NS_PER_DAY, load_yf_csv, day_bounds, bar_interval
+# --------------- 열 단위 봉 데이터 저장소 ---------------
+# yfinance CSV 를 매번 pandas 로 파싱하는 대신, 종목 / UTC 날짜별 디렉터리에 열마다 raw 바이너리 파일을 둔다.
+#
+#   <root>/<SERIES>/<YYYY-MM-DD>/ts.i8       UTC epoch 나노초 int64 (오름차순)
+#   <root>/<SERIES>/<YYYY-MM-DD>/open.f8 ... high / low / close / volume float64
+#
+# SERIES 는 "종목@간격" (TSLL@1m, 005930.KQ@1d, 실시간 현재가는 TSLL@tick). 같은 종목이라도 봉 간격이 다르면 따로 둔다.
+#
+# - 헤더가 없는 고정 폭 배열이므로 np.memmap 으로 복사 없이 읽고, 추가는 보통 파일 끝에 append 만 한다
+# - 날짜의 마지막 시각 이전 봉은 이미 있는 시각이면 버리고 (같은 CSV 를 다시 넣어도 안전),
+#   없는 시각이면 (장중 빈 구간을 나중에 받은 경우) 그 날짜만 합쳐서 다시 쓴다
+# - 쓰는 중 종료되어 열 길이가 다르면 다음에 열 때 가장 짧은 길이로 맞춘다
+# 미국장(13:30~21:00 UTC) / 한국장(00:00~06:30 UTC) 모두 UTC 하루 안에 끝나므로 날짜 = 세션.
+
+COLUMNS = (("ts", np.int64),) + tuple((f, np.float64) for f in FIELDS)
+EXT = {np.int64: "i8", np.float64: "f8"}
+
+def series_name(symbol, interval):
+    return f"{symbol}@{interval}"
+
+def interval_label(bars):
+    """봉 간격 이름 (1m, 5m, 1h, 1d ...)"""
+    starts, ends = day_bounds(bars.ts)
+    seconds = bar_interval(bars.ts, starts, ends) // 10**9
+    for unit, size in (("d", 86_400), ("h", 3_600), ("m", 60)):
+        if seconds >= size and seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
+
+def _day_name(day):
+    return np.datetime64(int(day), "D").astype(str)
+
+def _day_of(name):
+    return int(np.datetime64(name, "D").astype(np.int64))
+
+class BarStore:
+    """
+    :param root: 저장소 디렉터리 (없으면 생성)
+    """
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self._last_ts = {}      # (series, day) -> 저장된 마지막 ts
+        os.makedirs(root, exist_ok=True)
+
+    def series(self):
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def days(self, series):
+        """저장된 날짜 (epoch 일 번호) 목록, 오름차순"""
+        path = os.path.join(self.root, series)
+        if not os.path.isdir(path):
+            return []
+        return sorted(_day_of(name) for name in os.listdir(path))
+
+    def _day_path(self, series, day):
+        return os.path.join(self.root, series, _day_name(day))
+
+    def _column_path(self, day_path, name, dtype):
+        return os.path.join(day_path, f"{name}.{EXT[dtype]}")
+
+    def _length(self, day_path):
+        """날짜 디렉터리의 봉 개수. 열 길이가 다르면 (append 중 종료) 가장 짧은 길이로 자른다."""
+        lengths = []
+        for name, dtype in COLUMNS:
+            path = self._column_path(day_path, name, dtype)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            lengths.append(size // np.dtype(dtype).itemsize)
+        n = min(lengths)
+        if max(lengths) != n:
+            for name, dtype in COLUMNS:
+                path = self._column_path(day_path, name, dtype)
+                if os.path.exists(path):
+                    os.truncate(path, n * np.dtype(dtype).itemsize)
+        return n
+
+    def _read_day(self, series, day, mmap=True):
+        # mmap=False 면 바로 읽어서 복사 (여러 날을 이어 붙일 때는 어차피 복사하므로 memmap 생성 비용을 아낀다)
+        day_path = self._day_path(series, day)
+        n = self._length(day_path)
+        columns = []
+        for name, dtype in COLUMNS:
+            path = self._column_path(day_path, name, dtype)
+            if n == 0:
+                columns.append(np.empty(0, dtype=dtype))
+            elif mmap:
+                columns.append(np.memmap(path, dtype=dtype, mode="r", shape=(n,)))
+            else:
+                columns.append(np.fromfile(path, dtype=dtype, count=n))
+        return columns
+
+    def _last(self, series, day):
+        key = (series, day)
+        if key not in self._last_ts:
+            ts = self._read_day(series, day)[0]
+            self._last_ts[key] = int(ts[-1]) if len(ts) else None
+        return self._last_ts[key]
+
+    def append(self, series, bars):
+        """
+        Bars 를 날짜별로 나눠 series 에 추가. 날짜의 마지막 시각 이후 봉만 기록한다.
+        :return: 기록한 봉 수
+        """
+        if len(bars) == 0:
+            return 0
+        ts = np.asarray(bars.ts, dtype=np.int64)
+        day = ts // NS_PER_DAY
+        cuts = np.flatnonzero(np.diff(day)) + 1
+        written = 0
+        with self._lock:
+            for s, e in zip(np.r_[0, cuts].tolist(), np.r_[cuts, len(ts)].tolist()):
+                d = int(day[s])
+                last = self._last(series, d)
+                if last is not None:
+                    tail = s + int(np.searchsorted(ts[s:e], last, side="right"))
+                    if tail > s:
+                        existing = self._read_day(series, d, mmap=False)
+                        if not np.isin(ts[s:tail], existing[0]).all():
+                            written += self._merge(series, d, existing, bars, s, e)
+                            continue
+                    s = tail
+                if s >= e:
+                    continue
+                day_path = self._day_path(series, d)
+                os.makedirs(day_path, exist_ok=True)
+                for name, dtype in COLUMNS:
+                    with open(self._column_path(day_path, name, dtype), "ab") as f:
+                        f.write(np.ascontiguousarray(getattr(bars, name)[s:e], dtype=dtype).tobytes())
+                self._last_ts[(series, d)] = int(ts[e - 1])
+                written += e - s
+        return written
+
+    def _merge(self, series, day, existing, bars, s, e):
+        """
+        날짜의 기존 봉과 bars[s:e] 중 없는 시각의 봉을 합쳐 시각 순으로 다시 쓴다 (self._lock 안에서 호출).
+        열마다 임시 파일에 쓰고 교체하므로, 중간에 종료되어도 열 길이 차이는 다음에 열 때 잘린다.
+        :return: 새로 기록한 봉 수
+        """
+        new = ~np.isin(bars.ts[s:e], existing[0])
+        order = np.argsort(np.concatenate([existing[0], np.asarray(bars.ts[s:e])[new]]), kind="stable")
+        day_path = self._day_path(series, day)
+        for (name, dtype), column in zip(COLUMNS, existing):
+            merged = np.concatenate([column, np.asarray(getattr(bars, name)[s:e], dtype=dtype)[new]])[order]
+            path = self._column_path(day_path, name, dtype)
+            merged.tofile(path + ".tmp")
+            os.replace(path + ".tmp", path)
+        self._last_ts[(series, day)] = max(int(existing[0][-1]), int(bars.ts[e - 1]))
+        return int(new.sum())
+
+    def query(self, series, start=None, end=None):
+        """
+        series 의 [start, end) 구간 봉 (ts 는 UTC epoch 나노초, 생략하면 처음 / 끝까지).
+        하루 안의 조회는 memmap 을 그대로 잘라서 반환 (복사 없음), 여러 날은 이어 붙인다.
+        """
+        symbol = series.split("@")[0]
+        days = self.days(series)
+        if start is not None:
+            days = [d for d in days if d >= start // NS_PER_DAY]
+        if end is not None:
+            days = [d for d in days if d * NS_PER_DAY < end]
+        parts = []
+        for d in days:
+            columns = self._read_day(series, d, mmap=len(days) == 1)
+            ts = columns[0]
+            lo = int(np.searchsorted(ts, start)) if start is not None else 0
+            hi = int(np.searchsorted(ts, end)) if end is not None else len(ts)
+            if hi > lo:
+                parts.append([c[lo:hi] for c in columns])
+        if not parts:
+            return Bars(symbol, *(np.empty(0, dtype=dtype) for _, dtype in COLUMNS))
+        if len(parts) == 1:
+            return Bars(symbol, *parts[0])
+        return Bars(symbol, *(np.concatenate(cols) for cols in zip(*parts)))
+
+    def ingest_csv(self, path, symbol=None):
+        """yfinance 포맷 CSV 를 저장소에 추가. :return: (series, 기록한 봉 수)"""
+        bars = load_yf_csv(path, symbol)
+        series = series_name(bars.symbol, interval_label(bars))
+        return series, self.append(series, bars)
+
+def load_bars(name, root=None):
+    """root 가 있으면 저장소의 series (예: TSLL@1m), 없으면 yfinance CSV 경로로 보고 로딩"""
+    if root is None:
+        return load_yf_csv(name)
+    return BarStore(root).query(name)
+
+class TickRecorder:
+    """
+    트레이딩 루프의 현재가를 모아서 저장소에 기록 (가격 하나 = o/h/l/c 가 같은 봉).
+    StrategyEngine 리스너로 붙이면 PriceTick 을 이벤트 시각(시뮬레이션이면 가상 시각)으로 기록한다.
+    (lib.strategy 를 import 하지 않도록 price / remain 속성이 있는 이벤트를 현재가로 본다)
+    :param flush_every: 이 개수만큼 모이면 기록
+    """
+    def __init__(self, store, flush_every=100):
+        self.store = store
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._buffer = {}       # symbol -> [(ts, price, volume)]
+        self._count = 0
+
+    def record(self, symbol, price, volume=0.0, ts=None):
+        with self._lock:
+            self._buffer.setdefault(symbol, []).append((ts or time.time_ns(), price, volume))
+            self._count += 1
+            full = self._count >= self.flush_every
+        if full:
+            self.flush()
+
+    def __call__(self, engine, event):
+        if hasattr(event, "remain"):
+            self.record(engine.symbol, event.price, ts=int(event.ts * 1_000_000_000))
+
+    def flush(self):
+        with self._lock:
+            buffer, self._buffer, self._count = self._buffer, {}, 0
+        for symbol, ticks in buffer.items():
+            ts, price, volume = (np.array(col) for col in zip(*ticks))
+            price = price.astype(np.float64)
+            bars = Bars(symbol, ts.astype(np.int64), price, price, price, price, volume.astype(np.float64))
+            self.store.append(series_name(symbol, "tick"), bars)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="봉 데이터 저장소 (yfinance CSV 가져오기 / 조회)")
+    parser.add_argument("root", help="저장소 디렉터리")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="CSV 가져오기 (이미 있는 구간은 건너뜀)")
+    ingest.add_argument("files", nargs="+")
+    ingest.add_argument("--symbol", default=None, help="종목 코드 (생략 시 CSV 의 Ticker 행)")
+    query = sub.add_parser("query", help="구간 조회")
+    query.add_argument("series", help="종목@간격 (예: TSLL@1m)")
+    query.add_argument("--start", default=None, help="시작 시각 (UTC, 예: 2025-03-06)")
+    query.add_argument("--end", default=None, help="끝 시각 (UTC, 포함하지 않음)")
+    args = parser.parse_args(argv)
+
+    store = BarStore(args.root)
+    if args.command == "ingest":
+        for path in args.files:
+            started = time.perf_counter()
+            series, written = store.ingest_csv(path, args.symbol)
+            print(f"{path}: {series} {written} bars ({(time.perf_counter() - started) * 1000:.1f}ms)")
+    else:
+        to_ns = lambda s: int(np.datetime64(s, "ns").astype(np.int64)) if s else None
+        started = time.perf_counter()
+        bars = store.query(args.series, to_ns(args.start), to_ns(args.end))
+        elapsed = (time.perf_counter() - started) * 1000
+        if len(bars):
+            print(f"{bars!r} {np.datetime64(int(bars.ts[0]), 'ns')} ~ {np.datetime64(int(bars.ts[-1]), 'ns')} ({elapsed:.2f}ms)")
+        else:
+            print(f"{bars!r} ({elapsed:.2f}ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+import logging
+from lib.log import fields
+# --------------- 글로벌 함수 (broker 함수 호출 래퍼) ---------------
+# 아래 함수들은 mojito 모듈의 API 함수를 이용하여 실제 API와 통신하는 방식으로 구현됩니다.
+# 이 함수들은 메인 트레이딩 루프(demo0.0.2.py) 와 포트폴리오 러너(lib/portfolio.py) 에서 호출됩니다.
+
+log = logging.getLogger(__name__)
+
+class BrokerError(Exception):
+    """조회 응답이 실패(rt_cd != "0") 또는 모양이 다름. 호출한 틱은 건너뛴다 (응답을 데이터로 쓰지 않음)"""
+    def __init__(self, response):
+        super().__init__(f"{response.get('msg_cd')} {response.get('msg1')}")
+        self.response = response
+
+def check_response(response):
+    """성공 응답(rt_cd == "0")이면 그대로 반환, 아니면 BrokerError"""
+    if not isinstance(response, dict):
+        raise BrokerError({"msg1": f"잘못된 응답: {response!r}"})
+    if response.get("rt_cd") != "0":
+        raise BrokerError(response)
+    return response
+
+class OrderError(BrokerError):
+    """주문 / 취소 응답이 실패(rt_cd != "0")"""
+
+def parse_present_price(response):
+    """
+    현재가 (해외주식 현재체결가 응답의 output.last).
+    실패 응답 / 가격이 없는 응답이면 BrokerError: 기본값으로 판단하면 가짜 가격에 전량 매도할 수 있다.
+    """
+    output = check_response(response).get("output") or {}
+    try:
+        price = float(output.get("last") or response.get("current_price") or 0)
+    except (TypeError, ValueError):
+        price = 0.0
+    if price <= 0:
+        raise BrokerError({"msg_cd": response.get("msg_cd"), "msg1": f"현재가 없음: {output!r}"})
+    return price
+
+def parse_order_no(response):
+    """주문 응답에서 주문번호(ODNO). 실패 응답이면 OrderError"""
+    if not isinstance(response, dict) or response.get("rt_cd") != "0":
+        raise OrderError(response if isinstance(response, dict) else {"msg1": str(response)})
+    return (response.get("output") or {}).get("ODNO")
+
+def parse_average_price(balance_response):
+    try:
+        avg_price = float(balance_response["output2"][0].get("avg_price", 95))
+    except Exception:
+        avg_price = 95.0
+    return avg_price
+
+def get_present_stock_price(broker, stock_name):
+    return parse_present_price(broker.fetch_price(stock_name))
+
+def get_average_my_stock_price(broker, stock_name):
+    balance_response = broker.fetch_present_balance()
+    position = positions_from_balance(balance_response).get(stock_name)
+    return position.avg_price if position is not None else parse_average_price(balance_response)
+
+def all_sell(broker, stock_name, quantity):
+    return broker.create_market_sell_order(stock_name, quantity)
+
+def order_info(broker, order_no):
+    """
+    주문체결내역에서 주문 하나의 체결 여부 / 체결 가격.
+    broker 가 fetch_orders(주문체결내역 조회)를 제공하지 않으면 체결 여부를 알 수 없으므로 미체결로 반환합니다
+    (OrderInquiry 로 감싸면 제공).
+    """
+    if not hasattr(broker, "fetch_orders"):
+        log.warning("broker 에 주문체결내역 조회(fetch_orders)가 없어 체결 여부를 확인할 수 없습니다",
+                    extra=fields(order_no=order_no))
+        return {"order_price": None, "체결여부": False}
+    for row in broker.fetch_orders().get("output") or []:
+        if row.get("odno") == order_no:
+            filled = float(row.get("ft_ccld_qty") or 0)
+            return {"order_price": float(row.get("ft_ccld_unpr3") or 0) or None,
+                    "체결여부": filled > 0 and float(row.get("nccs_qty") or 0) == 0}
+    return {"order_price": None, "체결여부": False}
+
+def half_order_info(broker , order_no):
+    return order_info(broker, order_no)
+
+def loc_order_info(broker , order_no):
+    return order_info(broker, order_no)
+
+def condition_order_avg(broker , stock_name, price, quantity=1):
+    return broker.create_limit_buy_order(stock_name, price, quantity)
+
+def loc_order(broker, stock_name, price, quantity=1):
+    """
+    LOC(장마감지정가, 주문구분 34) 매수 (기본 1주). 마감 가격이 지정가 이하면 종가로 체결.
+    mojito 는 모의투자 서버에서 LOC 를 지원하지 않아 지정가(00)로 보낸다.
+    """
+    return broker.create_oversea_order("buy", stock_name, price, quantity, "LOC")
+
+def cancel_order(broker , order_no, org_no, quantity, order_type="00", price=0):
+    """
+    주문 잔량 전부 취소.
+    org_no(주문 조직번호, 주문 응답의 KRX_FWDG_ORD_ORGNO) / 수량 / 주문 구분 / 가격은 원주문 값
+    (lib.order_manager.OrderManager 가 주문 시 기록해 둔 값)
+    """
+    return broker.cancel_order(org_no, order_no, quantity, True, order_type, price)
+
+# --------------- 잔고 응답 → 종목별 보유 현황 ---------------
+# 해외주식 잔고 응답의 종목 행은 API 에 따라 키 이름이 다르다.
+# (체결기준현재잔고: pdno / ccld_qty_smtl1 / avg_unpr3, 잔고: ovrs_pdno / ovrs_cblc_qty / pchs_avg_pric)
+
+SYMBOL_KEYS = ("ovrs_pdno", "pdno", "symbol")
+QTY_KEYS = ("ovrs_cblc_qty", "ccld_qty_smtl1", "hldg_qty", "quantity")
+AVG_KEYS = ("pchs_avg_pric", "avg_unpr3", "avg_price")
+
+class Position:
+    """한 종목의 보유 수량 / 평단가"""
+    __slots__ = ("symbol", "quantity", "avg_price")
+
+    def __init__(self, symbol, quantity=0.0, avg_price=0.0):
+        self.symbol = symbol
+        self.quantity = quantity
+        self.avg_price = avg_price
+
+    def __repr__(self):
+        return f"Position({self.symbol!r}, quantity={self.quantity}, avg_price={self.avg_price})"
+
+def _first_value(row, keys):
+    for key in keys:
+        value = row.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+def positions_from_balance(balance_response):
+    """잔고 응답(output1 / output2 의 종목 행)을 {종목: Position} 으로 변환"""
+    positions = {}
+    for section in ("output1", "output2"):
+        rows = balance_response.get(section) or []
+        if isinstance(rows, dict):
+            rows = [rows]
+        for row in rows:
+            symbol = _first_value(row, SYMBOL_KEYS)
+            if symbol is None:
+                continue
+            try:
+                quantity = float(_first_value(row, QTY_KEYS) or 0)
+                avg_price = float(_first_value(row, AVG_KEYS) or 0)
+            except ValueError:
+                log.warning("잔고 행 파싱 실패: %s", row)
+                continue
+            positions[symbol] = Position(symbol, quantity, avg_price)
+    return positions
+
+# --------------- 해외주식 주문체결내역 조회 (mojito 에 없는 API) ---------------
+# mojito.KoreaInvestment 에는 해외주식 주문체결내역(TTTS3035R, inquire-ccnl) 조회가 없어서
+# OrderManager.reconcile / lookup 이 실계좌에서 동작하지 않는다. OrderInquiry 로 감싸면 fetch_orders 가 생긴다.
+# 응답 output 행은 lib.fake_broker 의 Order.row() 와 같은 모양 (odno, ft_ccld_qty, nccs_qty ...).
+
+INQUIRE_CCNL_PATH = "uapi/overseas-stock/v1/trading/inquire-ccnl"
+EXCHANGE_CODES = {"나스닥": "NASD", "뉴욕": "NYSE", "아멕스": "AMEX"}
+MORE_PAGES = ("M", "F")     # 응답 헤더 tr_cont: 다음 페이지 있음
+
+class OrderInquiry:
+    """
+    mojito.KoreaInvestment 에 fetch_orders(주문체결내역 조회)를 추가하는 프록시.
+    알 수 없는 메서드/속성은 그대로 원래 broker 로 전달 (TokenGuard / ThrottledBroker 와 같은 프록시 방식).
+    :param broker: mojito.KoreaInvestment
+    :param days: 조회 기간 (현지 날짜 기준 오늘 포함 n일. 자정 전후 재시작 시 전날 주문도 찾도록 기본 2)
+    :param max_pages: 연속 조회 최대 페이지 수
+    """
+    def __init__(self, broker, days=2, max_pages=10, timeout=5.0):
+        self.broker = broker
+        self.days = days
+        self.max_pages = max_pages
+        self.timeout = timeout
+
+    def __getattr__(self, name):
+        return getattr(self.broker, name)
+
+    def fetch_orders(self, symbol=None):
+        """
+        해외주식 주문체결내역 (매수/매도, 체결/미체결 전체).
+        :param symbol: 종목 (생략 시 전체. 모의투자는 전체만 가능)
+        :return: {"rt_cd", "msg_cd", "msg1", "output": [행 ...]} (여러 페이지면 output 을 이어 붙임)
+        """
+        import requests
+        from datetime import datetime, timedelta
+        from lib.market_time import ET
+        broker = self.broker
+        today = datetime.now(ET).date()
+        mock = broker.mock
+        params = {
+            "CANO": broker.acc_no_prefix,
+            "ACNT_PRDT_CD": broker.acc_no_postfix,
+            "PDNO": "" if mock else (symbol or "%"),
+            "ORD_STRT_DT": (today - timedelta(days=self.days - 1)).strftime("%Y%m%d"),
+            "ORD_END_DT": today.strftime("%Y%m%d"),
+            "SLL_BUY_DVSN": "00",
+            "CCLD_NCCS_DVSN": "00",
+            "OVRS_EXCG_CD": "" if mock else EXCHANGE_CODES.get(broker.exchange, "%"),
+            "SORT_SQN": "DS",
+            "ORD_DT": "",
+            "ORD_GNO_BRNO": "",
+            "ODNO": "",
+            "CTX_AREA_NK200": "",
+            "CTX_AREA_FK200": "",
+        }
+        headers = {
+            "content-type": "application/json",
+            "authorization": broker.access_token,
+            "appKey": broker.api_key,
+            "appSecret": broker.api_secret,
+            "tr_id": "VTTS3035R" if mock else "TTTS3035R",
+            "tr_cont": "",
+        }
+        rows = []
+        for _ in range(self.max_pages):
+            res = requests.get(f"{broker.base_url}/{INQUIRE_CCNL_PATH}", headers=headers, params=params,
+                               timeout=self.timeout)
+            data = res.json()
+            if data.get("rt_cd") != "0":
+                return data
+            rows.extend(data.get("output") or [])
+            if res.headers.get("tr_cont") not in MORE_PAGES:
+                break
+            headers["tr_cont"] = "N"
+            params["CTX_AREA_NK200"] = data.get("ctx_area_nk200", "")
+            params["CTX_AREA_FK200"] = data.get("ctx_area_fk200", "")
+        else:
+            log.warning("주문체결내역 연속 조회 %d페이지 초과: 이후 주문은 생략", self.max_pages)
+        if symbol is not None:
+            rows = [row for row in rows if row.get("pdno") == symbol]
+        return {"rt_cd": "0", "msg_cd": data.get("msg_cd"), "msg1": data.get("msg1"), "output": rows}
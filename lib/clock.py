@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+# --------------- 시계 (실제 / 가상) ---------------
+# 트레이딩 루프와 lib/market_time 이 time.time() / time.sleep() 을 직접 부르지 않고 시계 객체를 거치게 한다.
+#   WallClock    : 실제 시간
+#   VirtualClock : sleep() 이 기다리지 않고 가상 시각만 앞으로 옮긴다.
+#                  장 시작 ~ 마감 ~ 다음 개장 대기까지 같은 루프 코드를 몇 초 만에 돌릴 수 있다.
+# set_clock() 으로 기본 시계를 바꾸면 clock 인수를 받지 않은 곳(market_time 함수 등)도 따라간다.
+
+log = logging.getLogger(__name__)
+
+class SimulationFinished(BaseException):
+    """가상 시각이 until 을 넘음. 루프의 except Exception 에 잡히지 않도록 BaseException 을 상속"""
+
+class WallClock:
+    def time(self):
+        """UTC epoch 초"""
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def now(self, tz=None):
+        return datetime.fromtimestamp(self.time(), tz)
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    async def async_sleep(self, seconds):
+        await asyncio.sleep(max(seconds, 0))
+
+class VirtualClock(WallClock):
+    """
+    :param start: 시작 시각 (UTC epoch 초 또는 tz-aware datetime)
+    :param until: 이 시각을 넘는 sleep 은 SimulationFinished (생략 시 무한)
+    :param on_advance: callback(epoch 초). 시각이 바뀔 때마다 호출 (FakeBroker.advance_to 등)
+    """
+    def __init__(self, start, until=None, on_advance=None):
+        self._now = start.timestamp() if isinstance(start, datetime) else float(start)
+        self.until = until.timestamp() if isinstance(until, datetime) else until
+        self.listeners = [on_advance] if on_advance else []
+        self.slept = 0.0        # 누적 가상 대기 시간 (초)
+
+    def time(self):
+        return self._now
+
+    def monotonic(self):
+        return self._now
+
+    def advance(self, seconds):
+        if seconds <= 0:
+            return
+        if self.until is not None and self._now + seconds > self.until:
+            self._now = self.until
+            raise SimulationFinished(self._now)
+        self._now += seconds
+        self.slept += seconds
+        for listener in self.listeners:
+            listener(self._now)
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    async def async_sleep(self, seconds):
+        self.advance(seconds)
+        await asyncio.sleep(0)     # 다른 태스크에 양보
+
+_clock = WallClock()
+
+def get_clock():
+    return _clock
+
+def set_clock(clock):
+    """기본 시계 교체. 이전 시계를 반환"""
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
@@ -0,0 +1,259 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from lib.ohlcv import Bars, FIELDS, NS_PER_DAY, load_yf_csv, write_yf_csv
+from lib.bar_store import BarStore, series_name
+from lib.log import fields
+# --------------- 과거 봉 데이터 다운로더 (캐시 + 증분 갱신) ---------------
+# 01_dev.ipynb 에서 yf.download 로 CSV 를 매번 통째로 덮어쓰던 것을 대신한다.
+#   - 봉은 lib.bar_store.BarStore 에 종목@간격 별로 쌓고, 이미 받은 구간은 <root>/<SERIES>.ranges.json 에 기록
+#   - 요청 구간에서 받은 구간을 뺀 나머지만 소스의 1회 요청 최대 길이로 나눠 요청
+#     (1분봉은 보존 기간이 30일이라, 주기적으로 돌리면 지난 데이터가 저장소에 남는다)
+#   - 아직 끝나지 않은 봉(현재 시각 - 간격 이후)은 저장하지 않고 다음 실행에서 다시 받는다
+#   - 장중 빈 구간을 나중에 받아도 BarStore.append 가 그 날짜에 합쳐 넣으므로, 받은 조각은 전부 저장된 구간이다
+#   - 여러 종목 / 간격은 스레드 풀에서 동시에 (jobs 개까지)
+# 소스는 fetch(symbol, interval, start, end) -> Bars 와 span / retention 을 가진 객체면 된다.
+#   YFinanceSource : yfinance (필요할 때만 import)
+#   CsvSource      : 디렉터리의 yfinance 포맷 CSV (네트워크 없는 테스트 / 재현용)
+
+log = logging.getLogger(__name__)
+
+INTERVAL_SECONDS = {"1m": 60, "2m": 120, "5m": 300, "15m": 900, "30m": 1_800, "60m": 3_600, "1h": 3_600,
+                    "90m": 5_400, "1d": 86_400, "5d": 432_000, "1wk": 604_800}
+
+def to_ns(text):
+    """'2025-03-06' / '2025-03-06 14:30' (UTC) → epoch 나노초"""
+    return int(np.datetime64(text, "ns").astype(np.int64))
+
+def _day_str(ns):
+    return str(np.datetime64(int(ns), "ns"))[:19].replace("T", " ")
+
+# --------------- 구간 연산 ([start, end) 나노초) ---------------
+
+def merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+def missing_ranges(covered, start, end):
+    """[start, end) 중 covered 에 없는 구간 목록"""
+    missing = []
+    cursor = start
+    for lo, hi in merge_ranges(covered):
+        if hi <= cursor:
+            continue
+        if lo >= end:
+            break
+        if lo > cursor:
+            missing.append((cursor, lo))
+        cursor = max(cursor, hi)
+    if cursor < end:
+        missing.append((cursor, end))
+    return missing
+
+def split_range(start, end, span):
+    """[start, end) 를 span 나노초 이하 조각으로 (span 이 None 이면 그대로)"""
+    if span is None:
+        return [(start, end)]
+    return [(lo, min(lo + span, end)) for lo in range(start, end, span)]
+
+# --------------- 소스 ---------------
+
+class YFinanceSource:
+    """
+    yfinance. 간격별 1회 요청 최대 길이(span)와 조회 가능한 과거(retention)는 Yahoo 제한에 맞춘다.
+    """
+    SPAN_DAYS = {"1m": 7, "2m": 59, "5m": 59, "15m": 59, "30m": 59, "60m": 729, "1h": 729, "90m": 59}
+    RETENTION_DAYS = {"1m": 29, "2m": 59, "5m": 59, "15m": 59, "30m": 59, "60m": 729, "1h": 729, "90m": 59}
+
+    def span(self, interval):
+        days = self.SPAN_DAYS.get(interval)
+        return days * NS_PER_DAY if days else None
+
+    def retention(self, interval):
+        days = self.RETENTION_DAYS.get(interval)
+        return days * NS_PER_DAY if days else None
+
+    def fetch(self, symbol, interval, start, end):
+        import yfinance as yf
+        frame = yf.download(symbol, start=_day_str(start), end=_day_str(end), interval=interval,
+                            progress=False, auto_adjust=False, threads=False)
+        return bars_from_frame(frame, symbol)
+
+def bars_from_frame(frame, symbol):
+    """
+    yf.download 결과(열이 (Price, Ticker) MultiIndex 일 수 있음)를 Bars 로.
+    열 이름을 소문자로 맞추고, 인덱스를 UTC 나노초로, 결측 행은 제외.
+    """
+    if getattr(frame.columns, "nlevels", 1) > 1:
+        frame = frame.xs(symbol, axis=1, level=-1) if symbol in frame.columns.get_level_values(-1) \
+            else frame.droplevel(-1, axis=1)
+    frame = frame.rename(columns=lambda name: str(name).strip().lower().replace(" ", "_"))
+    index = frame.index
+    index = index.tz_localize("UTC") if index.tz is None else index.tz_convert("UTC")
+    ts = index.as_unit("ns").asi8.astype(np.int64)
+    columns = {f: frame[f].to_numpy(dtype=np.float64) for f in FIELDS}
+    valid = ~np.isnan(columns["close"])
+    order = np.argsort(ts[valid], kind="stable")
+    return Bars(symbol, ts[valid][order], *(columns[f][valid][order] for f in FIELDS))
+
+class CsvSource:
+    """
+    디렉터리의 yfinance 포맷 CSV 를 소스로 사용 (파일 이름: pattern, 예: TSLL_1m.csv).
+    :param latency: 요청당 지연 (초, 동시 실행 확인용)
+    :param span_days: 1회 요청 최대 길이 (일, 생략 시 제한 없음)
+    """
+    def __init__(self, directory, pattern="{symbol}_{interval}.csv", latency=0.0, span_days=None):
+        self.directory = directory
+        self.pattern = pattern
+        self.latency = latency
+        self.span_days = span_days
+        self.requests = []      # (symbol, interval, start, end) - 요청 기록
+        self._lock = threading.Lock()
+        self._cache = {}
+
+    def span(self, interval):
+        return self.span_days * NS_PER_DAY if self.span_days else None
+
+    def retention(self, interval):
+        return None
+
+    def _bars(self, symbol, interval):
+        key = (symbol, interval)
+        with self._lock:
+            if key not in self._cache:
+                path = os.path.join(self.directory, self.pattern.format(symbol=symbol, interval=interval))
+                self._cache[key] = load_yf_csv(path, symbol) if os.path.exists(path) else None
+            return self._cache[key]
+
+    def fetch(self, symbol, interval, start, end):
+        with self._lock:
+            self.requests.append((symbol, interval, start, end))
+        if self.latency:
+            time.sleep(self.latency)
+        bars = self._bars(symbol, interval)
+        if bars is None:
+            raise FileNotFoundError(self.pattern.format(symbol=symbol, interval=interval))
+        lo, hi = np.searchsorted(bars.ts, [start, end])
+        return bars.slice(int(lo), int(hi))
+
+# --------------- 다운로더 ---------------
+
+class Downloader:
+    """
+    :param store: lib.bar_store.BarStore
+    :param source: YFinanceSource / CsvSource (fetch / span / retention)
+    :param jobs: 동시에 받을 종목@간격 수
+    :param clock: 현재 시각 함수 (epoch 초)
+    """
+    def __init__(self, store, source, jobs=4, clock=time.time):
+        self.store = store
+        self.source = source
+        self.jobs = jobs
+        self.clock = clock
+        self._lock = threading.Lock()
+
+    def _ranges_path(self, series):
+        return os.path.join(self.store.root, f"{series}.ranges.json")
+
+    def covered(self, series):
+        """이미 받은 구간 [[start, end), ...] (나노초)"""
+        try:
+            with open(self._ranges_path(series)) as f:
+                return [list(r) for r in json.load(f)["ranges"]]
+        except FileNotFoundError:
+            return []
+
+    def _mark(self, series, start, end):
+        with self._lock:
+            ranges = merge_ranges(self.covered(series) + [[start, end]])
+            path = self._ranges_path(series)
+            with open(path + ".tmp", "w") as f:
+                json.dump({"ranges": ranges}, f)
+            os.replace(path + ".tmp", path)
+
+    def plan(self, symbol, interval, start=None, end=None):
+        """받아야 할 요청 구간 목록 [(start, end)] (보존 기간 / 진행 중인 봉 / 1회 요청 길이 반영)"""
+        now = int(self.clock() * 1e9)
+        step = INTERVAL_SECONDS.get(interval, 60) * 10**9
+        retention = self.source.retention(interval)
+        # 끝나지 않은 봉은 받지 않는다
+        end = min(end if end is not None else now, now - now % step)
+        if start is None:
+            start = now - retention if retention else end - 365 * NS_PER_DAY
+        if retention:
+            start = max(start, now - retention)
+        if start >= end:
+            return []
+        span = self.source.span(interval)
+        return [piece for lo, hi in missing_ranges(self.covered(series_name(symbol, interval)), start, end)
+                for piece in split_range(lo, hi, span)]
+
+    def update(self, symbol, interval, start=None, end=None):
+        """
+        종목@간격 하나를 갱신. 실패한 조각은 구간을 기록하지 않으므로 다음 실행에서 다시 받는다.
+        :return: (series, 요청 수, 저장한 봉 수)
+        """
+        series = series_name(symbol, interval)
+        pieces = self.plan(symbol, interval, start, end)
+        written = 0
+        for i, (lo, hi) in enumerate(pieces):
+            try:
+                bars = self.source.fetch(symbol, interval, lo, hi)
+            except Exception as e:
+                # 없는 종목 / 지원하지 않는 간격 / 네트워크 오류: 남은 조각도 실패할 가능성이 높으므로 중단
+                log.warning("다운로드 실패: %s", e, extra=fields(series=series, start=_day_str(lo), end=_day_str(hi),
+                                                             skipped=len(pieces) - i - 1))
+                return series, i + 1, written
+            # 소스가 요청 밖(진행 중인 봉 등)을 돌려줘도 [lo, hi) 만 저장
+            a, b = np.searchsorted(bars.ts, [lo, hi])
+            written += self.store.append(series, bars.slice(int(a), int(b)))
+            self._mark(series, lo, hi)
+        return series, len(pieces), written
+
+    def update_all(self, symbols, intervals, start=None, end=None):
+        """종목 x 간격을 동시에 갱신. :return: [(series, 요청 수, 저장한 봉 수)]"""
+        tasks = [(symbol, interval) for symbol in symbols for interval in intervals]
+        with ThreadPoolExecutor(max_workers=max(min(self.jobs, len(tasks)), 1), thread_name_prefix="download") as pool:
+            return list(pool.map(lambda task: self.update(*task, start=start, end=end), tasks))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="과거 봉 데이터 다운로드 (받은 구간은 건너뜀)")
+    parser.add_argument("root", help="봉 데이터 저장소 디렉터리 (lib.bar_store)")
+    parser.add_argument("symbols", help="쉼표로 구분한 종목 (예: TSLL,SOXL)")
+    parser.add_argument("--interval", default="1m", help="쉼표로 구분한 봉 간격 (예: 1m,5m,1d)")
+    parser.add_argument("--start", default=None, help="시작 (UTC, 기본: 소스 보존 기간 처음)")
+    parser.add_argument("--end", default=None, help="끝 (UTC, 포함하지 않음, 기본: 지금)")
+    parser.add_argument("--source", default="yfinance", help="yfinance 또는 CSV 디렉터리 (csv:DIR)")
+    parser.add_argument("--jobs", type=int, default=4, help="동시 다운로드 수")
+    parser.add_argument("--export", default=None, help="받은 뒤 종목@간격 별 CSV 로 내보낼 디렉터리")
+    args = parser.parse_args(argv)
+
+    source = CsvSource(args.source[4:]) if args.source.startswith("csv:") else YFinanceSource()
+    store = BarStore(args.root)
+    downloader = Downloader(store, source, jobs=args.jobs)
+    symbols = [s.strip() for s in args.symbols.split(",") if s.strip()]
+    intervals = [s.strip() for s in args.interval.split(",") if s.strip()]
+    started = time.perf_counter()
+    results = downloader.update_all(symbols, intervals, to_ns(args.start) if args.start else None,
+                                    to_ns(args.end) if args.end else None)
+    for series, requests, written in results:
+        print(f"{series}: {requests} requests, {written} new bars")
+    print(f"elapsed: {time.perf_counter() - started:.2f}s")
+    if args.export:
+        os.makedirs(args.export, exist_ok=True)
+        for series, _, _ in results:
+            symbol, interval = series.split("@")
+            write_yf_csv(os.path.join(args.export, f"{symbol}_{interval}.csv"), store.query(series))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+import logging
+import random
+import threading
+import time
+import numpy as np
+# --------------- 로컬 KIS 브로커 시뮬레이터 ---------------
+# mojito.KoreaInvestment 의 해외주식 메서드 중 트레이딩 루프가 쓰는 것만 같은 이름 / 같은 응답 모양으로 구현한다.
+#   fetch_price, fetch_present_balance, create_limit_buy_order, create_market_sell_order, create_order,
+#   create_oversea_order (지정가 "00" / LOC), cancel_order
+#   fetch_orders (주문체결내역 조회, TTTS3035R 모양)
+# 가격은 기록된 봉(lib.ohlcv.Bars)에서 나오고, advance() 로 다음 봉으로 시간을 진행한다.
+#
+# 체결 모델 (FillModel)
+#   - 지정가 매수("00"): 현재가 이상이면 즉시 현재가로, 아니면 이후 봉의 저가가 닿을 때 min(시가, 지정가)로 체결
+#   - LOC 매수("34"): 그날 마지막 봉의 종가가 지정가 이하면 종가로 체결 (마지막 봉 중에 낸 주문도 포함)
+#   - 시장가 매도: 즉시 현재가 (slippage 배수 적용)
+#   - 당일 미체결 주문은 날짜가 바뀌면 만료
+# 네트워크 지연 / 오류는 latency, jitter, error_rate(ConnectionError), reject_rate(EGW00201 응답) 로 주입한다.
+
+log = logging.getLogger(__name__)
+
+ORG_NO = "01790"            # 한국거래소전송주문조직번호 (KRX_FWDG_ORD_ORGNO)
+ORDER_LIMIT = "00"
+ORDER_LOC = "34"
+OVERSEA_ORDER_TYPES = {"00": ORDER_LIMIT, "LOC": ORDER_LOC}    # create_oversea_order 의 order_type → 주문구분
+BUY = "02"                  # sll_buy_dvsn_cd
+SELL = "01"
+
+def _ok(output, msg_cd="MCA00000", msg="정상처리 되었습니다."):
+    return {"rt_cd": "0", "msg_cd": msg_cd, "msg1": msg, "output": output}
+
+def _error(msg_cd, msg):
+    return {"rt_cd": "1", "msg_cd": msg_cd, "msg1": msg}
+
+class FillModel:
+    """
+    :param slippage: 시장가 매도 체결가 배수 (0.001 이면 현재가보다 0.1% 낮게)
+    :param expire_daily: 날짜가 바뀌면 미체결 주문 만료
+    """
+    def __init__(self, slippage=0.0, expire_daily=True):
+        self.slippage = slippage
+        self.expire_daily = expire_daily
+
+    def on_submit(self, order, last):
+        """주문 접수 시 즉시 체결가 (없으면 None)"""
+        if order.side == SELL:
+            return last * (1 - self.slippage)
+        if order.order_type == ORDER_LIMIT and order.price >= last:
+            return last
+        return None
+
+    def on_bar(self, order, o, h, l, c, day_close):
+        """새 봉에서의 체결가 (없으면 None). day_close 는 그 봉이 그날 마지막 봉인지"""
+        if order.order_type == ORDER_LOC:
+            return c if day_close and c <= order.price else None
+        if l <= order.price:
+            return min(o, order.price)
+        return None
+
+class Order:
+    __slots__ = ("order_no", "symbol", "side", "order_type", "price", "quantity", "filled", "fill_price",
+                 "status", "ts")
+
+    def __init__(self, order_no, symbol, side, order_type, price, quantity, ts):
+        self.order_no = order_no
+        self.symbol = symbol
+        self.side = side
+        self.order_type = order_type
+        self.price = price
+        self.quantity = quantity
+        self.filled = 0
+        self.fill_price = 0.0
+        self.status = "접수"       # 접수 / 완료 / 취소 / 만료
+        self.ts = ts
+
+    @property
+    def open(self):
+        return self.status == "접수"
+
+    def row(self):
+        """주문체결내역 응답의 한 행"""
+        return {
+            "ord_dt": time.strftime("%Y%m%d", time.gmtime(self.ts / 1e9)),
+            "odno": self.order_no,
+            "ord_gno_brno": ORG_NO,
+            "orgn_odno": "",
+            "pdno": self.symbol,
+            "sll_buy_dvsn_cd": self.side,
+            "ord_dvsn": self.order_type,
+            "ft_ord_qty": str(self.quantity),
+            "ft_ord_unpr3": f"{self.price or 0:.4f}",
+            "ft_ccld_qty": str(self.filled),
+            "ft_ccld_unpr3": f"{self.fill_price:.4f}",
+            "nccs_qty": str(self.quantity - self.filled if self.open else 0),
+            "prcs_stat_name": self.status,
+        }
+
+class FakeBroker:
+    """
+    :param bars: {종목: Bars} 또는 Bars 목록. 모든 종목의 봉 시각을 합친 타임라인으로 진행
+    :param cash: 시작 예수금 (USD)
+    :param fill_model: FillModel
+    :param latency: 호출당 지연 (초)
+    :param jitter: 지연에 더할 최대 무작위 값 (초)
+    :param error_rate: 호출이 ConnectionError 로 실패할 확률
+    :param reject_rate: 초당 거래건수 초과(EGW00201) 응답을 돌려줄 확률
+    :param seed: 난수 시드 (오류 / 지연 재현)
+    :param sleep: 지연 함수 (기본 time.sleep)
+    :param start: 시작 시각 (UTC epoch 나노초, 기본: 타임라인 처음)
+    """
+    def __init__(self, bars, cash=1_000_000.0, fill_model=None, latency=0.0, jitter=0.0, error_rate=0.0,
+                 reject_rate=0.0, seed=0, sleep=time.sleep, acc_no="00000000-01", start=None):
+        if not isinstance(bars, dict):
+            bars = {b.symbol: b for b in bars}
+        self.bars = bars
+        self.cash = float(cash)
+        self.fill_model = fill_model or FillModel()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.reject_rate = reject_rate
+        self.sleep = sleep
+        self.acc_no = acc_no
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self.timeline = np.unique(np.concatenate([b.ts for b in bars.values()])) if bars else np.empty(0, np.int64)
+        self.step = 0 if start is None else max(int(np.searchsorted(self.timeline, start)), 0)
+        self._cursor = {s: self._index(b, self.now) for s, b in bars.items()} if len(self.timeline) else {}
+        self._day_last = {s: self._day_last_flags(b) for s, b in bars.items()}
+        self.positions = {}     # symbol -> [quantity, avg_price]
+        self.orders = {}        # order_no -> Order
+        self._resting = {}      # 미체결 주문 (order_no -> Order)
+        self._seq = 0
+        self.stats = {"calls": 0, "errors": 0, "rejects": 0, "orders": 0, "fills": 0, "cancels": 0}
+
+    @staticmethod
+    def _index(bars, ts):
+        return int(np.searchsorted(bars.ts, ts, side="right")) - 1
+
+    @staticmethod
+    def _day_last_flags(bars):
+        day = bars.ts // (86_400 * 10**9)
+        return np.r_[day[1:] != day[:-1], True]
+
+    # ---- 시간 ----
+
+    @property
+    def now(self):
+        """현재 시각 (UTC epoch 나노초)"""
+        return int(self.timeline[self.step])
+
+    def last(self, symbol):
+        i = self._cursor.get(symbol, -1)
+        if i < 0:
+            raise KeyError(symbol)
+        return float(self.bars[symbol].close[i])
+
+    def advance(self, steps=1):
+        """타임라인을 steps 만큼 진행하고 체결 모델 적용. 데이터가 끝나면 False"""
+        with self._lock:
+            for _ in range(steps):
+                if self.step + 1 >= len(self.timeline):
+                    return False
+                prev_day = self.now // (86_400 * 10**9)
+                self.step += 1
+                if self.fill_model.expire_daily and self.now // (86_400 * 10**9) != prev_day:
+                    for order in self._resting.values():
+                        order.status = "만료"
+                    self._resting.clear()
+                for symbol, bars in self.bars.items():
+                    start = self._cursor[symbol] + 1
+                    stop = self._index(bars, self.now) + 1
+                    for i in range(start, stop):
+                        self._match(symbol, bars, i)
+                    self._cursor[symbol] = stop - 1
+            return True
+
+    def advance_to(self, ts):
+        """
+        ts (UTC epoch 초) 이전의 마지막 봉까지 진행. lib.clock.VirtualClock 의 on_advance 로 사용.
+        :return: 진행한 봉 수
+        """
+        target = int(ts * 10**9)
+        with self._lock:
+            steps = int(np.searchsorted(self.timeline, target, side="right")) - 1 - self.step
+            if steps > 0:
+                self.advance(steps)
+            return max(steps, 0)
+
+    def _match(self, symbol, bars, i):
+        o, h, l, c = (float(bars.open[i]), float(bars.high[i]), float(bars.low[i]), float(bars.close[i]))
+        day_close = bool(self._day_last[symbol][i])
+        for order in list(self._resting.values()):
+            if order.symbol == symbol:
+                price = self.fill_model.on_bar(order, o, h, l, c, day_close)
+                if price is not None:
+                    self._fill(order, price)
+
+    def _fill(self, order, price):
+        position = self.positions.setdefault(order.symbol, [0, 0.0])
+        qty = order.quantity
+        if order.side == BUY:
+            position[1] = (position[0] * position[1] + qty * price) / (position[0] + qty)
+            position[0] += qty
+            self.cash -= qty * price
+        else:
+            position[0] -= qty
+            if position[0] == 0:
+                position[1] = 0.0
+            self.cash += qty * price
+        order.filled = qty
+        order.fill_price = price
+        order.status = "완료"
+        self._resting.pop(order.order_no, None)
+        self.stats["fills"] += 1
+
+    # ---- 네트워크 흉내 ----
+
+    def _call(self):
+        with self._lock:
+            self.stats["calls"] += 1
+            delay = self.latency + (self._random.random() * self.jitter if self.jitter else 0.0)
+            error = self.error_rate and self._random.random() < self.error_rate
+            reject = not error and self.reject_rate and self._random.random() < self.reject_rate
+            if error:
+                self.stats["errors"] += 1
+            if reject:
+                self.stats["rejects"] += 1
+        if delay:
+            self.sleep(delay)
+        if error:
+            raise ConnectionError("fake broker: injected network error")
+        if reject:
+            return _error("EGW00201", "초당 거래건수를 초과하였습니다.")
+        return None
+
+    # ---- mojito.KoreaInvestment 호환 메서드 ----
+
+    def fetch_price(self, symbol):
+        rejected = self._call()
+        if rejected:
+            return rejected
+        with self._lock:
+            i = self._cursor.get(symbol, -1)
+            if i < 0:
+                return _error("APBK0656", "해당종목정보가 없습니다.")
+            bars = self.bars[symbol]
+            base = float(bars.close[i - 1]) if i > 0 else float(bars.open[i])
+            return _ok({"rsym": f"DNAS{symbol}", "last": f"{float(bars.close[i]):.4f}", "base": f"{base:.4f}",
+                        "tvol": str(int(bars.volume[i]))})
+
+    def fetch_present_balance(self):
+        rejected = self._call()
+        if rejected:
+            return rejected
+        with self._lock:
+            rows = [{"ovrs_pdno": symbol, "ovrs_cblc_qty": str(qty), "pchs_avg_pric": f"{avg:.4f}",
+                     "now_pric2": f"{self.last(symbol):.4f}"}
+                    for symbol, (qty, avg) in self.positions.items() if qty > 0]
+            return {"rt_cd": "0", "msg_cd": "MCA00000", "msg1": "정상처리 되었습니다.",
+                    "output1": rows, "output2": {"frcr_dncl_amt_2": f"{self.cash:.2f}"}}
+
+    def create_order(self, side, symbol, price, quantity, order_type=ORDER_LIMIT):
+        """side: "buy" / "sell" (mojito 와 같은 인수 순서)"""
+        rejected = self._call()
+        if rejected:
+            return rejected
+        with self._lock:
+            if self._cursor.get(symbol, -1) < 0:
+                return _error("APBK0656", "해당종목정보가 없습니다.")
+            side = BUY if side == "buy" else SELL
+            quantity = int(quantity)
+            if quantity <= 0:
+                return _error("APBK0918", "주문수량을 확인하세요.")
+            if side == BUY and price * quantity > self.cash:
+                return _error("APBK0952", "주문가능금액을 초과 했습니다.")
+            if side == SELL and quantity > self.positions.get(symbol, [0])[0]:
+                return _error("APBK0986", "주문가능수량을 초과 했습니다.")
+            self._seq += 1
+            order = Order(f"{self._seq:010d}", symbol, side, order_type, price, quantity, self.now)
+            self.orders[order.order_no] = order
+            self.stats["orders"] += 1
+            fill = self.fill_model.on_submit(order, self.last(symbol))
+            i = self._cursor[symbol]
+            if fill is None and order.order_type == ORDER_LOC and self._day_last[symbol][i]:
+                # 그날 마지막 봉에 낸 LOC: 뒤에 봉이 없으므로 이 봉의 종가(= 마감 가격)로 판정
+                bars = self.bars[symbol]
+                fill = self.fill_model.on_bar(order, float(bars.open[i]), float(bars.high[i]), float(bars.low[i]),
+                                              float(bars.close[i]), True)
+            if fill is not None:
+                self._fill(order, fill)
+            else:
+                self._resting[order.order_no] = order
+            return _ok({"KRX_FWDG_ORD_ORGNO": ORG_NO, "ODNO": order.order_no,
+                        "ORD_TMD": time.strftime("%H%M%S", time.gmtime(self.now / 1e9))},
+                       msg_cd="APBK0013", msg="주문 전송 완료 되었습니다.")
+
+    def create_limit_buy_order(self, symbol, price, quantity):
+        return self.create_order("buy", symbol, price, quantity, ORDER_LIMIT)
+
+    def create_market_sell_order(self, symbol, quantity):
+        return self.create_order("sell", symbol, None, quantity, ORDER_LIMIT)
+
+    def create_oversea_order(self, side, symbol, price, quantity, order_type):
+        """order_type: "00" (지정가) / "LOC". 그 외(LOO / MOO / MOC)는 시뮬레이션하지 않음"""
+        if order_type not in OVERSEA_ORDER_TYPES:
+            raise ValueError(f"fake broker: unsupported order type {order_type!r}")
+        return self.create_order(side, symbol, price, quantity, OVERSEA_ORDER_TYPES[order_type])
+
+    def cancel_order(self, org_no, order_no, quantity, total, order_type="00", price=100):
+        rejected = self._call()
+        if rejected:
+            return rejected
+        with self._lock:
+            order = self.orders.get(order_no)
+            if order is None or org_no != ORG_NO:
+                return _error("APBK0551", "원주문정보가 존재하지 않습니다.")
+            if not order.open:
+                return _error("APBK0555", "정정취소 가능수량이 없습니다.")
+            order.status = "취소"
+            self._resting.pop(order_no, None)
+            self.stats["cancels"] += 1
+            return _ok({"KRX_FWDG_ORD_ORGNO": ORG_NO, "ODNO": order_no}, msg_cd="APBK0013",
+                       msg="주문 전송 완료 되었습니다.")
+
+    def fetch_orders(self, symbol=None):
+        """당일 주문체결내역 (종목 생략 시 전체)"""
+        rejected = self._call()
+        if rejected:
+            return rejected
+        with self._lock:
+            day = self.now // (86_400 * 10**9)
+            rows = [o.row() for o in self.orders.values()
+                    if o.ts // (86_400 * 10**9) == day and (symbol is None or o.symbol == symbol)]
+            return _ok(rows)
@@ -0,0 +1,206 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from lib.log import fields
+from lib.strategy import StrategyState, PriceTick, PositionUpdate
+# --------------- 전략 상태 저널 (append-only + 스냅샷) ---------------
+# 재시작 / 배포 / 루프 밖 예외로 프로세스가 죽어도 used_split, 예산, 미체결 주문번호를 잃지 않도록
+# StrategyEngine 의 이벤트와 처리 후 상태를 파일에 순서대로 남긴다.
+#
+#   <dir>/journal.log   한 줄에 레코드 하나 (JSON). {"seq", "ts", "symbol", "event", "data", "state"}
+#   <dir>/snapshot.json 종목별 최신 상태 + 마지막 seq. 주기적으로 새로 쓰고(임시 파일 → rename) 저널을 비운다.
+#
+# - 쓰기는 전용 스레드가 수행: 루프는 큐에 넣기만 하고, 스레드는 모인 레코드를 한 번에 쓰고 fsync 1회 (group commit)
+# - 상태가 바뀌지 않은 PriceTick / PositionUpdate 는 기록하지 않는다
+# - 복구: 스냅샷 + (seq 가 더 큰) 저널 꼬리의 마지막 상태. 중간에 잘린 마지막 줄은 무시
+# 레코드마다 처리 후 상태를 담으므로 복구 시 엔진에 이벤트를 다시 흘릴 필요가 없다 (주문 재전송 없음).
+# --resume 없이 시작해도 기존 파일은 지우지 않고 <이름>.<시각> 으로 옮겨 둔다 (실수로 재시작해도 복구 가능).
+
+log = logging.getLogger(__name__)
+
+JOURNAL_FILE = "journal.log"
+SNAPSHOT_FILE = "snapshot.json"
+
+def _fsync_dir(path):
+    # rename 결과를 디스크에 반영 (지원하지 않는 OS 는 무시)
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def rotate(path, names=(SNAPSHOT_FILE, JOURNAL_FILE), now=None):
+    """
+    비어 있지 않은 기존 파일을 <이름>.<YYYYmmdd-HHMMSS> 로 이름 변경 (같은 이름이 있으면 .1, .2 ... 추가).
+    :return: 옮긴 파일 경로 목록
+    """
+    suffix = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+    rotated = []
+    for name in names:
+        source = os.path.join(path, name)
+        if not os.path.exists(source) or os.path.getsize(source) == 0:
+            continue
+        target = f"{source}.{suffix}"
+        n = 0
+        while os.path.exists(target):
+            n += 1
+            target = f"{source}.{suffix}.{n}"
+        os.replace(source, target)
+        rotated.append(target)
+    if rotated:
+        _fsync_dir(path)
+    return rotated
+
+def load_journal(path):
+    """
+    저널 디렉터리에서 상태 복구.
+    :return: ({종목: StrategyState}, 마지막 seq)
+    """
+    states = {}
+    seq = 0
+    snapshot_path = os.path.join(path, SNAPSHOT_FILE)
+    if os.path.exists(snapshot_path):
+        with open(snapshot_path) as f:
+            snapshot = json.load(f)
+        seq = snapshot["seq"]
+        states = {symbol: StrategyState.from_dict(data) for symbol, data in snapshot["states"].items()}
+
+    journal_path = os.path.join(path, JOURNAL_FILE)
+    if os.path.exists(journal_path):
+        with open(journal_path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 쓰는 중에 종료되어 잘린 마지막 레코드
+                    log.warning("저널의 손상된 레코드 무시 (seq %d 이후)", seq)
+                    break
+                if record["seq"] <= seq:
+                    continue
+                seq = record["seq"]
+                states[record["symbol"]] = StrategyState.from_dict(record["state"])
+    return states, seq
+
+class Journal:
+    """
+    :param path: 저널 디렉터리 (없으면 생성)
+    :param resume: True 면 기존 스냅샷 / 저널에서 상태를 읽는다. False 면 기존 파일을 옮겨 두고(rotate) 새로 시작
+    :param commit_interval: group commit 주기 (초). 이 시간 동안 모인 레코드를 fsync 한 번으로 기록
+    :param snapshot_every: 이 개수만큼 레코드가 쌓이면 스냅샷을 쓰고 저널을 비움
+    """
+    def __init__(self, path="journal", resume=False, commit_interval=0.05, snapshot_every=1000):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.snapshot_every = snapshot_every
+        os.makedirs(path, exist_ok=True)
+        started = time.perf_counter()
+        if resume:
+            self.states, self.seq = load_journal(path)
+            log.info("저널 복구: %d개 종목, seq %d (%.1fms)", len(self.states), self.seq,
+                     (time.perf_counter() - started) * 1000)
+        else:
+            self.states, self.seq = {}, 0
+            rotated = rotate(path)
+            if rotated:
+                log.warning("--resume 없이 시작: 기존 저널을 옮겨 두고 새로 시작합니다", extra=fields(rotated=rotated))
+        self._last = {symbol: state.to_dict() for symbol, state in self.states.items()}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._file = open(os.path.join(path, JOURNAL_FILE), "a")
+        self._pending = 0               # 마지막 스냅샷 이후 레코드 수
+        self._snapshot_states = dict(self._last)   # 기록된 레코드 기준 종목별 상태 (writer 스레드 전용)
+        self._snapshot_seq = self.seq
+        self.stats = {"records": 0, "commits": 0, "snapshots": 0}
+        self._thread = threading.Thread(target=self._writer, name="journal", daemon=True)
+        self._thread.start()
+
+    def state(self, symbol):
+        """복구된 종목 상태 (없으면 None)"""
+        return self.states.get(symbol)
+
+    def attach(self, engine):
+        """엔진의 이벤트를 기록. 복구된 상태가 있으면 engine.state 를 교체"""
+        state = self.states.get(engine.symbol)
+        if state is not None and engine.state is not state:
+            engine.state = state
+        engine.listeners.append(self.record)
+        return engine
+
+    def record(self, engine, event):
+        """StrategyEngine 리스너: 이벤트와 처리 후 상태를 큐에 넣음 (디스크 대기 없음)"""
+        state = engine.state.to_dict()
+        with self._lock:
+            if type(event) in (PriceTick, PositionUpdate) and self._last.get(engine.symbol) == state:
+                return
+            self._last[engine.symbol] = state
+            self.states[engine.symbol] = engine.state
+            self.seq += 1
+            data = {name: getattr(event, name) for name in type(event).__slots__}
+            # seq 순서대로 큐에 들어가도록 lock 안에서 넣는다 (비동기 루프는 여러 스레드에서 handle 호출)
+            self._queue.put({"seq": self.seq, "ts": event.ts, "symbol": engine.symbol,
+                             "event": type(event).__name__, "data": data, "state": state})
+
+    def _writer(self):
+        while True:
+            batch = [self._queue.get()]
+            # commit_interval 동안 도착한 레코드를 모아서 한 번에 기록
+            time.sleep(self.commit_interval)
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is None
+            records = [r for r in batch if r is not None]
+            if records:
+                self._file.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self.stats["records"] += len(records)
+                self.stats["commits"] += 1
+                self._pending += len(records)
+                self._snapshot_states.update((r["symbol"], r["state"]) for r in records)
+                self._snapshot_seq = records[-1]["seq"]
+                if self._pending >= self.snapshot_every:
+                    self._snapshot()
+            if stop:
+                return
+
+    def _snapshot(self):
+        # 기록된 레코드까지의 상태를 스냅샷으로 쓰고 저널을 비움.
+        # rename 후 truncate 전에 죽어도 load_journal 이 seq 로 중복을 걸러낸다.
+        tmp = os.path.join(self.path, SNAPSHOT_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"seq": self._snapshot_seq, "states": self._snapshot_states}, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.path, SNAPSHOT_FILE))
+        _fsync_dir(self.path)
+        self._file.truncate(0)
+        self._file.seek(0)
+        self._pending = 0
+        self.stats["snapshots"] += 1
+
+    def close(self):
+        """남은 레코드를 기록하고 스냅샷을 쓴 뒤 종료"""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join()
+        if self._pending:
+            self._snapshot()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
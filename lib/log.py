@@ -0,0 +1,124 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+# --------------- 트레이딩 루프용 로깅 ---------------
+# print() 대신 사용하는 로깅 계층.
+# - 레벨 (DEBUG/INFO/WARNING/ERROR)
+# - JSON-lines 구조화 레코드 (extra 필드 포함)
+# - 큐 기반 비동기 핸들러: 루프 스레드는 큐에 넣기만 하고, 실제 쓰기는 리스너 스레드가 수행
+# - 메시지별 rate limit / 값이 바뀔 때만 기록
+
+_listener = None
+_last_values = {}
+
+def fields(**kwargs):
+    """구조화 필드를 logging 의 extra 인자로 변환. logger.info("...", extra=fields(price=1.0))"""
+    return {"fields": kwargs}
+
+class JsonFormatter(logging.Formatter):
+    """한 줄에 하나의 JSON 레코드"""
+    def format(self, record):
+        data = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        data.update(getattr(record, "fields", None) or {})
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            data["suppressed"] = suppressed
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    """사람이 읽기 위한 한 줄 포맷 (필드는 key=value 로 뒤에 붙임)"""
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s | %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        extra = getattr(record, "fields", None)
+        if extra:
+            line += " " + " ".join(f"{k}={v}" for k, v in extra.items())
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            line += f" (+{suppressed} suppressed)"
+        return line
+
+class RateLimitFilter(logging.Filter):
+    """
+    throttle 이 지정된 레코드를 (logger, 메시지 템플릿) 별로 제한.
+    억제된 개수는 다음으로 통과하는 레코드의 suppressed 필드에 기록된다.
+    """
+    def __init__(self, clock=time.monotonic):
+        super().__init__()
+        self.clock = clock
+        self._last = {}     # key -> (마지막 기록 시각, 억제 개수)
+
+    def filter(self, record):
+        interval = getattr(record, "throttle", None)
+        if not interval:
+            return True
+        key = (record.name, record.msg)
+        now = self.clock()
+        last, suppressed = self._last.get(key, (None, 0))
+        if last is not None and now - last < interval:
+            self._last[key] = (last, suppressed + 1)
+            return False
+        self._last[key] = (now, 0)
+        record.suppressed = suppressed
+        return True
+
+def log_on_change(logger, key, value, msg, *args, level=logging.INFO, **kwargs):
+    """
+    key 에 대한 value 가 직전 기록값과 다를 때만 기록.
+    예) log_on_change(log, "remain_reservoir", round(v, 2), "남은 예산: %.2f", v)
+    """
+    if _last_values.get(key, _last_values) == value:
+        return False
+    _last_values[key] = value
+    logger.log(level, msg, *args, **kwargs)
+    return True
+
+def setup_logging(level="INFO", path=None, json_lines=False):
+    """
+    루트 로거를 큐 기반 핸들러로 구성.
+    :param level: 로그 레벨 이름 또는 숫자
+    :param path: 지정 시 파일에 기록 (기본: stdout)
+    :param json_lines: True 면 JSON-lines, False 면 텍스트 한 줄 포맷
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    target = logging.FileHandler(path, encoding="utf-8") if path else logging.StreamHandler(sys.stdout)
+    target.setFormatter(JsonFormatter() if json_lines else TextFormatter())
+
+    q = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(q)
+    queue_handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level if isinstance(level, int) else level.upper())
+
+    _listener = logging.handlers.QueueListener(q, target, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def shutdown_logging():
+    """큐에 남은 레코드를 모두 기록하고 리스너 종료"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(shutdown_logging)
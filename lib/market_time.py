@@ -1,104 +1,202 @@
 from datetime import datetime, timedelta
+from bisect import bisect_right
+from array import array
+import logging
+import os
+import time
 import pytz
-import exchange_calendars as ec
-# --------------- 거래소 캘린더 및 더미 API 함수 ---------------
-# NYSE 캘린더 객체 생성
-XNYS = ec.get_calendar("XNYS")
-# plus =  timedelta(hours= 13, minutes=0) 
-def is_us_market_open_now(check_time=None):
+from lib.clock import get_clock
+from lib.metrics import timed
+# --------------- 거래소 캘린더 ---------------
+# 개장/폐장 시각은 미리 만들어 둔 세션 테이블 파일(lib/calendars/XNYS.i8, XKRX.i8)에서 읽는다.
+# exchange_calendars(+ pandas) import 와 캘린더 생성에 1초 가까이 걸리므로, 파일이 없거나
+# 앞으로 TABLE_MIN_DAYS 일을 덮지 못할 때만 exchange_calendars 로 만든다.
+# 테이블 갱신: python -m lib.market_time build --years 5
+ET = pytz.timezone("America/New_York")
+log = logging.getLogger(__name__)
+
+CALENDAR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "calendars")
+TABLE_START = "2015-01-01"
+TABLE_MIN_DAYS = 30     # 테이블이 덮어야 하는 최소 미래 일수
+
+def __getattr__(name):
+    # exchange_calendars 캘린더 객체가 필요한 코드(bench 등)를 위해 XNYS 는 처음 접근할 때 생성
+    if name == "XNYS":
+        import exchange_calendars as ec
+        globals()["XNYS"] = calendar = ec.get_calendar("XNYS")
+        return calendar
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# --------------- 세션 테이블 ---------------
+# 매 틱마다 pandas DatetimeIndex 를 조회하지 않도록, 개장/폐장 시각을
+# 정렬된 int64 epoch(초) 배열로 미리 만들어 두고 bisect 로 조회한다.
+
+class SessionTable:
     """
-    주어진 시각(미국 동부 기준)을 UTC로 변환 후, 현재 시장이 열려있는지 여부를 반환.
-    (휴장일, 주말, 조기폐장 자동 반영)
+    개장/폐장 epoch 배열 + bisect 조회.
+    직전 조회 결과의 유효 구간을 캐시하여, 같은 세션 안의 반복 호출은 O(1).
     """
-    # (A) 확인 시각이 없으면 현재 미국 동부시간(ET) 사용
-    if check_time is None:
-        now_et = datetime.now(pytz.timezone("America/New_York"))  # 현재 ET
-    else:
-        if check_time.tzinfo is None:
-            check_time = check_time.replace(tzinfo=pytz.timezone("America/New_York"))
-        now_et = check_time.astimezone(pytz.timezone("America/New_York"))  # ET 변환
+    def __init__(self, opens, closes):
+        self.opens = opens      # array('q'), 오름차순
+        self.closes = closes    # array('q'), 오름차순
+        self._open_cache = (1, 0, 0)    # (구간 시작, 구간 끝, bisect 결과)
+        self._close_cache = (1, 0, 0)
 
-    # (B) ET → UTC 변환
-    now_utc = now_et.astimezone(pytz.utc)  
+    @classmethod
+    def from_calendar(cls, calendar):
+        opens = array("q", calendar.opens.values.astype("datetime64[s]").astype("int64").tolist())
+        closes = array("q", calendar.closes.values.astype("datetime64[s]").astype("int64").tolist())
+        return cls(opens, closes)
 
-    print("🕒 현재 미국 동부시간 (ET):", now_et)
-    print("🌍 변환된 현재 UTC 시간:", now_utc)
+    @classmethod
+    def build(cls, name, start=TABLE_START, years=5):
+        """exchange_calendars 로 start ~ 오늘 + years 년 테이블 생성"""
+        import exchange_calendars as ec
+        import pandas as pd
+        end = pd.Timestamp.today().normalize() + pd.DateOffset(years=years)
+        return cls.from_calendar(ec.get_calendar(name, start=start, end=end))
 
-    # (C) 오늘 날짜를 UTC 기준으로 가져오기
-    date_str = now_utc.strftime('%Y-%m-%d')
+    def save(self, path):
+        """개장 배열 뒤에 폐장 배열을 이어 쓴 int64 (native byte order) 파일. 임시 파일에 쓴 뒤 교체"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            self.opens.tofile(f)
+            self.closes.tofile(f)
+        os.replace(tmp, path)
 
-    # (D) 오늘이 거래 가능한 날인지 확인
-    if date_str not in XNYS.sessions:
-        print("🚫 오늘은 거래일이 아닙니다 (휴장)")
-        return False
+    @classmethod
+    def read(cls, path):
+        values = array("q")
+        with open(path, "rb") as f:
+            values.frombytes(f.read())
+        n = len(values) // 2
+        return cls(values[:n], values[n:])
+
+    @classmethod
+    def load(cls, name, directory=CALENDAR_DIR, now=None):
+        """
+        {directory}/{name}.i8 에서 읽는다. 파일이 없거나 앞으로 TABLE_MIN_DAYS 일을 덮지 못하면 캘린더로 생성.
+        """
+        path = os.path.join(directory, f"{name}.i8")
+        now = time.time() if now is None else now
+        try:
+            table = cls.read(path)
+            if table.opens and table.opens[-1] >= now + TABLE_MIN_DAYS * 86_400:
+                return table
+            log.warning("세션 테이블이 오래되었습니다 (%s). 'python -m lib.market_time build' 로 갱신하세요", path)
+        except FileNotFoundError:
+            log.warning("세션 테이블 파일이 없습니다 (%s). exchange_calendars 로 생성합니다", path)
+        return cls.build(name)
 
-    # (E) 오늘의 개장 및 폐장 시간 (UTC)
-    market_open_utc = XNYS.opens.loc[date_str]
-    market_close_utc = XNYS.closes.loc[date_str]
+    @staticmethod
+    def _slot(values, cache, ts):
+        # values[k-1] <= ts < values[k] 인 k 를 반환. 캐시 구간 안이면 bisect 생략
+        lo, hi, k = cache
+        if lo <= ts < hi:
+            return k, cache
+        k = bisect_right(values, ts)
+        lo = values[k - 1] if k > 0 else float("-inf")
+        hi = values[k] if k < len(values) else float("inf")
+        return k, (lo, hi, k)
 
-    # (F) 로그 출력 (디버깅용)
-    print(f"📅 거래일 (UTC): {date_str}")
-    print(f"🕒 개장 시간 (UTC): {market_open_utc}")
-    print(f"🕒 폐장 시간 (UTC): {market_close_utc}")
-    print(f"🕒 현재 시간 (UTC): {now_utc}")
+    def open_slot(self, ts):
+        """ts 이후 첫 개장의 인덱스 (opens[k] > ts)"""
+        k, self._open_cache = self._slot(self.opens, self._open_cache, ts)
+        return k
 
-    # (G) 현재 시간이 개장 ~ 폐장 사이에 있는지 확인
-    return market_open_utc <= now_utc <= market_close_utc
-def get_remaining_market_time(check_time=None):
+    def close_slot(self, ts):
+        """ts 이후 첫 폐장의 인덱스 (closes[k] > ts)"""
+        k, self._close_cache = self._slot(self.closes, self._close_cache, ts)
+        return k
+
+_TABLES = {}
+
+def session_table(name="XNYS"):
+    """거래소 세션 테이블 (XNYS, XKRX ...). 처음 요청할 때 한 번 로드"""
+    table = _TABLES.get(name)
+    if table is None:
+        table = _TABLES[name] = SessionTable.load(name)
+    return table
+
+XNYS_TABLE = session_table("XNYS")
+
+def _to_timestamp(check_time, clock=None):
+    """확인 시각(미국 동부 기준, naive 허용)을 UTC epoch(초)로 변환. None 이면 시계(기본: lib.clock)의 현재 시각."""
+    if check_time is None:
+        return (clock or get_clock()).time()
+    if check_time.tzinfo is None:
+        check_time = ET.localize(check_time)
+    return check_time.timestamp()
+
+def _to_utc(ts):
+    return datetime.fromtimestamp(ts, pytz.utc)
+
+@timed("calendar_seconds", "시장 시간 함수 지연", function="is_us_market_open_now")
+def is_us_market_open_now(check_time=None, clock=None):
     """
-    현재 정규장이 열려 있다고 가정하고, 장 마감까지 남은 시간(timedelta)을 계산.
-    장이 이미 종료되었으면 None 반환.
+    주어진 시각(미국 동부 기준)을 UTC로 변환 후, 현재 시장이 열려있는지 여부를 반환.
+    (휴장일, 주말, 조기폐장 자동 반영)
     """
-    if check_time is None:
-        now_et = datetime.now(pytz.timezone("America/New_York"))
-    else:
-        if check_time.tzinfo is None:
-            check_time = check_time.replace(tzinfo=pytz.timezone("America/New_York"))
-        now_et = check_time.astimezone(pytz.timezone("America/New_York"))
+    # (A) 확인 시각을 UTC epoch 로 변환 (없으면 현재 시각)
+    now_ts = _to_timestamp(check_time, clock)
 
-    now_utc = now_et.astimezone(pytz.utc)  
-    date_str = now_utc.strftime('%Y-%m-%d')
+    # (B) now 이전의 마지막 개장 세션 찾기
+    i = XNYS_TABLE.open_slot(now_ts) - 1
+    if i < 0:
+        log.debug("거래일이 아닙니다 (휴장)")
+        return False
 
-    if date_str not in XNYS.sessions:
-        return None
+    # (C) 현재 시간이 개장 ~ 폐장 사이에 있는지 확인
+    market_close_ts = XNYS_TABLE.closes[i]
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("시장 시간 확인", extra={"fields": {
+            "now_utc": _to_utc(now_ts), "open_utc": _to_utc(XNYS_TABLE.opens[i]),
+            "close_utc": _to_utc(market_close_ts)}, "throttle": 60})
+    return now_ts <= market_close_ts
 
-    market_close_utc = XNYS.closes.loc[date_str]
-    remaining_time = market_close_utc - now_utc
+@timed("calendar_seconds", "시장 시간 함수 지연", function="get_remaining_market_time")
+def get_remaining_market_time(check_time=None, clock=None):
+    """
+    현재 정규장이 열려 있다고 가정하고, 장 마감까지 남은 시간(timedelta)을 계산.
+    장이 이미 종료되었으면 None 반환.
+    """
+    now_ts = _to_timestamp(check_time, clock)
 
-    return remaining_time if remaining_time.total_seconds() > 0 else None
+    # now 이후 첫 폐장이 오늘(UTC 날짜) 폐장일 때만 남은 시간 반환
+    k = XNYS_TABLE.close_slot(now_ts)
+    if k >= len(XNYS_TABLE.closes):
+        return None
+    market_close_ts = XNYS_TABLE.closes[k]
+    if market_close_ts // 86400 != int(now_ts // 86400):
+        return None
+    return timedelta(seconds=market_close_ts - now_ts)
 
-def get_time_until_next_market_open(check_time=None):
-    plus =  timedelta(hours= 8, minutes=0) 
+@timed("calendar_seconds", "시장 시간 함수 지연", function="get_time_until_next_market_open")
+def get_time_until_next_market_open(check_time=None, clock=None):
     """
     현재 장이 종료된 경우, 다음 거래일 개장까지 남은 시간(timedelta)을 계산.
-    현재 장이 아직 열려 있다면 None 반환.
+    (오늘 개장 전이면 오늘 개장까지, 그 외에는 다음 거래일 개장까지)
+    세션 테이블이 UTC epoch 이므로 시간대 보정은 필요 없다.
     """
-    if check_time is None:
-        now_et = datetime.now(pytz.timezone("America/New_York"))
-    else:
-        if check_time.tzinfo is None:
-            check_time = check_time.replace(tzinfo=pytz.timezone("America/New_York"))
-        now_et = check_time.astimezone(pytz.timezone("America/New_York"))
-
-    now_utc = now_et.astimezone(pytz.utc)   - plus
-    date_str = now_utc.strftime('%Y-%m-%d')
-    print(1, now_utc)
-    if date_str in XNYS.sessions:
-        market_open_utc = XNYS.opens.loc[date_str]
-        market_close_utc = XNYS.closes.loc[date_str]
-        print(2, market_open_utc)
-        print(3, market_close_utc)
-        # 현재 시간이 장 시작 전이면, 오늘 개장까지 남은 시간 계산
-        if now_utc < market_open_utc:
-            return market_open_utc - now_utc
-        
-        # 현재 시간이 장 마감 이후이면, 다음 거래일 개장까지 남은 시간 계산
-        if now_utc > market_close_utc:
-            next_session = XNYS.sessions[XNYS.sessions > date_str].min()
-            next_market_open_utc = XNYS.opens.loc[next_session]
-            return next_market_open_utc - now_utc
-
-    # 오늘이 휴장일이면 다음 거래일 찾기
-    next_session = XNYS.sessions[XNYS.sessions > date_str].min()
-    next_market_open_utc = XNYS.opens.loc[next_session]
-    return next_market_open_utc - now_utc
\ No newline at end of file
+    now_ts = _to_timestamp(check_time, clock)
+
+    # now 이후 첫 개장
+    k = XNYS_TABLE.open_slot(now_ts)
+    if k >= len(XNYS_TABLE.opens):
+        return None
+    return timedelta(seconds=XNYS_TABLE.opens[k] - now_ts)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="세션 테이블(lib/calendars/*.i8) 생성")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--calendar", default="XNYS", help="exchange_calendars 캘린더 이름 (기본: XNYS)")
+    parser.add_argument("--years", type=int, default=5, help="오늘부터 몇 년 뒤까지 (기본: 5)")
+    parser.add_argument("--dir", default=CALENDAR_DIR)
+    args = parser.parse_args()
+    table = SessionTable.build(args.calendar, years=args.years)
+    path = os.path.join(args.dir, f"{args.calendar}.i8")
+    table.save(path)
+    print(f"{path}: {len(table.opens)} sessions, {datetime.fromtimestamp(table.opens[0], pytz.utc):%Y-%m-%d} ~ "
+          f"{datetime.fromtimestamp(table.opens[-1], pytz.utc):%Y-%m-%d}")
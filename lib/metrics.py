@@ -0,0 +1,293 @@
+import logging
+import math
+import threading
+import time
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+# --------------- 루프 계측 (지연 히스토그램 / 카운터 / Prometheus 출력) ---------------
+# 외부 의존성 없이 표준 라이브러리만 사용한다.
+#   Histogram : HDR 방식 로그-선형 버킷 (2의 거듭제곱 구간마다 8개의 하위 버킷, 상대 오차 ~6%).
+#               값은 마이크로초 정수로 기록하고, 백분위 / Prometheus 누적 버킷(2의 거듭제곱 경계)을 계산한다.
+#   Counter   : 단조 증가 카운터
+#   InstrumentedBroker : broker 메서드 호출마다 지연 / 오류 / 실패 응답을 기록 (ThrottledBroker 와 같은 프록시 방식)
+#   TickTimer : 틱 처리 시간과 의도한 주기(3초) 대비 지터
+# 기록 비용은 호출당 1~2µs (perf_counter 2회 + bit_length + 리스트 증가).
+
+log = logging.getLogger(__name__)
+
+SUB_BITS = 3
+SUB_BUCKETS = 1 << SUB_BITS
+MAX_BUCKET_US = 1 << 25        # Prometheus 버킷 경계 상한 (~33.5초)
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def _label_text(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+class Counter:
+    __slots__ = ("name", "labels", "value")
+
+    def __init__(self, name, labels=()):
+        self.name = name
+        self.labels = labels
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+class Histogram:
+    """
+    지연 히스토그램 (초 단위로 observe, 내부는 µs 정수).
+    버킷 인덱스 = (지수 << SUB_BITS) | 가수 상위 비트. 1µs ~ 약 2^40µs 범위.
+    """
+    __slots__ = ("name", "labels", "counts", "count", "sum", "max", "_lock")
+
+    def __init__(self, name, labels=()):
+        self.name = name
+        self.labels = labels
+        self.counts = [0] * (41 << SUB_BITS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _index(us):
+        if us < SUB_BUCKETS:
+            return us
+        exponent = us.bit_length()              # 2**(exponent-1) <= us < 2**exponent
+        sub = (us >> (exponent - 1 - SUB_BITS)) & (SUB_BUCKETS - 1)
+        return min(((exponent - SUB_BITS) << SUB_BITS) + sub, (41 << SUB_BITS) - 1)
+
+    @staticmethod
+    def _upper(index):
+        """버킷 상한 (µs)"""
+        if index < SUB_BUCKETS:
+            return index + 1
+        exponent = (index >> SUB_BITS) + SUB_BITS
+        sub = index & (SUB_BUCKETS - 1)
+        return (1 + (sub + 1) / SUB_BUCKETS) * 2 ** (exponent - 1)
+
+    def observe(self, seconds):
+        i = self._index(int(seconds * 1e6))
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, q):
+        """q (0~100) 백분위 (초). 버킷 상한 기준"""
+        if not self.count:
+            return 0.0
+        target = math.ceil(self.count * q / 100) or 1
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return min(self._upper(i) / 1e6, self.max)
+        return self.max
+
+    def cumulative(self):
+        """Prometheus 용 (le 초, 누적 개수). 경계는 2의 거듭제곱 µs"""
+        buckets = []
+        seen = 0
+        bound = 1
+        for i, c in enumerate(self.counts):
+            while self._upper(i) > bound:
+                buckets.append((bound / 1e6, seen))
+                bound *= 2
+                if bound > MAX_BUCKET_US:
+                    return buckets     # 나머지는 +Inf
+            seen += c
+        buckets.append((bound / 1e6, seen))
+        return buckets
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, labels):
+        key = _key(name, labels)
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = self._metrics[key] = cls(name, key[1])
+                    if help:
+                        self._help[name] = help
+        return metric
+
+    def counter(self, name, help="", **labels):
+        return self._get(Counter, name, help, labels)
+
+    def histogram(self, name, help="", **labels):
+        return self._get(Histogram, name, help, labels)
+
+    def render(self):
+        """Prometheus text exposition format"""
+        lines = []
+        typed = set()
+        for (name, labels), metric in sorted(self._metrics.items(), key=lambda kv: kv[0]):
+            kind = "counter" if isinstance(metric, Counter) else "histogram"
+            if name not in typed:
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+                typed.add(name)
+            if kind == "counter":
+                lines.append(f"{name}{_label_text(labels)} {metric.value}")
+                continue
+            for le, n in metric.cumulative():
+                lines.append(f"{name}_bucket{_label_text(labels, [('le', f'{le:g}')])} {n}")
+            lines.append(f"{name}_bucket{_label_text(labels, [('le', '+Inf')])} {metric.count}")
+            lines.append(f"{name}_sum{_label_text(labels)} {metric.sum:.6f}")
+            lines.append(f"{name}_count{_label_text(labels)} {metric.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """세션 종료 시 기록할 요약 (사람이 읽는 표)"""
+        rows = []
+        for (name, labels), metric in sorted(self._metrics.items(), key=lambda kv: kv[0]):
+            label = name + _label_text(labels)
+            if isinstance(metric, Counter):
+                rows.append(f"{label:<60s} {metric.value:>10}")
+            elif metric.count:
+                rows.append(f"{label:<60s} n={metric.count:<8d} p50={metric.percentile(50) * 1e3:9.3f}ms "
+                            f"p99={metric.percentile(99) * 1e3:9.3f}ms max={metric.max * 1e3:9.3f}ms")
+        return "\n".join(rows)
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+REGISTRY = Registry()
+
+def counter(name, help="", **labels):
+    return REGISTRY.counter(name, help, **labels)
+
+def histogram(name, help="", **labels):
+    return REGISTRY.histogram(name, help, **labels)
+
+def timed(name, help="", **labels):
+    """함수 호출 시간을 histogram(name, **labels) 에 기록하는 데코레이터"""
+    def decorator(func):
+        hist = histogram(name, help, **labels)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                hist.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+# --------------- broker 계측 ---------------
+
+class InstrumentedBroker:
+    """
+    broker 메서드 호출마다 broker_call_seconds{method} 기록.
+    예외는 broker_errors_total{method}, rt_cd != "0" 응답은 broker_failures_total{method} 로 집계.
+    """
+    def __init__(self, broker):
+        self.broker = broker
+
+    def __getattr__(self, name):
+        attr = getattr(self.broker, name)
+        if not callable(attr):
+            return attr
+        hist = histogram("broker_call_seconds", "broker API 호출 지연", method=name)
+        errors = counter("broker_errors_total", "broker 호출 예외", method=name)
+        failures = counter("broker_failures_total", "broker 실패 응답 (rt_cd != 0)", method=name)
+
+        def call(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                response = attr(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                hist.observe(time.perf_counter() - started)
+            if isinstance(response, dict) and response.get("rt_cd") not in (None, "0"):
+                failures.inc()
+            return response
+        call.__name__ = name
+        # 다음 호출부터는 __getattr__ 를 거치지 않음
+        setattr(self, name, call)
+        return call
+
+# --------------- 주문 / 틱 ---------------
+
+def order_listener(engine, event):
+    """StrategyEngine 리스너: 체결 / 거부 이벤트 집계 (주문 / 취소는 BrokerGateway 에서 집계)"""
+    kind = type(event).__name__
+    if kind == "OrderFilled":
+        counter("orders_filled_total", "체결된 주문", symbol=engine.symbol).inc()
+    elif kind == "OrderRejected":
+        counter("orders_rejected_total", "거부된 주문", symbol=engine.symbol).inc()
+
+class TickTimer:
+    """
+    틱 처리 시간(tick_seconds)과 의도한 주기 대비 지터(tick_jitter_seconds) 기록.
+    :param interval: 의도한 틱 주기 (초)
+    :param clock: 주기 측정에 쓸 시계 (lib.clock, 가상 시계면 가상 시간 기준)
+    """
+    def __init__(self, interval, clock, loop="main"):
+        self.interval = interval
+        self.clock = clock
+        self.duration = histogram("tick_seconds", "틱 처리 시간", loop=loop)
+        self.jitter = histogram("tick_jitter_seconds", "틱 시작 간격 - 의도한 주기 (절댓값)", loop=loop)
+        self._last = None
+        self._started = 0.0
+
+    def start(self):
+        now = self.clock.monotonic()
+        if self._last is not None:
+            self.jitter.observe(abs(now - self._last - self.interval))
+        self._last = now
+        self._started = time.perf_counter()
+
+    def stop(self):
+        self.duration.observe(time.perf_counter() - self._started)
+
+    def reset(self):
+        """장 마감 등으로 주기가 끊길 때 호출 (대기 시간을 지터로 세지 않음)"""
+        self._last = None
+
+# --------------- HTTP ---------------
+
+class _Handler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        log.debug("metrics %s", format % args)
+
+def start_http_server(port, addr="127.0.0.1", registry=REGISTRY):
+    """/metrics 를 제공하는 HTTP 서버를 데몬 스레드로 시작. :return: server (server.shutdown() 으로 종료)"""
+    handler = type("MetricsHandler", (_Handler,), {"registry": registry})
+    server = ThreadingHTTPServer((addr, port), handler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    log.info("메트릭 엔드포인트: http://%s:%d/metrics", addr, server.server_address[1])
+    return server
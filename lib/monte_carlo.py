@@ -0,0 +1,216 @@
+import argparse
+import csv
+import time
+from dataclasses import asdict
+import numpy as np
+from lib.ohlcv import day_bounds
+from lib.backtest import NS_PER_MIN, StrategyParams, add_param_arguments, loc_start_index, params_from_args
+from lib.bar_store import load_bars
+# --------------- 예산 소진 몬테카를로 ---------------
+# 과거 거래일을 복원 추출(부트스트랩) / 블록 단위로 다시 이어 붙인 가격 경로 수만 개에 run_backtest 와 같은 규칙을 적용해
+#   - 목표 수익(take_profit) 매도까지 걸린 거래일 수
+#   - 사용한 회차 수
+#   - 예산(split_no * 2 * 시작 가격 * qty) 소진 확률 (out_of_amount, 봇 종료)
+# 의 분포를 구한다.
+#
+# 거래일 하나는 전일 종가 대비 배수 6개 (시가, 고가, 0.5회차 구간 저가, 종가, LOC 기준가, 최고 종가) 로 줄인다.
+# 일봉이면 LOC 기준가 = 시가, 분봉이면 마감 loc_window 분 전 봉의 시가 (run_backtest 와 같음).
+# 첫날은 전일 종가가 없으므로 시가를 기준으로 둔다 (갭 없음).
+#
+# 경로는 파이썬 루프를 돌지 않는다. 모든 경로가 같은 날을 함께 진행하고 (루프는 거래일 수만큼),
+# 하루의 판단은 경로 축 NumPy 배열 연산 (마스크 / np.where) 으로 한 번에 처리한다.
+# 하루 안의 순서는 일봉 run_backtest 와 같다: 목표 수익 매도 → 예산 소진 → 0.5회차 → LOC.
+# 매도 또는 예산 소진으로 한 사이클이 끝난 경로는 더 진행하지 않는다.
+
+RUNNING = 0         # 기간 안에 끝나지 않음
+TAKE_PROFIT = 1     # 목표 수익 전량 매도
+FLOOR = 2           # 예산 소진, 하한 이상 전량 매도
+EXHAUSTED = 3       # 예산 소진, 추가 매수 불가 (봇 종료)
+OUTCOMES = ("running", "tp", "floor", "exhausted")
+
+DAY_FIELDS = ("open", "high", "low", "close", "loc", "peak")
+PERCENTILES = (5, 25, 50, 75, 95, 99)
+
+def day_factors(bars, loc_window_min=StrategyParams.loc_window_min):
+    """
+    봉 데이터 → 거래일별 전일 종가 대비 배수 배열 shape (거래일 수, 6), 열 순서는 DAY_FIELDS.
+      low  : 0.5회차 지정가 구간 (LOC 시점 전) 의 저가
+      loc  : LOC 주문 시점 봉의 시가
+      peak : 봉 종가 중 최고 (예산 소진 판단)
+    """
+    ts = bars.ts
+    starts, ends = day_bounds(ts)
+    if len(starts) == 0:
+        return np.empty((0, len(DAY_FIELDS)))
+    loc_starts = loc_start_index(ts, starts, ends, int(loc_window_min * NS_PER_MIN))
+    half_ends = np.maximum(loc_starts, starts + 1)
+    # reduceat 은 [starts[k], half_ends[k]) 와 그 사이 구간을 번갈아 계산하므로 짝수 번째만 사용
+    low = np.minimum.reduceat(np.r_[bars.low, np.inf], np.column_stack([starts, half_ends]).ravel())[::2]
+    table = np.column_stack([
+        bars.open[starts],
+        np.maximum.reduceat(bars.high, starts),
+        low,
+        bars.close[ends - 1],
+        bars.open[loc_starts],
+        np.maximum.reduceat(bars.close, starts),
+    ])
+    prev_close = np.r_[table[0, 0], table[:-1, 3]]
+    return table / prev_close[:, None]
+
+class MonteCarloResult:
+    """경로별 결과 (outcome: OUTCOMES 인덱스, days: 끝난 거래일 수, used_split: 사용 회차, pnl_pct: 손익률)"""
+    __slots__ = ("symbols", "params", "paths", "days", "block", "n_factors",
+                 "outcome", "end_day", "used_split", "pnl_pct")
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+    def probability(self, outcome):
+        return float((self.outcome == outcome).mean()) if self.paths else 0.0
+
+    def summary(self):
+        exited = self.outcome != RUNNING
+        sold = (self.outcome == TAKE_PROFIT) | (self.outcome == FLOOR)
+        exhausted = self.outcome == EXHAUSTED
+        return {
+            "symbols": self.symbols,
+            "paths": self.paths,
+            "days": self.days,
+            "block": self.block,
+            "day_factors": self.n_factors,
+            **{f"p_{name}": round(self.probability(k), 4) for k, name in enumerate(OUTCOMES)},
+            "days_to_exit": percentiles(self.end_day[sold]),
+            "days_to_exhaustion": percentiles(self.end_day[exhausted]),
+            "used_split": percentiles(self.used_split),
+            "used_split_at_exit": percentiles(self.used_split[exited]),
+            "pnl_pct_at_exit": percentiles(self.pnl_pct[sold], digits=2),
+        }
+
+def percentiles(values, qs=PERCENTILES, digits=1):
+    if len(values) == 0:
+        return {}
+    out = {"mean": round(float(values.mean()), digits)}
+    out.update({f"p{q}": round(float(v), digits) for q, v in zip(qs, np.percentile(values, qs))})
+    return out
+
+def simulate(factors, params=StrategyParams(), paths=10_000, days=250, block=1.0, seed=None, start=None):
+    """
+    :param factors: day_factors 결과 (여러 파일이면 이어 붙인 것)
+    :param paths: 경로 수
+    :param days: 경로당 최대 거래일 수
+    :param block: 평균 블록 길이 (거래일). 1 이면 하루 단위 부트스트랩, 크면 연속한 거래일을 이어서 사용
+                  (정상 블록 부트스트랩: 매일 1/block 확률로 새 시작일을 뽑고, 아니면 다음 거래일)
+    :param start: 모든 경로의 첫 거래일 인덱스 (기본: 경로마다 무작위). block=inf 와 함께 쓰면 과거 그대로 재생
+    """
+    rng = np.random.default_rng(seed)
+    n = len(factors)
+    if n == 0:
+        raise ValueError("거래일 데이터가 없습니다")
+    max_split = params.split_no * 2
+    qty = params.qty
+    reservoir = float(max_split * qty)      # 시작 가격 1 기준 (run_backtest 와 같이 split_no * 2 * 가격 * qty)
+
+    prev = np.ones(paths)                       # 전일 종가
+    pos = np.zeros(paths)
+    avg = np.zeros(paths)
+    used = np.zeros(paths, dtype=np.int64)
+    outcome = np.zeros(paths, dtype=np.int8)
+    end_day = np.full(paths, days, dtype=np.int64)
+    pnl_pct = np.zeros(paths)
+    idx = rng.integers(n, size=paths) if start is None else np.full(paths, start)
+    live = np.ones(paths, dtype=bool)
+
+    for day in range(days):
+        if day:
+            restart = rng.random(paths) < 1.0 / block
+            idx = np.where(restart, rng.integers(n, size=paths), (idx + 1) % n)
+        o, h, l, c, loc, peak = (factors[idx] * prev[:, None]).T
+        has = pos > 0
+
+        # 목표 수익 도달: 전량 매도 (갭 상승이면 시가)
+        tp_price = avg * params.take_profit
+        tp = live & has & (h >= tp_price)
+        pnl_pct[tp] = (np.maximum(o[tp], tp_price[tp]) / avg[tp] - 1) * 100
+        outcome[tp] = TAKE_PROFIT
+        live &= ~tp
+
+        # 예산 소진: 하한 이상이면 전량 매도, 아니면 종료
+        ex = live & (used < max_split) & (peak * qty > reservoir - pos * avg)
+        floor = ex & has & (peak >= avg * params.loss_floor)
+        pnl_pct[floor] = (peak[floor] / avg[floor] - 1) * 100
+        outcome[floor] = FLOOR
+        outcome[ex & ~floor] = EXHAUSTED
+        live &= ~ex
+        end_day[tp | ex] = day + 1
+
+        # 0.5회차 지정가 (평단가, 첫 매수는 시가). 갭 하락이면 시가에 체결
+        half_price = np.where(has, avg, o)
+        half = live & (used < max_split) & (l <= half_price)
+        price = np.minimum(o, half_price)
+        avg = np.where(half, (avg * pos + price * qty) / (pos + qty), avg)
+        pos += half * qty
+        used += half
+
+        # LOC: min(LOC 기준가, 평단가 * loc_cap) 이하로 마감하면 종가에 체결
+        limit = np.where(pos > 0, np.minimum(loc, avg * params.loc_cap), loc)
+        buy = live & (used < max_split) & (c <= limit) & (reservoir - pos * avg >= c * qty)
+        avg = np.where(buy, (avg * pos + c * qty) / (pos + qty), avg)
+        pos += buy * qty
+        used += buy
+
+        prev = c
+        if not live.any():
+            break
+
+    # 기간 안에 끝나지 않은 경로는 마지막 종가 기준 평가 손익
+    still = (outcome == RUNNING) & (pos > 0)
+    pnl_pct[still] = (prev[still] / avg[still] - 1) * 100
+    return MonteCarloResult(symbols=None, params=params, paths=paths, days=days, block=block, n_factors=n,
+                            outcome=outcome, end_day=end_day, used_split=used, pnl_pct=pnl_pct)
+
+def write_paths(path, result):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["path", "outcome", "days", "used_split", "pnl_pct"])
+        for i in range(result.paths):
+            writer.writerow([i, OUTCOMES[result.outcome[i]], result.end_day[i], result.used_split[i],
+                             round(result.pnl_pct[i], 4)])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="무한매수법 예산 소진 몬테카를로 (일봉 / 분봉 CSV 재표본)")
+    parser.add_argument("files", nargs="+", help="yfinance 포맷 CSV 파일 (--store 지정 시 종목@간격). 여러 개면 거래일을 합쳐서 사용")
+    parser.add_argument("--store", type=str, default=None, help="봉 데이터 저장소 디렉터리 (lib.bar_store)")
+    add_param_arguments(parser)
+    parser.add_argument("--paths", type=int, default=20_000, help="경로 수")
+    parser.add_argument("--days", type=int, default=250, help="경로당 최대 거래일 수")
+    parser.add_argument("--block", type=float, default=1.0, help="평균 블록 길이 (거래일, 1 = 하루 단위 부트스트랩)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", type=str, default=None, help="경로별 결과 CSV 저장 경로")
+    args = parser.parse_args(argv)
+    params = params_from_args(args)
+
+    tables, symbols = [], []
+    for path in args.files:
+        bars = load_bars(path, args.store)
+        if len(bars):
+            tables.append(day_factors(bars, params.loc_window_min))
+            symbols.append(bars.symbol)
+    factors = np.concatenate(tables) if tables else np.empty((0, len(DAY_FIELDS)))
+    if len(factors) < 20:
+        print(f"경고: 거래일이 {len(factors)}개뿐입니다. 분포가 거의 같은 경로의 반복이 됩니다")
+
+    start = time.perf_counter()
+    result = simulate(factors, params, paths=args.paths, days=args.days, block=args.block, seed=args.seed)
+    elapsed = time.perf_counter() - start
+    result.symbols = sorted(set(symbols))
+
+    for key, value in result.summary().items():
+        print(f"{key:<20s} {value}")
+    print(f">> {args.paths} paths x {args.days} days in {elapsed:.2f}s = {args.paths / elapsed:,.0f} paths/s")
+    print("params:", asdict(params))
+    if args.out:
+        write_paths(args.out, result)
+
+if __name__ == "__main__":
+    main()
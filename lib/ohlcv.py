@@ -0,0 +1,120 @@
+import csv
+import os
+import numpy as np
+# --------------- OHLCV 데이터 로딩 ---------------
+# yfinance 가 저장하는 CSV 포맷:
+#   1행: Price,Close,High,Low,Open,Volume   (필드 이름)
+#   2행: Ticker,TSLL,TSLL,...               (티커)
+#   3행: Datetime,,,,, 또는 Date,,,,,       (인덱스 이름)
+#   이후: 2025-03-06 14:30:00+00:00,11.24,...
+
+FIELDS = ("open", "high", "low", "close", "volume")
+NS_PER_DAY = 86_400 * 10**9
+
+class Bars:
+    """
+    한 종목의 봉 데이터 (열 단위 NumPy 배열).
+    ts 는 UTC epoch 나노초 int64, 나머지는 float64.
+    """
+    __slots__ = ("symbol", "ts", "open", "high", "low", "close", "volume")
+
+    def __init__(self, symbol, ts, open, high, low, close, volume):
+        self.symbol = symbol
+        self.ts = ts
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    def __len__(self):
+        return len(self.ts)
+
+    def __repr__(self):
+        return f"Bars({self.symbol!r}, n={len(self)})"
+
+    def slice(self, start, stop):
+        return Bars(self.symbol, *(getattr(self, f)[start:stop] for f in ("ts",) + FIELDS))
+
+def parse_timestamps(values):
+    """'2025-03-06 14:30:00+00:00' 또는 '2023-01-02' 형식 문자열 → UTC epoch 나노초 int64"""
+    values = list(values)
+    # UTC(+00:00) / 날짜만 있는 경우는 NumPy 로 파싱 (pandas import 는 수백 ms). 그 외 오프셋은 pandas
+    if all(len(v) == 10 or v.endswith("+00:00") for v in values):
+        return np.array([v[:19] for v in values], dtype="datetime64[ns]").astype(np.int64)
+    import pandas as pd
+    return pd.to_datetime(values, utc=True).as_unit("ns").asi8.astype(np.int64)
+
+def read_yf_header(rows):
+    """
+    yfinance 다중 헤더 행을 읽어 (필드 이름 목록, 티커, 헤더 행 수) 반환.
+    헤더가 한 줄(Datetime,Open,...)인 일반 CSV 도 허용.
+    """
+    names = [name.strip().lower().replace(" ", "_") for name in rows[0][1:]]
+    symbol = None
+    skip = 1
+    if len(rows) > 1 and rows[1] and rows[1][0] == "Ticker":
+        symbol = next((t for t in rows[1][1:] if t), None)
+        skip = 2
+    if len(rows) > skip and rows[skip] and rows[skip][0] in ("Date", "Datetime") and not any(rows[skip][1:]):
+        skip += 1
+    return names, symbol, skip
+
+def load_yf_csv(path, symbol=None):
+    """
+    yfinance 포맷 CSV 를 Bars 로 로딩. 빈 행 / 결측 행은 제외하고 시간순 정렬.
+    :param path: CSV 파일 경로
+    :param symbol: 종목 코드 (생략 시 Ticker 행에서 읽음)
+    """
+    with open(path, newline="") as f:
+        rows = [row for row in csv.reader(f) if row]
+    names, file_symbol, skip = read_yf_header(rows[:3])
+    data = rows[skip:]
+    symbol = symbol or file_symbol or path
+
+    columns = {}
+    for field in FIELDS:
+        if field not in names:
+            raise ValueError(f"{path}: '{field}' 열이 없습니다 ({names})")
+        j = names.index(field) + 1
+        columns[field] = np.array([float(row[j]) if row[j] else np.nan for row in data], dtype=np.float64)
+    ts = parse_timestamps(row[0] for row in data) if data else np.empty(0, dtype=np.int64)
+
+    valid = ~np.isnan(columns["close"])
+    order = np.argsort(ts[valid], kind="stable")
+    return Bars(symbol, ts[valid][order], *(columns[f][valid][order] for f in FIELDS))
+
+def write_yf_csv(path, bars):
+    """
+    Bars 를 yfinance 3행 헤더 포맷(Price / Ticker / Datetime)으로 저장. 열 순서는 항상 Close,High,Low,Open,Volume.
+    load_yf_csv 로 다시 읽을 수 있다 (종목은 Ticker 행에 기록).
+    """
+    order = ("close", "high", "low", "open", "volume")
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Price"] + [name.capitalize() for name in order])
+        writer.writerow(["Ticker"] + [bars.symbol] * len(order))
+        writer.writerow(["Datetime"] + [""] * len(order))
+        stamps = np.datetime_as_string(np.asarray(bars.ts, dtype="datetime64[ns]"), unit="s")
+        columns = [getattr(bars, name).tolist() for name in order]
+        for i, stamp in enumerate(stamps.tolist()):
+            writer.writerow([stamp.replace("T", " ") + "+00:00"] + [column[i] for column in columns])
+    os.replace(tmp, path)
+
+def day_bounds(ts):
+    """UTC 날짜가 바뀌는 지점으로 (시작 인덱스, 끝 인덱스) 배열 반환"""
+    if len(ts) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    day = ts // NS_PER_DAY
+    starts = np.flatnonzero(np.r_[True, day[1:] != day[:-1]])
+    ends = np.r_[starts[1:], len(ts)]
+    return starts, ends
+
+def bar_interval(ts, starts, ends):
+    """같은 날 안의 봉 간격 중앙값 (일봉이면 하루)"""
+    same_day = np.ones(len(ts), dtype=bool)
+    same_day[starts] = False
+    diffs = np.diff(ts)[same_day[1:]]
+    return int(np.median(diffs)) if len(diffs) else NS_PER_DAY
@@ -0,0 +1,228 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from lib.broker_api import cancel_order
+from lib.log import fields
+from lib.metrics import counter, histogram
+# --------------- 주문 관리 (OMS) ---------------
+# 봇이 낸 주문을 주문번호 / 종목 두 가지로 색인해 메모리에 보관한다.
+#   - 주문 응답의 KRX_FWDG_ORD_ORGNO(주문 조직번호)와 주문 수량 / 가격 / 구분을 기억해 두었다가
+#     취소할 때 그대로 보낸다 (DUMMY_ORG / 수량 1 / 가격 100 을 보내던 cancel_order 대체)
+#   - 체결 확인은 주문마다 조회하지 않고 틱마다 주문체결내역 1회 조회(reconcile)로 모든 미체결 주문을 갱신
+#   - 장 마감 시 미체결 주문 취소를 스레드 풀에서 동시에 보내고, timeout 안에 끝나지 않은 것은 로그로 남긴다
+# broker 가 주문체결내역 조회(fetch_orders)를 제공하지 않으면 (mojito.KoreaInvestment 를 OrderInquiry 없이 사용)
+# reconcile / lookup 은 동작하지 않는다: 체결 / 만료를 알 수 없어 주문이 미체결로 남고, 저널에서 복구한 주문은
+# 취소할 수 없다. 생성 시 경고를 남긴다.
+
+log = logging.getLogger(__name__)
+
+ORDER_LIMIT = "00"     # 지정가
+ORDER_LOC = "34"       # 장마감지정가
+
+# 주문 상태
+OPEN = "OPEN"
+CANCELLING = "CANCELLING"      # 취소 요청 중 (중복 취소 방지)
+FILLED = "FILLED"
+CANCELLED = "CANCELLED"
+EXPIRED = "EXPIRED"            # 주문체결내역 기준 미체결 0, 체결 수량 부족 (거래소 만료 / 외부 취소)
+
+ACTIVE = (OPEN, CANCELLING)
+
+NOTHING_TO_CANCEL = "APBK0555"     # 정정취소 가능수량 없음 (이미 체결 / 취소)
+
+class ManagedOrder:
+    __slots__ = ("order_no", "org_no", "symbol", "side", "order_type", "price", "quantity", "filled",
+                 "fill_price", "status", "ts")
+
+    def __init__(self, order_no, org_no, symbol, side, order_type, price, quantity, ts):
+        self.order_no = order_no
+        self.org_no = org_no
+        self.symbol = symbol
+        self.side = side                # "buy" / "sell"
+        self.order_type = order_type
+        self.price = price
+        self.quantity = quantity
+        self.filled = 0
+        self.fill_price = None
+        self.status = OPEN
+        self.ts = ts
+
+    @property
+    def active(self):
+        return self.status in ACTIVE
+
+    @property
+    def remaining(self):
+        return max(self.quantity - self.filled, 0)
+
+    def __repr__(self):
+        return (f"ManagedOrder({self.order_no!r}, {self.symbol!r}, {self.side}, price={self.price}, "
+                f"quantity={self.quantity}, filled={self.filled}, status={self.status})")
+
+class OrderManager:
+    """
+    :param broker: 주문 / 취소 / fetch_orders 를 제공하는 broker
+    :param max_workers: 일괄 취소 동시 요청 수
+    :param clock: 현재 시각 함수 (기본 time.time)
+    """
+    def __init__(self, broker, max_workers=8, clock=time.time):
+        self.broker = broker
+        self.clock = clock
+        self.max_workers = max_workers
+        self.orders = {}        # 주문번호 -> ManagedOrder
+        self.by_symbol = {}     # 종목 -> {주문번호: ManagedOrder}
+        self.inquiry = hasattr(broker, "fetch_orders")
+        if not self.inquiry:
+            log.warning("broker 에 주문체결내역 조회(fetch_orders)가 없습니다: 체결 확인(reconcile) / 복구 주문 조회(lookup) "
+                        "비활성. lib.broker_api.OrderInquiry 로 감싸세요", extra=fields(broker=type(broker).__name__))
+        self._lock = threading.Lock()
+        self._executor = None
+        self._cancelled = counter("orders_cancelled_total", "취소 요청한 주문")
+        self._close_out = histogram("close_out_seconds", "장 마감 일괄 취소 소요 시간")
+
+    def get(self, order_no):
+        return self.orders.get(order_no)
+
+    def open_orders(self, symbol=None):
+        """미체결(취소 요청 중 포함) 주문 목록"""
+        orders = self.orders.values() if symbol is None else self.by_symbol.get(symbol, {}).values()
+        return [order for order in orders if order.active]
+
+    def record(self, response, symbol, side, price, quantity, order_type=ORDER_LIMIT):
+        """주문 응답(성공)을 색인에 추가. :return: ManagedOrder"""
+        output = response.get("output") or {}
+        order = ManagedOrder(output.get("ODNO"), output.get("KRX_FWDG_ORD_ORGNO"), symbol, side, order_type,
+                             price, quantity, self.clock())
+        with self._lock:
+            self.orders[order.order_no] = order
+            self.by_symbol.setdefault(symbol, {})[order.order_no] = order
+        return order
+
+    # ---- 체결 확인 ----
+
+    def _apply(self, order, row):
+        """주문체결내역 한 행으로 주문 갱신. :return: 상태 / 체결 수량이 바뀌었으면 True"""
+        filled = int(float(row.get("ft_ccld_qty") or 0))
+        remaining = int(float(row.get("nccs_qty") or 0))
+        before = (order.status, order.filled)
+        if filled:
+            order.filled = filled
+            order.fill_price = float(row.get("ft_ccld_unpr3") or 0) or order.fill_price
+        if remaining == 0:
+            order.status = FILLED if filled >= order.quantity else (
+                CANCELLED if order.status == CANCELLING else EXPIRED)
+        return (order.status, order.filled) != before
+
+    def reconcile(self):
+        """
+        주문체결내역 1회 조회로 미체결 주문 전체를 갱신 (미체결 주문이 없으면 조회하지 않음).
+        broker 에 fetch_orders 가 없으면 (inquiry False) 아무것도 갱신하지 않는다.
+        :return: 상태 / 체결 수량이 바뀐 주문 목록
+        """
+        if not self.inquiry or not self.open_orders():
+            return []
+        response = self.broker.fetch_orders()
+        if response.get("rt_cd") != "0":
+            log.warning("주문체결내역 조회 실패: %s %s", response.get("msg_cd"), response.get("msg1"))
+            return []
+        changed = []
+        with self._lock:
+            for row in response.get("output") or []:
+                order = self.orders.get(row.get("odno"))
+                if order is not None and order.active and self._apply(order, row):
+                    changed.append(order)
+        return changed
+
+    def lookup(self, order_no):
+        """
+        색인에 없는 주문(재시작 후 저널에서 복구된 주문 등)을 주문체결내역에서 찾아 색인에 추가.
+        :return: ManagedOrder 또는 None
+        """
+        order = self.orders.get(order_no)
+        if order is not None or not self.inquiry:
+            return order
+        response = self.broker.fetch_orders()
+        for row in response.get("output") or []:
+            if row.get("odno") != order_no:
+                continue
+            order = ManagedOrder(order_no, row.get("ord_gno_brno"), row.get("pdno"),
+                                 "buy" if row.get("sll_buy_dvsn_cd") == "02" else "sell",
+                                 row.get("ord_dvsn") or ORDER_LIMIT, float(row.get("ft_ord_unpr3") or 0) or None,
+                                 int(float(row.get("ft_ord_qty") or 0)), self.clock())
+            with self._lock:
+                self._apply(order, row)
+                self.orders[order_no] = order
+                self.by_symbol.setdefault(order.symbol, {})[order_no] = order
+            return order
+        return None
+
+    # ---- 취소 ----
+
+    def cancel(self, order_no):
+        """
+        주문 취소 (주문 시 받은 조직번호 / 잔량 / 주문 구분 / 가격으로).
+        이미 체결 / 취소 / 취소 요청 중인 주문이면 요청하지 않는다.
+        :return: 취소 응답 또는 None
+        """
+        order = self.lookup(order_no)
+        if order is None:
+            log.warning("알 수 없는 주문 취소 요청: %s", order_no)
+            return None
+        with self._lock:
+            if order.status != OPEN:
+                return None
+            order.status = CANCELLING
+        self._cancelled.inc()
+        try:
+            response = cancel_order(self.broker, order.order_no, order.org_no, order.remaining, order.order_type,
+                                    order.price or 0)
+        except Exception:
+            order.status = OPEN
+            raise
+        if response.get("rt_cd") == "0":
+            order.status = CANCELLED
+        else:
+            # 취소 가능수량 없음 = 이미 체결 / 만료. 다음 reconcile 에서 확정
+            order.status = OPEN
+            level = logging.INFO if response.get("msg_cd") == NOTHING_TO_CANCEL else logging.WARNING
+            log.log(level, "주문 취소 실패: %s %s", response.get("msg_cd"), response.get("msg1"),
+                    extra=fields(order_no=order_no))
+        return response
+
+    def cancel_all(self, symbol=None, timeout=3.0):
+        """
+        미체결 주문을 동시에 취소.
+        :param symbol: 종목 (생략 시 전체)
+        :param timeout: 전체 대기 시간 상한 (초). 초과한 요청은 백그라운드에서 계속 진행
+        :return: 취소된 주문 수
+        """
+        orders = [order for order in self.open_orders(symbol) if order.status == OPEN]
+        if not orders:
+            return 0
+        started = time.perf_counter()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="cancel")
+        futures = {self._executor.submit(self.cancel, order.order_no): order for order in orders}
+        done, pending = wait(futures, timeout=timeout)
+        for future in done:
+            if future.exception() is not None:
+                log.warning("주문 취소 에러: %s", future.exception(),
+                            extra=fields(order_no=futures[future].order_no))
+        if pending:
+            log.warning("일괄 취소 시간 초과: %d건 응답 대기", len(pending),
+                        extra=fields(orders=[futures[f].order_no for f in pending]))
+        self._close_out.observe(time.perf_counter() - started)
+        return sum(1 for order in orders if order.status == CANCELLED)
+
+    def prune(self):
+        """끝난 주문(체결 / 취소 / 만료)을 색인에서 제거 (하루 한 번, 장 시작 또는 마감 후)"""
+        with self._lock:
+            for order_no in [no for no, order in self.orders.items() if not order.active]:
+                order = self.orders.pop(order_no)
+                self.by_symbol.get(order.symbol, {}).pop(order_no, None)
+
+    def close(self):
+        """일괄 취소 스레드 풀 종료 (트레이딩 루프 종료 시)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,195 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from lib.broker_api import parse_present_price, Position, BrokerError
+from lib.log import fields
+from lib.balance_cache import BalanceCache
+from lib.clock import get_clock
+from lib.metrics import REGISTRY, TickTimer, counter, order_listener
+from lib.scheduler import SessionScheduler, OPEN, CLOSE, TICK
+from lib.strategy import (StrategyEngine, StrategyParams, BrokerGateway, order_events,
+                          SessionOpen, SessionClose, PriceTick, PositionUpdate)
+# --------------- 포트폴리오 러너 (여러 종목, 한 프로세스) ---------------
+# 종목마다 독립적인 StrategyEngine 을 두고, 매 틱마다
+#   - 시장 시간은 SessionScheduler 타이머 (개장 / 틱 / LOC 구간 / 마감) 로 받음
+#   - 잔고 스냅샷 1개 (BalanceCache, 종목별로 나눠서 전달. 주문/체결 시에만 새로 조회)
+#   - 현재가는 동시 조회 (실시간 시세 feed 가 있으면 조회 없음)
+# 만 수행한다. 틱당 API 호출: 단일 종목 프로세스 N 개는 2N, 포트폴리오는 N + (캐시 만료 시) 1.
+# feed 를 사용하면 현재가 조회도 없어진다.
+
+log = logging.getLogger(__name__)
+
+class PortfolioRunner:
+    """
+    여러 종목의 StrategyEngine 을 하나의 broker / 잔고 스냅샷 / 시장 시간 확인으로 실행.
+    :param broker: 인증된 broker (ThrottledBroker 권장)
+    :param symbols: 종목 코드 목록
+    :param split_no: 분할 매수 횟수 (종목 공통)
+    :param feed: lib.price_feed.PriceFeed (선택). 있으면 현재가 조회를 생략
+    :param params: lib.strategy.StrategyParams (기본: split_no 외 기본값)
+    :param journal: lib.journal.Journal (선택). 종목별 상태 기록 / 복구
+    :param recorder: lib.bar_store.TickRecorder (선택). 현재가 기록
+    :param clock: lib.clock 의 시계 (기본: get_clock())
+    :param calendar: 거래소 세션 테이블 (XNYS, XKRX)
+    """
+    def __init__(self, broker, symbols, split_no=40, feed=None, interval=3.0, balance=None, params=None,
+                 journal=None, recorder=None, clock=None, calendar="XNYS"):
+        self.broker = broker
+        self.clock = clock or get_clock()
+        self.scheduler = SessionScheduler(calendar, clock=self.clock)
+        self.symbols = list(symbols)
+        self.params = params or StrategyParams(split_no=split_no)
+        self.feed = feed
+        self.balance = balance or BalanceCache(broker, clock=self.clock.monotonic)
+        self.interval = interval
+        self._executor = ThreadPoolExecutor(max_workers=max(len(self.symbols), 1), thread_name_prefix="price")
+        # 주문 관리(OrderManager)는 gateway 하나를 모든 종목이 공유: 체결 조회 / 마감 취소를 한 번에 처리
+        self.gateway = BrokerGateway(broker, self.balance)
+        prices = self.fetch_prices(self.symbols)
+        missing = [s for s in self.symbols if s not in prices]
+        if missing:
+            raise BrokerError({"msg1": f"시작 현재가 조회 실패: {missing}"})
+        reservoir = self.params.split_no * 2 * self.params.qty
+        self.engines = {s: StrategyEngine(s, self.gateway, self.params, reservoir=reservoir * prices[s])
+                        for s in self.symbols}
+        for engine in self.engines.values():
+            if journal is not None:
+                journal.attach(engine)
+            if recorder is not None:
+                engine.listeners.append(recorder)
+            engine.listeners.append(order_listener)
+        self._errors = counter("loop_errors_total", "루프에서 잡힌 예외", loop="portfolio")
+
+    @property
+    def done(self):
+        return all(engine.done for engine in self.engines.values())
+
+    def fetch_prices(self, symbols):
+        """
+        현재가 일괄 조회. feed 의 최신가를 우선 사용하고, 없는 종목만 동시에 REST 조회.
+        조회에 실패한 종목은 결과에서 빠진다 (그 종목만 이번 틱을 건너뜀)
+        """
+        prices = {}
+        missing = []
+        for symbol in symbols:
+            price = self.feed.latest(symbol, max_age=10) if self.feed is not None else None
+            if price is None:
+                missing.append(symbol)
+            else:
+                prices[symbol] = price
+        responses = self._executor.map(self.broker.fetch_price, missing)
+        for symbol, response in zip(missing, responses):
+            try:
+                prices[symbol] = parse_present_price(response)
+            except BrokerError as e:
+                log.warning("현재가 조회 실패, 틱 건너뜀: %s", e, extra=fields(symbol=symbol))
+        return prices
+
+    def _each(self, engines, func, what):
+        # 한 종목의 오류가 다른 종목을 멈추지 않도록 종목 단위로 처리
+        for engine in engines:
+            try:
+                func(engine)
+            except Exception as e:
+                self._errors.inc()
+                engine.log.exception("%s 중 에러: %s", what, e)
+
+    def open_day(self, session_open=None):
+        """장 시작: 이 세션(session_open, 기본 지금)에 아직 SessionOpen 을 받지 않은 종목만 연다"""
+        now = self.clock.time()
+        session_open = now if session_open is None else session_open
+        self.gateway.orders.prune()
+        self._each([e for e in self.engines.values() if not e.opened_since(session_open)],
+                   lambda engine: engine.handle(SessionOpen(now)), "장 시작 처리")
+
+    def tick(self, remain_time):
+        """장중 한 틱: 가격 / 잔고를 한 번씩 조회해 모든 종목에 전달"""
+        active = [e for e in self.engines.values() if not e.done]
+        prices = self.fetch_prices([e.symbol for e in active])
+        active = [e for e in active if e.symbol in prices]
+        positions = self.balance.positions()
+        self.gateway.orders.reconcile()     # 모든 종목의 미체결 주문을 주문체결내역 1회 조회로 갱신
+        now = self.clock.time()
+
+        def step(engine):
+            position = self._sync_orders(engine, positions, now)
+            engine.handle(PositionUpdate(now, position.quantity, position.avg_price))
+            engine.handle(PriceTick(now, prices[engine.symbol], remain_time.total_seconds()))
+        self._each(active, step, "틱 처리")
+
+    def _sync_orders(self, engine, positions, now):
+        """마지막 reconcile 결과로 체결 이벤트 전달. :return: 종목의 Position (체결이 있었으면 다시 조회한 잔고)"""
+        position = positions.get(engine.symbol) or Position(engine.symbol)
+        statuses = {no: engine.gateway.order_status(kind, no) for kind, no in engine.pending_orders()}
+        events = order_events(engine, statuses, position, now)
+        for event in events:
+            engine.handle(event)
+        if events:
+            # 체결 전 스냅샷으로 PositionUpdate 를 보내면 매도 체결로 0 이 된 수량이 되살아난다
+            self.balance.invalidate()
+            position = self.balance.position(engine.symbol)
+        return position
+
+    def close_day(self, timeout=3.0):
+        """장 마감: 마지막 체결을 반영하고, 남은 주문을 동시에 취소(timeout 초 안에)한 뒤 SessionClose"""
+        now = self.clock.time()
+        try:
+            self.gateway.orders.reconcile()
+            positions = self.balance.positions()
+            self._each(self.engines.values(), lambda engine: self._sync_orders(engine, positions, now),
+                       "마감 체결 확인")
+            self.gateway.orders.cancel_all(timeout=timeout)
+        except Exception as e:
+            self._errors.inc()
+            log.exception("마감 주문 정리 중 에러: %s", e)
+        self._each(self.engines.values(), lambda engine: engine.handle(SessionClose(now)), "장 종료 처리")
+
+    def run(self):
+        log.info("포트폴리오 루프 시작", extra=fields(symbols=self.symbols, split_no=self.params.split_no,
+                                                   calendar=self.scheduler.calendar))
+        ticks = TickTimer(self.interval, self.clock, loop="portfolio")
+        in_session = False
+        try:
+            while True:
+                try:
+                    timer = self.scheduler.wait()
+                    if timer is None:
+                        break
+                    now = self.clock.time()
+                    if timer.kind == OPEN:
+                        self.open_day(timer.session_open)
+                        in_session = True
+                        self.scheduler.schedule_tick(timer)
+                        continue
+
+                    if timer.kind != CLOSE:
+                        if not in_session:
+                            continue
+                        if timer.kind == TICK:
+                            # 다음 틱을 먼저 예약 (틱 처리 중 예외가 나도 주기가 이어지도록)
+                            self.scheduler.schedule_tick(timer, self.interval)
+                            ticks.start()
+                        self.tick(timedelta(seconds=timer.remain(now)))
+                        if timer.kind == TICK:
+                            ticks.stop()
+                        if not self.done:
+                            continue
+                    ticks.reset()
+                    in_session = False
+
+                    self.close_day()
+                    log.info("세션 메트릭\n%s", REGISTRY.summary())
+                    if self.done:
+                        log.warning("모든 종목 잔고 부족: 사용자 알림 후 종료")
+                        break
+                    log.info("오늘 거래 종료. 다음 개장까지 %.1f분 대기", (self.scheduler.next_in() or 0) / 60)
+                except BrokerError as e:
+                    # 조회 실패 응답 (초당 거래건수 초과 등): 이번 틱만 건너뜀
+                    self._errors.inc()
+                    log.warning("브로커 조회 실패, 틱 건너뜀: %s", e)
+                except Exception as e:
+                    self._errors.inc()
+                    log.exception("에러 발생: %s", e)
+                    self.clock.sleep(5)
+        finally:
+            self.gateway.orders.close()
@@ -0,0 +1,228 @@
+import asyncio
+import json
+import logging
+from lib.clock import get_clock
+# --------------- 실시간 시세 (WebSocket) ---------------
+# 한국투자증권 실시간 WebSocket 으로 해외주식 체결가(HDFSCNT0)를 구독하고,
+# 종목별 최신가 셀을 유지한다. 평단가 * 1.1 / 0.9 / LOC 상한 등 설정된 가격을
+# 넘는 순간 대기 중인 전략을 깨운다.
+# WebSocket 이 끊기면 REST 폴링(기존 3초 fetch_price)으로 동작하면서 재연결을 시도한다.
+# 최신가의 나이 / 대기 시간은 주입된 시계(lib.clock)로 잰다 (가상 시계에서도 루프와 같은 시간).
+#
+# 의존성: websockets (선택). 스트리밍을 사용하지 않으면 설치하지 않아도 된다.
+
+log = logging.getLogger(__name__)
+
+KIS_WS_URL = "ws://ops.koreainvestment.com:21000"
+KIS_WS_URL_MOCK = "ws://ops.koreainvestment.com:31000"
+
+# HDFSCNT0 (해외주식 실시간지연체결가) 레코드의 필드 위치
+HDFSCNT0_FIELDS = 26
+HDFSCNT0_SYMB = 1
+HDFSCNT0_LAST = 11
+
+def issue_approval_key(api_key, api_secret, mock=False):
+    """실시간 접속키 발급 (REST 토큰과 별개)"""
+    import requests
+    base = "https://openapivts.koreainvestment.com:29443" if mock else "https://openapi.koreainvestment.com:9443"
+    response = requests.post(f"{base}/oauth2/Approval", timeout=5,
+                             json={"grant_type": "client_credentials", "appkey": api_key, "secretkey": api_secret})
+    return response.json()["approval_key"]
+
+def subscribe_message(approval_key, tr_id, tr_key, subscribe=True):
+    """실시간 등록(tr_type=1) / 해제(tr_type=2) 요청"""
+    return json.dumps({
+        "header": {"approval_key": approval_key, "custtype": "P",
+                   "tr_type": "1" if subscribe else "2", "content-type": "utf-8"},
+        "body": {"input": {"tr_id": tr_id, "tr_key": tr_key}},
+    })
+
+def parse_trade_frame(text, fields=HDFSCNT0_FIELDS, symb=HDFSCNT0_SYMB, last=HDFSCNT0_LAST):
+    """
+    '0|HDFSCNT0|002|rec1^...^rec2^...' 형식의 실시간 데이터를 [(종목, 가격), ...] 로 변환.
+    암호화(1|...) 또는 제어 메시지(JSON) 는 빈 목록.
+    """
+    parts = text.split("|", 3)
+    if len(parts) != 4 or parts[0] != "0":
+        return []
+    count = int(parts[2])
+    values = parts[3].split("^")
+    width = len(values) // count if count else fields
+    return [(values[i + symb], float(values[i + last])) for i in range(0, width * count, width)]
+
+class PriceCell:
+    """종목별 최신가"""
+    __slots__ = ("price", "updated", "source")
+
+    def __init__(self):
+        self.price = None
+        self.updated = 0.0      # clock.monotonic()
+        self.source = None      # "stream" / "poll"
+
+class PriceFeed:
+    """
+    실시간 시세 구독 + 임계가 감시 + 폴링 대체.
+    :param symbols: 종목 코드 목록 (예: ["TSLL"])
+    :param url: WebSocket 주소 (None 이면 스트리밍 없이 폴링만)
+    :param approval_key: 실시간 접속키 (/oauth2/Approval)
+    :param market_prefix: tr_key 접두어 (DNAS: 나스닥, DNYS: 뉴욕, DAMS: 아멕스)
+    :param poll: async def poll(symbol) -> 가격. 연결이 없을 때 사용
+    :param poll_interval: 폴링 주기 (초)
+    :param clock: lib.clock 의 시계 (기본: get_clock())
+    """
+    def __init__(self, symbols, url=None, approval_key="", tr_id="HDFSCNT0", market_prefix="DNAS",
+                 poll=None, poll_interval=3.0, reconnect_delay=1.0, max_reconnect_delay=30.0, clock=None):
+        self.url = url
+        self.clock = clock or get_clock()
+        self.approval_key = approval_key
+        self.tr_id = tr_id
+        self.market_prefix = market_prefix
+        self.poll = poll
+        self.poll_interval = poll_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.cells = {symbol: PriceCell() for symbol in symbols}
+        self.connected = False
+        self._levels = {symbol: ((), ()) for symbol in symbols}     # (상향 돌파 가격들, 하향 돌파 가격들)
+        self._crossed = {symbol: None for symbol in symbols}
+        self._events = {symbol: asyncio.Event() for symbol in symbols}
+        self._task = None
+
+    # ---- 조회 / 임계가 ----
+
+    def latest(self, symbol, max_age=None):
+        """최신가. max_age(초) 보다 오래됐으면 None"""
+        cell = self.cells[symbol]
+        if cell.price is None or (max_age is not None and self.clock.monotonic() - cell.updated > max_age):
+            return None
+        return cell.price
+
+    def set_thresholds(self, symbol, above=(), below=()):
+        """price >= above 중 하나, 또는 price <= below 중 하나가 되는 순간 wait() 를 깨움"""
+        self._levels[symbol] = (tuple(float(p) for p in above if p), tuple(float(p) for p in below if p))
+
+    async def wait(self, symbol, timeout):
+        """
+        임계가 돌파 또는 timeout 까지 대기.
+        :return: 돌파한 (방향, 가격) 또는 None (timeout)
+        """
+        event = self._events[symbol]
+        if not event.is_set():
+            waiter = asyncio.ensure_future(event.wait())
+            sleeper = asyncio.ensure_future(self.clock.async_sleep(timeout))
+            done, _ = await asyncio.wait((waiter, sleeper), return_when=asyncio.FIRST_COMPLETED)
+            for task in (waiter, sleeper):
+                task.cancel()
+            if sleeper in done:
+                sleeper.result()    # 가상 시계의 SimulationFinished 전달
+            if waiter not in done:
+                return None
+        event.clear()
+        crossed, self._crossed[symbol] = self._crossed[symbol], None
+        return crossed
+
+    def update(self, symbol, price, source="stream"):
+        cell = self.cells.get(symbol)
+        if cell is None:
+            return
+        previous = cell.price
+        cell.price = price
+        cell.updated = self.clock.monotonic()
+        cell.source = source
+        above, below = self._levels[symbol]
+        for level in above:
+            if price >= level and (previous is None or previous < level):
+                self._signal(symbol, ("above", level))
+        for level in below:
+            if price <= level and (previous is None or previous > level):
+                self._signal(symbol, ("below", level))
+
+    def _signal(self, symbol, crossed):
+        log.debug("임계가 돌파: %s %s", symbol, crossed)
+        self._crossed[symbol] = crossed
+        self._events[symbol].set()
+
+    # ---- 실행 ----
+
+    def start(self):
+        self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self):
+        """스트리밍 연결 유지. 실패 시 지수 백오프 동안 폴링으로 대체"""
+        delay = self.reconnect_delay
+        while True:
+            if self.url:
+                try:
+                    await self._stream()
+                    delay = self.reconnect_delay
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    log.warning("실시간 시세 연결 실패, 폴링으로 대체: %s", e)
+                finally:
+                    self.connected = False
+            await self._poll_for(delay if self.url else float("inf"))
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _stream(self):
+        try:
+            import websockets
+        except ImportError:
+            raise RuntimeError("실시간 시세를 사용하려면 websockets 패키지가 필요합니다 (pip install websockets)")
+        async with websockets.connect(self.url, ping_interval=None) as ws:
+            for symbol in self.cells:
+                await ws.send(subscribe_message(self.approval_key, self.tr_id, self.market_prefix + symbol))
+            self.connected = True
+            log.info("실시간 시세 연결: %s", self.url)
+            async for message in ws:
+                if message[:1] in ("0", "1"):
+                    for symbol, price in parse_trade_frame(message):
+                        self.update(symbol, price)
+                    continue
+                header = json.loads(message).get("header", {})
+                if header.get("tr_id") == "PINGPONG":
+                    await ws.send(message)
+
+    async def _poll_for(self, duration):
+        """duration 초 동안 poll_interval 마다 REST 로 가격 갱신"""
+        deadline = self.clock.monotonic() + duration
+        while self.clock.monotonic() < deadline:
+            if self.poll is not None:
+                for symbol in self.cells:
+                    try:
+                        self.update(symbol, await self.poll(symbol), source="poll")
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        log.warning("가격 폴링 실패 (%s): %s", symbol, e)
+            await self.clock.async_sleep(min(self.poll_interval, max(deadline - self.clock.monotonic(), 0)))
+
+async def _print_feed(args):
+    feed = PriceFeed(args.symbols, url=args.url, market_prefix=args.prefix)
+    feed.start()
+    for symbol in args.symbols:
+        feed.set_thresholds(symbol, above=[args.above] if args.above else (), below=[args.below] if args.below else ())
+    while True:
+        for symbol in args.symbols:
+            crossed = await feed.wait(symbol, 1.0)
+            print(symbol, feed.latest(symbol), feed.cells[symbol].source, crossed or "")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="실시간 시세 구독 확인")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--url", type=str, default=KIS_WS_URL_MOCK)
+    parser.add_argument("--prefix", type=str, default="DNAS")
+    parser.add_argument("--above", type=float, default=None)
+    parser.add_argument("--below", type=float, default=None)
+    asyncio.run(_print_feed(parser.parse_args()))
@@ -0,0 +1,91 @@
+import asyncio
+import json
+import logging
+from lib.ohlcv import load_yf_csv
+from lib.price_feed import HDFSCNT0_FIELDS, HDFSCNT0_SYMB, HDFSCNT0_LAST
+# --------------- 가짜 실시간 시세 서버 ---------------
+# yfinance CSV 의 종가를 KIS HDFSCNT0 형식 프레임으로 재생하는 로컬 WebSocket 서버.
+# PriceFeed 를 네트워크 / 장 시간 없이 확인할 때 사용한다.
+#
+#   python -m lib.quote_replay TSLL_1min.csv --port 8765 --interval 0.01
+#   python -m lib.price_feed TSLL --url ws://127.0.0.1:8765 --above 11.5
+
+log = logging.getLogger(__name__)
+
+def trade_frame(symbol, price, tr_id="HDFSCNT0"):
+    values = [""] * HDFSCNT0_FIELDS
+    values[HDFSCNT0_SYMB] = symbol
+    values[HDFSCNT0_LAST] = f"{price:.4f}"
+    return f"0|{tr_id}|001|" + "^".join(values)
+
+class QuoteReplayServer:
+    """
+    구독 요청을 받으면 해당 종목의 봉 종가를 interval 초 간격으로 전송.
+    :param bars_by_symbol: {종목: lib.ohlcv.Bars}
+    :param interval: 프레임 간격 (초)
+    :param drop_after: 지정 시 프레임 n 개를 보낸 뒤 연결을 끊음 (재연결/폴링 대체 확인용)
+    """
+    def __init__(self, bars_by_symbol, interval=0.01, drop_after=None, host="127.0.0.1", port=0):
+        self.bars_by_symbol = bars_by_symbol
+        self.interval = interval
+        self.drop_after = drop_after
+        self.host = host
+        self.port = port
+        self.sent = 0
+        self._server = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self):
+        import websockets
+        self._server = await websockets.serve(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, ws):
+        replays = []
+        try:
+            async for message in ws:
+                request = json.loads(message)
+                if request.get("header", {}).get("tr_id") == "PINGPONG":
+                    continue
+                tr_id = request["body"]["input"]["tr_id"]
+                tr_key = request["body"]["input"]["tr_key"]
+                symbol = next((s for s in self.bars_by_symbol if tr_key.endswith(s)), None)
+                await ws.send(json.dumps({"header": {"tr_id": tr_id, "tr_key": tr_key},
+                                          "body": {"rt_cd": "0" if symbol else "1", "msg1": "SUBSCRIBE SUCCESS"}}))
+                if symbol is not None:
+                    replays.append(asyncio.ensure_future(self._replay(ws, symbol)))
+        finally:
+            for task in replays:
+                task.cancel()
+
+    async def _replay(self, ws, symbol):
+        for price in self.bars_by_symbol[symbol].close.tolist():
+            await ws.send(trade_frame(symbol, price))
+            self.sent += 1
+            if self.drop_after is not None and self.sent >= self.drop_after:
+                await ws.close()
+                return
+            await asyncio.sleep(self.interval)
+
+async def _serve(args):
+    bars = {b.symbol: b for b in (load_yf_csv(path) for path in args.files)}
+    server = await QuoteReplayServer(bars, interval=args.interval, host=args.host, port=args.port).start()
+    print(f">> replaying {', '.join(bars)} on {server.url}")
+    await asyncio.Future()
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="yfinance CSV 재생 WebSocket 서버")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--interval", type=float, default=0.01, help="프레임 간격 (초)")
+    asyncio.run(_serve(parser.parse_args()))
@@ -0,0 +1,194 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from lib.broker_api import BrokerError
+from lib.clock import get_clock
+from lib.metrics import counter
+# --------------- KIS API 호출 제한 (토큰 버킷 스케줄러) ---------------
+# 한국투자증권 API 는 초당 호출 수를 제한한다 (모의투자 서버는 더 엄격).
+# 모든 broker 호출이 하나의 토큰 버킷을 공유하도록 하고,
+#   - 우선순위: 주문 취소 > 시장가 매도 > 매수 주문 > 조회
+#   - 같은 조회가 이미 진행 중이면 결과를 공유 (중복 호출 병합)
+#   - 초당 거래건수 초과 응답(EGW00201)은 rejected 로 집계하고 잠시 후 재시도.
+#     재시도 후에도 초과면 RateLimited (응답을 데이터로 넘기지 않음, 호출한 틱은 건너뜀)
+# 를 처리한다. 동기 루프와 AsyncBroker 의 스레드 풀 양쪽에서 사용할 수 있도록 스레드 안전하게 구현.
+# 대기는 lib.clock 의 시계로 하고, 집계(stats)는 lib.metrics 의 rate_limit_*_total 카운터로도 내보낸다.
+
+log = logging.getLogger(__name__)
+
+# 우선순위 (작을수록 먼저)
+PRIORITY_CANCEL = 0
+PRIORITY_SELL = 1
+PRIORITY_ORDER = 2
+PRIORITY_READ = 3
+
+# 초당 호출 한도 기본값 (실전 / 모의)
+REAL_RATE = 15.0
+MOCK_RATE = 2.0
+
+RATE_LIMIT_MSG_CODES = ("EGW00201",)   # 초당 거래건수를 초과하였습니다
+
+class TokenBucket:
+    """rate 개/초로 채워지고 최대 burst 개까지 쌓이는 토큰 버킷"""
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self.clock = clock
+        self.tokens = self.burst
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self):
+        """토큰을 가져오면 0, 아니면 다음 토큰까지 남은 시간(초)"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+def is_rate_limited(response):
+    return isinstance(response, dict) and response.get("msg_cd") in RATE_LIMIT_MSG_CODES
+
+class RateLimited(BrokerError):
+    """재시도 후에도 초당 거래건수 초과 응답"""
+
+class RequestScheduler:
+    """
+    우선순위 + 토큰 버킷 + 중복 조회 병합.
+    :param rate: 초당 호출 수
+    :param burst: 순간 최대 호출 수
+    :param max_retries: 한도 초과 응답 시 재시도 횟수
+    :param clock: lib.clock 의 시계 (기본: get_clock()). 토큰 충전 / 대기 / 재시도 간격에 사용
+    """
+    def __init__(self, rate=REAL_RATE, burst=None, max_retries=2, clock=None):
+        self.clock = clock or get_clock()
+        self.bucket = TokenBucket(rate, burst, self.clock.monotonic)
+        self.max_retries = max_retries
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._seq = itertools.count()
+        self._inflight = {}
+        self.stats = {"calls": 0, "queued": 0, "throttled": 0, "coalesced": 0, "rejected": 0, "retried": 0}
+        self._counters = {key: counter(f"rate_limit_{key}_total", "API 호출 스케줄러 집계") for key in self.stats}
+
+    def _count(self, key):
+        # self._cond 를 잡은 상태에서 호출
+        self.stats[key] += 1
+        self._counters[key].inc()
+
+    def acquire(self, priority=PRIORITY_READ):
+        """토큰을 얻을 때까지 대기. 대기 중에는 우선순위가 높은 요청이 먼저 나간다."""
+        with self._cond:
+            entry = (priority, next(self._seq))
+            heapq.heappush(self._waiters, entry)
+            if len(self._waiters) > 1:
+                self._count("queued")
+            waited = False
+            while True:
+                waited_before, waited = waited, True
+                if self._waiters[0] != entry:
+                    self._cond.wait()
+                    continue
+                delay = self.bucket.try_take()
+                if delay == 0:
+                    heapq.heappop(self._waiters)
+                    self._cond.notify_all()
+                    if waited_before:
+                        self._count("throttled")
+                    return
+                # 맨 앞 요청만 시계로 다음 토큰까지 잔다 (나머지는 notify 대기)
+                self._cond.release()
+                try:
+                    self.clock.sleep(delay)
+                finally:
+                    self._cond.acquire()
+
+    def submit(self, func, *args, priority=PRIORITY_READ, coalesce=False, **kwargs):
+        """
+        func(*args, **kwargs) 를 호출 한도 안에서 실행.
+        coalesce=True 면 같은 (함수, 인수) 호출이 진행 중일 때 그 결과를 함께 받는다.
+        """
+        if not coalesce:
+            return self._call(func, args, kwargs, priority)
+
+        key = (getattr(func, "__qualname__", func), args, tuple(sorted(kwargs.items())))
+        with self._cond:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self._count("coalesced")
+        if not owner:
+            return future.result()
+        try:
+            result = self._call(func, args, kwargs, priority)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._cond:
+                self._inflight.pop(key, None)
+
+    def _call(self, func, args, kwargs, priority):
+        for attempt in range(self.max_retries + 1):
+            self.acquire(priority)
+            with self._cond:
+                self._count("calls")
+            response = func(*args, **kwargs)
+            if not is_rate_limited(response):
+                return response
+            with self._cond:
+                self._count("rejected")
+                if attempt < self.max_retries:
+                    self._count("retried")
+            log.warning("API 호출 한도 초과 응답: %s", getattr(func, "__name__", func))
+            if attempt < self.max_retries:
+                self.clock.sleep(1.0 / self.bucket.rate)
+        raise RateLimited(response)
+
+    def snapshot(self):
+        with self._cond:
+            stats = dict(self.stats)
+            stats["waiting"] = len(self._waiters)
+        return stats
+
+class ThrottledBroker:
+    """
+    mojito.KoreaInvestment 와 같은 메서드를 제공하되, 모든 호출을 RequestScheduler 로 보낸다.
+    알 수 없는 메서드/속성은 그대로 원래 broker 로 전달 (조회 우선순위로 스케줄).
+    """
+    PRIORITIES = {
+        "cancel_order": PRIORITY_CANCEL,
+        "create_market_sell_order": PRIORITY_SELL,
+        "create_limit_sell_order": PRIORITY_SELL,
+        "create_limit_buy_order": PRIORITY_ORDER,
+        "create_market_buy_order": PRIORITY_ORDER,
+        "create_oversea_order": PRIORITY_ORDER,
+    }
+    COALESCE = ("fetch_price", "fetch_present_balance", "fetch_balance", "fetch_today_1m_ohlcv")
+
+    def __init__(self, broker, scheduler=None):
+        self.broker = broker
+        self.scheduler = scheduler or RequestScheduler()
+
+    def __getattr__(self, name):
+        attr = getattr(self.broker, name)
+        if not callable(attr):
+            return attr
+        priority = self.PRIORITIES.get(name, PRIORITY_READ)
+        coalesce = name in self.COALESCE
+
+        def call(*args, **kwargs):
+            return self.scheduler.submit(attr, *args, priority=priority, coalesce=coalesce, **kwargs)
+        call.__name__ = name
+        return call
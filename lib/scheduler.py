@@ -0,0 +1,133 @@
+import heapq
+import itertools
+import logging
+from datetime import datetime, timezone
+from lib.clock import get_clock
+from lib.log import fields
+from lib.market_time import session_table
+# --------------- 세션 타이머 스케줄러 ---------------
+# 3초마다 is_us_market_open_now 를 확인하는 대신, 거래소 세션 테이블에서 다음 시각들을 계산해
+# 힙(타이머 큐)에 넣고 가장 이른 시각까지 잠든다 (대기 중 CPU 사용 없음).
+#   OPEN        개장
+#   LOC_WINDOW  마감 loc_window_min 분 전 (조기폐장이면 그날의 실제 마감 기준)
+#   CLOSE       마감
+#   TICK        장중 주기 틱 (루프가 schedule_tick() 으로 추가. 이전 틱 예정 시각 + 주기라 처리 시간만큼 밀리지 않음)
+# 한 세션의 타이머가 모두 지나면 다음 세션의 타이머를 추가한다.
+# 이미 지난 타이머(장중에 시작한 경우의 OPEN 등)는 바로 발생하므로, 재시작 직후에도 같은 순서로 처리된다.
+# XNYS / XKRX 등 lib/market_time.session_table 이 읽을 수 있는 거래소를 모두 지원한다.
+
+log = logging.getLogger(__name__)
+
+OPEN = "open"
+LOC_WINDOW = "loc_window"
+CLOSE = "close"
+TICK = "tick"
+
+class Timer:
+    """발생한 타이머. session_open / session_close 는 이 타이머가 속한 세션의 개장 / 마감 (epoch 초)"""
+    __slots__ = ("when", "kind", "session_open", "session_close")
+
+    def __init__(self, when, kind, session_open, session_close):
+        self.when = when
+        self.kind = kind
+        self.session_open = session_open
+        self.session_close = session_close
+
+    def remain(self, now):
+        """마감까지 남은 초"""
+        return self.session_close - now
+
+    def __repr__(self):
+        return (f"Timer({self.kind}, {datetime.fromtimestamp(self.when, timezone.utc):%Y-%m-%d %H:%M:%S}Z, "
+                f"close={datetime.fromtimestamp(self.session_close, timezone.utc):%H:%M:%S}Z)")
+
+class SessionScheduler:
+    """
+    :param calendar: 거래소 (XNYS, XKRX ...)
+    :param clock: lib.clock 의 시계 (기본: get_clock())
+    :param loc_window_min: LOC_WINDOW 타이머 (마감 n분 전)
+    :param max_sleep: 한 번에 자는 최대 시간 (초). 시스템 시각 변경 / 절전 복귀 후에도 다시 계산하도록
+    """
+    def __init__(self, calendar="XNYS", clock=None, loc_window_min=10.0, max_sleep=300.0):
+        self.calendar = calendar
+        self.table = session_table(calendar)
+        self.clock = clock or get_clock()
+        self.loc_window = loc_window_min * 60
+        self.max_sleep = max_sleep
+        self._heap = []                 # (시각, 순번, 종류, 개장, 마감)
+        self._seq = itertools.count()   # 같은 시각이면 넣은 순서대로
+        self._planned = None            # 타이머를 넣은 마지막 세션의 (개장, 마감)
+
+    def _plan(self, now):
+        """now 가 속한 (또는 now 이후 첫) 세션의 개장 / LOC / 마감 타이머 추가"""
+        k = self.table.close_slot(now)
+        if k >= len(self.table.closes):
+            log.warning("세션 테이블 범위를 벗어났습니다 (%s). 'python -m lib.market_time build' 로 갱신하세요",
+                        self.calendar)
+            return
+        session_open, session_close = int(self.table.opens[k]), int(self.table.closes[k])
+        self._planned = (session_open, session_close)
+        self.schedule(session_open, OPEN, session_open, session_close)
+        self.schedule(max(session_close - self.loc_window, session_open), LOC_WINDOW, session_open, session_close)
+        self.schedule(session_close, CLOSE, session_open, session_close)
+        log.debug("세션 타이머 추가", extra=fields(calendar=self.calendar,
+                                                  open=datetime.fromtimestamp(session_open, timezone.utc),
+                                                  close=datetime.fromtimestamp(session_close, timezone.utc)))
+
+    def schedule(self, when, kind, session_open, session_close):
+        """타이머 추가"""
+        heapq.heappush(self._heap, (when, next(self._seq), kind, session_open, session_close))
+
+    def schedule_tick(self, timer, delay=0.0):
+        """
+        timer 와 같은 세션에 delay 초 뒤 TICK 추가 (이미 늦었으면 지금).
+        마감 이후면 추가하지 않는다 (마감은 CLOSE 타이머가 처리). :return: 추가 여부
+        """
+        when = max(timer.when + delay, self.clock.time())
+        if when >= timer.session_close:
+            return False
+        self.schedule(when, TICK, timer.session_open, timer.session_close)
+        return True
+
+    def _refill(self, now):
+        if self._planned is None or now >= self._planned[1]:
+            self._plan(now)
+
+    def next_in(self):
+        """다음 타이머까지 남은 초 (없으면 None)"""
+        now = self.clock.time()
+        self._refill(now)
+        return self._heap[0][0] - now if self._heap else None
+
+    def poll(self):
+        """이미 도래한 타이머 하나 (없으면 None, 대기하지 않음)"""
+        now = self.clock.time()
+        self._refill(now)
+        if self._heap and self._heap[0][0] <= now:
+            return Timer(*self._pop())
+        return None
+
+    def _pop(self):
+        when, _, kind, session_open, session_close = heapq.heappop(self._heap)
+        return when, kind, session_open, session_close
+
+    def wait(self):
+        """다음 타이머 시각까지 잠든 뒤 반환. :return: Timer (세션 테이블이 끝나면 None)"""
+        while True:
+            timer = self.poll()
+            if timer is not None:
+                return timer
+            delay = self.next_in()
+            if delay is None:
+                return None
+            self.clock.sleep(min(delay, self.max_sleep))
+
+    async def async_wait(self):
+        while True:
+            timer = self.poll()
+            if timer is not None:
+                return timer
+            delay = self.next_in()
+            if delay is None:
+                return None
+            await self.clock.async_sleep(min(delay, self.max_sleep))
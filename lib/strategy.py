@@ -0,0 +1,494 @@
+import logging
+import time
+from dataclasses import dataclass
+from lib.log import log_on_change, fields
+from lib.metrics import counter
+from lib.broker_api import condition_order_avg, loc_order, all_sell, half_order_info, loc_order_info, parse_order_no
+from lib.order_manager import OrderManager, FILLED as ORDER_FILLED, ORDER_LIMIT, ORDER_LOC
+# --------------- 이벤트 기반 무한매수 전략 엔진 ---------------
+# main_trading_loop 의 지역 변수 플래그들(half_order_active, half_success, loc_order_active,
+# loc_success, all_sell_order_no, terminate, out_of_amount ...) 을 명시적인 상태와 전이로 바꾼 것.
+#
+#   SessionOpen  → OPEN        (주문 상태 초기화)
+#   PriceTick    → 매도 / 예산 소진 / 0.5회차 주문 / LOC 주문 판단 (마감 window 안이면 LOC_WINDOW)
+#   OrderFilled  → 보유 수량 / 평단가 / 회차 갱신 (매도 체결 시 새 사이클)
+#   OrderRejected→ 해당 주문을 비워 다음 틱에 다시 판단
+#   SessionClose → 미체결 LOC / 매도 주문 취소 후 CLOSED
+#   예산 소진     → EXHAUSTED (종료)
+#
+# 주문은 gateway(buy_limit / buy_loc / sell_market / cancel), 시간은 clock 으로 주입하므로
+# 같은 코드가 실전 / 모의 / 과거 데이터 재생에서 그대로 동작한다.
+
+log = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class StrategyParams:
+    """main_trading_loop 의 하드코딩된 값들"""
+    split_no: int = 40              # 분할 매수 횟수
+    take_profit: float = 1.1        # 전량 매도 (평단가 대비)
+    loss_floor: float = 0.9         # 예산 소진 시 매도 하한 (평단가 대비)
+    loc_cap: float = 1.15           # LOC 주문가 상한 (평단가 대비)
+    loc_window_min: float = 10.0    # LOC 주문 시점 (마감 n분 전)
+    qty: int = 1                    # 회차당 주문 수량
+
+# 세션 단계
+CLOSED = "CLOSED"
+OPEN = "OPEN"
+LOC_WINDOW = "LOC_WINDOW"
+EXHAUSTED = "EXHAUSTED"
+
+# 주문(leg) 상태
+NONE = "NONE"
+PENDING = "PENDING"
+FILLED = "FILLED"
+CANCELLED = "CANCELLED"
+
+# 주문 종류
+HALF = "half"
+LOC = "loc"
+SELL = "sell"
+
+# --------------- 이벤트 ---------------
+
+class Event:
+    __slots__ = ("ts",)
+
+class SessionOpen(Event):
+    __slots__ = ()
+
+    def __init__(self, ts):
+        self.ts = ts
+
+class SessionClose(Event):
+    __slots__ = ()
+
+    def __init__(self, ts):
+        self.ts = ts
+
+class PriceTick(Event):
+    """현재가. remain 은 장 마감까지 남은 초 (모르면 None)"""
+    __slots__ = ("price", "remain")
+
+    def __init__(self, ts, price, remain=None):
+        self.ts = ts
+        self.price = price
+        self.remain = remain
+
+class PositionUpdate(Event):
+    """브로커 잔고 기준 보유 수량 / 평단가 (실전에서 체결 외 변동 반영)"""
+    __slots__ = ("quantity", "avg_price")
+
+    def __init__(self, ts, quantity, avg_price):
+        self.ts = ts
+        self.quantity = quantity
+        self.avg_price = avg_price
+
+class OrderFilled(Event):
+    __slots__ = ("order_no", "price", "quantity")
+
+    def __init__(self, ts, order_no, price, quantity=None):
+        self.ts = ts
+        self.order_no = order_no
+        self.price = price
+        self.quantity = quantity
+
+class OrderRejected(Event):
+    __slots__ = ("order_no", "reason")
+
+    def __init__(self, ts, order_no, reason=""):
+        self.ts = ts
+        self.order_no = order_no
+        self.reason = reason
+
+# --------------- 상태 ---------------
+
+class StrategyState:
+    """전략 상태 (한 종목)"""
+    __slots__ = ("phase", "session_open", "reservoir", "used_split", "quantity", "avg_price",
+                 "half_order_no", "half_status", "half_price",
+                 "loc_order_no", "loc_status", "loc_price",
+                 "sell_order_no", "sell_status")
+
+    def __init__(self, reservoir=0.0):
+        self.phase = CLOSED
+        self.session_open = 0.0     # 마지막 SessionOpen 시각 (같은 세션에 재시작하면 다시 열지 않음)
+        self.reservoir = reservoir
+        self.used_split = 0
+        self.quantity = 0.0
+        self.avg_price = 0.0
+        self.reset_orders()
+
+    def reset_orders(self):
+        self.half_order_no = None
+        self.half_status = NONE
+        self.half_price = 0.0
+        self.loc_order_no = None
+        self.loc_status = NONE
+        self.loc_price = 0.0
+        self.sell_order_no = None
+        self.sell_status = NONE
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls()
+        for name in cls.__slots__:
+            if name in data:
+                setattr(state, name, data[name])
+        return state
+
+    def __repr__(self):
+        return f"StrategyState({self.to_dict()})"
+
+# --------------- 엔진 ---------------
+
+class StrategyEngine:
+    """
+    한 종목의 이벤트 처리기.
+    :param symbol: 종목 코드
+    :param gateway: buy_limit(symbol, price, qty) / buy_loc(symbol, price, qty) / sell_market(symbol, qty) /
+                    cancel(order_no) 를 가진 객체
+    :param params: StrategyParams
+    :param reservoir: 총 예산 (split_no * 2 * 시작 가격 * qty)
+    :param clock: 현재 시각 함수 (기본 time.time)
+    """
+    def __init__(self, symbol, gateway, params=StrategyParams(), reservoir=0.0, clock=time.time, state=None):
+        self.symbol = symbol
+        self.gateway = gateway
+        self.params = params
+        self.clock = clock
+        self.state = state or StrategyState(float(reservoir))
+        self.listeners = []     # callback(engine, event) - 이벤트 처리 후 호출 (저널 등)
+        self.log = logging.getLogger(f"{__name__}.{symbol}")
+        self._handlers = {
+            SessionOpen: self._on_open,
+            SessionClose: self._on_close,
+            PriceTick: self._on_price,
+            PositionUpdate: self._on_position,
+            OrderFilled: self._on_fill,
+            OrderRejected: self._on_reject,
+        }
+
+    @property
+    def done(self):
+        return self.state.phase == EXHAUSTED
+
+    def opened_since(self, ts):
+        """ts (세션 개장 시각) 이후에 SessionOpen 을 받았는지. 아니면 이전 세션의 주문 상태가 남아 있다"""
+        return self.state.session_open >= ts
+
+    def handle(self, event):
+        """이벤트 하나를 처리하고 리스너에 알림"""
+        self._handlers[type(event)](event)
+        for listener in self.listeners:
+            listener(self, event)
+
+    def remain_reservoir(self):
+        """예산 - 보유 금액 - 미체결 매수 주문 금액"""
+        s = self.state
+        pending = 0.0
+        if s.half_status == PENDING:
+            pending += s.half_price * self.params.qty
+        if s.loc_status == PENDING:
+            pending += s.loc_price * self.params.qty
+        return s.reservoir - s.quantity * s.avg_price - pending
+
+    def pending_orders(self):
+        """(종류, 주문번호) 미체결 주문 목록"""
+        s = self.state
+        return [(kind, no) for kind, no, status in ((HALF, s.half_order_no, s.half_status),
+                                                     (LOC, s.loc_order_no, s.loc_status),
+                                                     (SELL, s.sell_order_no, s.sell_status))
+                if status == PENDING]
+
+    # ---- 전이 ----
+
+    def _on_open(self, event):
+        s = self.state
+        if s.phase == EXHAUSTED:
+            return
+        s.reset_orders()
+        s.phase = OPEN
+        s.session_open = event.ts
+
+    def _on_close(self, event):
+        s = self.state
+        if s.loc_status == PENDING:
+            self._cancel(LOC)
+            self.log.info("LOC 주문 취소 (장 종료 전)")
+        if s.sell_status == PENDING:
+            self._cancel(SELL)
+            self.log.info("전량 매도 주문 취소")
+        if s.phase != EXHAUSTED:
+            s.phase = CLOSED
+
+    def _on_position(self, event):
+        s = self.state
+        s.quantity = event.quantity
+        s.avg_price = event.avg_price if event.quantity > 0 else 0.0
+
+    def _on_price(self, event):
+        s = self.state
+        if s.phase not in (OPEN, LOC_WINDOW):
+            return
+        p = self.params
+        price = event.price
+        # 보유하지 않으면 현재가를 첫 매수 기준가로 사용
+        avg = s.avg_price if s.quantity > 0 else price
+        remain_reservoir = self.remain_reservoir()
+        log_on_change(self.log, (self.symbol, "remain_reservoir"), round(remain_reservoir, 2),
+                      "남은 예산: %.2f", remain_reservoir)
+
+        # 매도 조건: 평단가의 take_profit 배 이상이면 전량 매도
+        if s.quantity > 0 and price >= avg * p.take_profit and s.sell_status != PENDING:
+            self._sell()
+            self.log.info("목표 수익 도달: 전량 매도 실행", extra=fields(price=price, avg_price=avg))
+
+        # 원금 소진 조건
+        if s.used_split < p.split_no * 2 and remain_reservoir < price * p.qty:
+            if s.quantity > 0 and price >= avg * p.loss_floor:
+                if s.sell_status != PENDING:
+                    self._sell()
+                    self.log.info("원금 소진 조건 충족: 전량 매도 실행", extra=fields(price=price, avg_price=avg))
+            else:
+                for kind, _ in self.pending_orders():
+                    if kind != SELL:
+                        self._cancel(kind)
+                s.phase = EXHAUSTED
+                self.log.warning("잔고 부족: 추가 매수 불가", extra=fields(remain_reservoir=remain_reservoir))
+                return
+
+        # 0.5 회차 매수 주문 (장 시작 후 한 번, 평단가 지정가)
+        if s.half_status == NONE and s.phase == OPEN:
+            s.half_order_no = self.gateway.buy_limit(self.symbol, avg, p.qty)
+            s.half_status = PENDING
+            s.half_price = avg
+            self.log.info("0.5회차 주문 생성: %s", s.half_order_no, extra=fields(price=avg))
+
+        # LOC 주문 (마감 loc_window 분 전)
+        if event.remain is not None and event.remain <= p.loc_window_min * 60 and s.loc_status == NONE:
+            s.phase = LOC_WINDOW
+            if s.half_status == PENDING:
+                self._cancel(HALF)
+                self.log.info("0.5회차 주문 미체결 -> 취소 처리")
+            order_price = min(price, avg * p.loc_cap)
+            s.loc_order_no = self.gateway.buy_loc(self.symbol, order_price, p.qty)
+            s.loc_status = PENDING
+            s.loc_price = order_price
+            self.log.info("LOC 주문 생성: %s", s.loc_order_no, extra=fields(price=order_price))
+
+    def _on_fill(self, event):
+        s = self.state
+        kind = self._kind_of(event.order_no)
+        if kind is None:
+            return
+        quantity = event.quantity if event.quantity is not None else (s.quantity if kind == SELL else self.params.qty)
+        if kind == SELL:
+            s.sell_status = FILLED
+            s.quantity = max(s.quantity - quantity, 0.0)
+            if s.quantity == 0:
+                # 전량 매도: 새 사이클
+                s.avg_price = 0.0
+                s.used_split = 0
+            self.log.info("전량 매도 체결", extra=fields(price=event.price, quantity=quantity))
+            return
+        s.avg_price = (s.avg_price * s.quantity + event.price * quantity) / (s.quantity + quantity)
+        s.quantity += quantity
+        s.used_split += 1
+        if kind == HALF:
+            s.half_status = FILLED
+            self.log.info("0.5회차 주문 체결됨", extra=fields(used_split=s.used_split))
+        else:
+            s.loc_status = FILLED
+            self.log.info("LOC 주문 체결됨", extra=fields(used_split=s.used_split))
+
+    def _on_reject(self, event):
+        s = self.state
+        kind = self._kind_of(event.order_no)
+        if kind is None:
+            return
+        self.log.warning("주문 거부: %s", event.reason, extra=fields(order_no=event.order_no, kind=kind))
+        # 다음 틱에 다시 판단하도록 비움 (0.5회차는 LOC window 이후 재주문하지 않음)
+        if kind == HALF:
+            s.half_order_no, s.half_status = None, NONE
+        elif kind == LOC:
+            s.loc_order_no, s.loc_status = None, NONE
+        else:
+            s.sell_order_no, s.sell_status = None, NONE
+
+    # ---- 주문 ----
+
+    def _kind_of(self, order_no):
+        s = self.state
+        if order_no is None:
+            return None
+        if order_no == s.half_order_no:
+            return HALF
+        if order_no == s.loc_order_no:
+            return LOC
+        if order_no == s.sell_order_no:
+            return SELL
+        return None
+
+    def _sell(self):
+        s = self.state
+        s.sell_order_no = self.gateway.sell_market(self.symbol, s.quantity)
+        s.sell_status = PENDING
+
+    def _cancel(self, kind):
+        s = self.state
+        order_no = getattr(s, f"{kind}_order_no")
+        self.gateway.cancel(order_no)
+        setattr(s, f"{kind}_status", CANCELLED)
+
+# --------------- gateway ---------------
+
+class BrokerGateway:
+    """
+    lib.broker_api 함수로 실제 broker 에 주문 (실전 / 모의투자 서버 / lib.fake_broker).
+    주문 함수는 주문번호(ODNO)를 반환하고, 실패 응답이면 OrderError 를 올려 다음 틱에 다시 판단하게 한다.
+    낸 주문은 orders(lib.order_manager.OrderManager)에 기록하고, 취소 / 체결 조회도 orders 를 거친다.
+    여러 종목의 엔진이 gateway 하나를 공유하면 체결 조회(orders.reconcile)는 틱당 1회로 충분하다.
+    """
+    def __init__(self, broker, balance=None, orders=None):
+        self.broker = broker
+        self.balance = balance
+        self.orders = orders or OrderManager(broker)
+
+    def _invalidate(self):
+        if self.balance is not None:
+            self.balance.invalidate()
+
+    def _placed(self, side, response, symbol, price, quantity, order_type=ORDER_LIMIT):
+        try:
+            order_no = parse_order_no(response)
+        except Exception:
+            counter("orders_errored_total", "실패한 주문", side=side).inc()
+            raise
+        counter("orders_placed_total", "접수된 주문", side=side).inc()
+        self.orders.record(response, symbol, side, price, quantity, order_type)
+        return order_no
+
+    def buy_limit(self, symbol, price, quantity):
+        response = condition_order_avg(self.broker, symbol, price, quantity)
+        self._invalidate()
+        return self._placed("buy", response, symbol, price, quantity)
+
+    def buy_loc(self, symbol, price, quantity):
+        response = loc_order(self.broker, symbol, price, quantity)
+        self._invalidate()
+        return self._placed("buy", response, symbol, price, quantity, ORDER_LOC)
+
+    def sell_market(self, symbol, quantity):
+        response = all_sell(self.broker, symbol, quantity)
+        self._invalidate()
+        return self._placed("sell", response, symbol, None, quantity)
+
+    def cancel(self, order_no):
+        result = self.orders.cancel(order_no)
+        self._invalidate()
+        return result
+
+    def order_status(self, kind, order_no):
+        """
+        (체결 여부, 체결 가격). 주문체결내역을 조회할 수 있으면 마지막 orders.reconcile() 결과를 읽는다 (API 호출 없음).
+        조회할 수 없으면 주문 정보 함수로, 매도 주문은 잔고로 판단 (order_events 참고)
+        """
+        if self.orders.inquiry:
+            order = self.orders.lookup(order_no)
+            if order is None:
+                return False, None
+            return order.status == ORDER_FILLED, order.fill_price
+        if kind == HALF:
+            info = half_order_info(self.broker, order_no)
+        elif kind == LOC:
+            info = loc_order_info(self.broker, order_no)
+        else:
+            return False, None
+        return bool(info.get("체결여부")), info.get("order_price")
+
+def order_events(engine, statuses, position, ts):
+    """
+    미체결 주문의 조회 결과를 OrderFilled 이벤트로 변환.
+    :param statuses: {주문번호: (체결 여부, 체결 가격)} (BrokerGateway.order_status)
+    :param position: 잔고 기준 Position. 매도 주문이 있고 보유 수량이 0 이면 매도 체결로 본다
+    """
+    events = []
+    for kind, order_no in engine.pending_orders():
+        filled, price = statuses.get(order_no, (False, None))
+        if kind == SELL:
+            if filled or position.quantity == 0:
+                events.append(OrderFilled(ts, order_no, price, engine.state.quantity))
+            continue
+        if filled:
+            events.append(OrderFilled(ts, order_no, price if price is not None else getattr(engine.state, f"{kind}_price")))
+    return events
+
+class PaperGateway:
+    """주문을 기록만 하는 gateway (재생 / 테스트용). 체결은 호출자가 OrderFilled 로 전달"""
+    def __init__(self):
+        self.orders = {}        # order_no -> (side, symbol, price, quantity)
+        self.cancelled = set()
+        self._seq = 0
+
+    def _next(self):
+        self._seq += 1
+        return f"P{self._seq}"
+
+    def buy_limit(self, symbol, price, quantity):
+        order_no = self._next()
+        self.orders[order_no] = ("buy", symbol, price, quantity)
+        return order_no
+
+    buy_loc = buy_limit     # 체결 판정(replay_bars)은 주문 종류(LOC)로 구분
+
+    def sell_market(self, symbol, quantity):
+        order_no = self._next()
+        self.orders[order_no] = ("sell", symbol, None, quantity)
+        return order_no
+
+    def cancel(self, order_no):
+        self.cancelled.add(order_no)
+
+    def order_status(self, kind, order_no):
+        return False, None
+
+def replay_bars(engine, bars):
+    """
+    봉 데이터를 이벤트로 재생 (PaperGateway 와 함께 사용).
+    봉마다 PriceTick(종가) 을 보내고, 미체결 매수 지정가는 저가가 닿으면 / LOC 는 종가로 / 매도는 다음 봉 시가로 체결.
+    :return: 처리한 이벤트 수
+    """
+    from lib.ohlcv import day_bounds, bar_interval     # numpy 는 재생할 때만 import (실전 시작 시간 단축)
+    gateway = engine.gateway
+    ts, o, l, c = bars.ts, bars.open, bars.low, bars.close
+    starts, ends = day_bounds(ts)
+    step = bar_interval(ts, starts, ends)
+    count = 0
+    for s, e in zip(starts.tolist(), ends.tolist()):
+        close_ts = int(ts[e - 1]) + step
+        engine.handle(SessionOpen(int(ts[s])))
+        count += 1
+        for i in range(s, e):
+            # 직전 봉에서 나간 주문 체결 판정
+            for kind, order_no in engine.pending_orders():
+                side, _, price, quantity = gateway.orders[order_no]
+                if kind == SELL:
+                    engine.handle(OrderFilled(int(ts[i]), order_no, float(o[i]), quantity))
+                    count += 1
+                elif kind == HALF and l[i] <= price:
+                    engine.handle(OrderFilled(int(ts[i]), order_no, min(float(o[i]), price), quantity))
+                    count += 1
+            engine.handle(PriceTick(int(ts[i]), float(c[i]), (close_ts - int(ts[i])) / 1e9))
+            count += 1
+            if engine.done:
+                return count
+        state = engine.state
+        if state.loc_status == PENDING and c[e - 1] <= state.loc_price:
+            engine.handle(OrderFilled(close_ts, state.loc_order_no, float(c[e - 1]), engine.params.qty))
+            count += 1
+        engine.handle(SessionClose(close_ts))
+        count += 1
+    return count
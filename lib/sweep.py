@@ -0,0 +1,130 @@
+import argparse
+import csv
+import itertools
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+import numpy as np
+from lib.ohlcv import Bars, FIELDS
+from lib.bar_store import load_bars
+from lib.backtest import StrategyParams, run_backtest
+# --------------- 파라미터 스윕 (그리드 서치) ---------------
+# split_no / take_profit / loss_floor / loc_cap / loc_window 의 모든 조합을
+# 프로세스 풀에서 백테스트한다.
+# 가격 배열은 임시 디렉터리의 .npy 파일로 한 번만 저장하고, 워커는 mmap 으로 읽기 전용 공유한다.
+# (태스크마다 전달되는 것은 입력 번호와 StrategyParams 뿐. 같은 종목의 파일이 여러 개여도 섞이지 않도록
+#  파일 이름 / 색인은 종목이 아니라 입력 번호로 구분한다)
+
+RANK_KEYS = ("return_pct", "final_equity", "max_drawdown_pct", "take_profits")
+
+_worker_dir = None
+_worker_bars = {}
+
+def parse_range(text, cast=float):
+    """'20,30,40' 또는 '20:60:10' (끝 포함) 형식을 값 목록으로 변환"""
+    if ":" in text:
+        start, stop, step = (cast(v) for v in text.split(":"))
+        count = int(round((stop - start) / step)) + 1
+        return [cast(round(start + step * i, 10)) for i in range(count)]
+    return [cast(v) for v in text.split(",")]
+
+def build_grid(splits, take_profits, loss_floors, loc_caps, loc_windows, qty=1):
+    return [StrategyParams(s, tp, lf, cap, win, qty)
+            for s, tp, lf, cap, win in itertools.product(splits, take_profits, loss_floors, loc_caps, loc_windows)]
+
+def export_bars(bars, directory, index):
+    """Bars 를 {index}.ts.npy / {index}.ohlcv.npy 로 저장 (index: 입력 번호)"""
+    np.save(os.path.join(directory, f"{index}.ts.npy"), bars.ts)
+    np.save(os.path.join(directory, f"{index}.ohlcv.npy"), np.vstack([getattr(bars, f) for f in FIELDS]))
+
+def _init_worker(directory):
+    global _worker_dir
+    _worker_dir = directory
+    _worker_bars.clear()
+
+def _mapped_bars(index, symbol):
+    """워커별로 한 번만 mmap 하여 재사용 (복사 없음)"""
+    bars = _worker_bars.get(index)
+    if bars is None:
+        ts = np.load(os.path.join(_worker_dir, f"{index}.ts.npy"), mmap_mode="r")
+        ohlcv = np.load(os.path.join(_worker_dir, f"{index}.ohlcv.npy"), mmap_mode="r")
+        bars = _worker_bars[index] = Bars(symbol, ts, *ohlcv)
+    return bars
+
+def _run_task(task):
+    index, symbol, source, params = task
+    summary = {"source": source}
+    summary.update(run_backtest(_mapped_bars(index, symbol), params).summary())
+    summary.update(asdict(params))
+    return summary
+
+def run_sweep(bars_list, grid, workers=None, chunksize=None, sources=None):
+    """
+    모든 (입력, 파라미터) 조합을 백테스트.
+    :param sources: 입력별 이름 (결과의 source 열, 기본: 종목)
+    :return: (결과 dict 목록, 경과 시간 초)
+    """
+    sources = sources or [bars.symbol for bars in bars_list]
+    tasks = [(i, bars.symbol, sources[i], params) for i, bars in enumerate(bars_list) for params in grid]
+    workers = workers or os.cpu_count() or 1
+    chunksize = chunksize or max(len(tasks) // (workers * 8), 1)
+    with tempfile.TemporaryDirectory(prefix="autosell-sweep-") as directory:
+        for i, bars in enumerate(bars_list):
+            export_bars(bars, directory, i)
+        start = time.perf_counter()
+        if workers == 1:
+            _init_worker(directory)
+            results = [_run_task(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(directory,)) as pool:
+                results = list(pool.map(_run_task, tasks, chunksize=chunksize))
+        elapsed = time.perf_counter() - start
+    return results, elapsed
+
+def rank(results, key="return_pct"):
+    # 낙폭은 작을수록 좋음
+    return sorted(results, key=lambda r: r[key], reverse=(key != "max_drawdown_pct"))
+
+COLUMNS = ("source", "symbol", "split_no", "take_profit", "loss_floor", "loc_cap", "loc_window_min",
+           "return_pct", "max_drawdown_pct", "take_profits", "floor_sells", "max_used_split", "exhausted")
+
+def print_table(results, top):
+    print(" ".join(f"{c:>14s}" for c in COLUMNS))
+    for row in results[:top]:
+        print(" ".join(f"{str(row[c]):>14s}" for c in COLUMNS))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="무한매수법 파라미터 스윕 (병렬 백테스트)")
+    parser.add_argument("files", nargs="+", help="yfinance 포맷 CSV 파일 (--store 지정 시 종목@간격)")
+    parser.add_argument("--store", type=str, default=None, help="봉 데이터 저장소 디렉터리 (lib.bar_store)")
+    parser.add_argument("--splits", type=str, default="40", help="분할 횟수 (예: 20:60:10 또는 20,40)")
+    parser.add_argument("--take-profit", type=str, default="1.1", help="전량 매도 배수 범위")
+    parser.add_argument("--loss-floor", type=str, default="0.9", help="매도 하한 배수 범위")
+    parser.add_argument("--loc-cap", type=str, default="1.15", help="LOC 상한 배수 범위")
+    parser.add_argument("--loc-window", type=str, default="10", help="LOC 주문 시점 (마감 n분 전) 범위")
+    parser.add_argument("--workers", type=int, default=None, help="프로세스 수 (기본: CPU 수)")
+    parser.add_argument("--rank-by", type=str, default="return_pct", choices=RANK_KEYS)
+    parser.add_argument("--top", type=int, default=20, help="출력할 상위 결과 수")
+    parser.add_argument("--out", type=str, default=None, help="전체 결과 CSV 저장 경로")
+    args = parser.parse_args(argv)
+
+    grid = build_grid(parse_range(args.splits, int), parse_range(args.take_profit),
+                      parse_range(args.loss_floor), parse_range(args.loc_cap), parse_range(args.loc_window))
+    inputs = [(path, bars) for path, bars in ((path, load_bars(path, args.store)) for path in args.files) if len(bars)]
+    bars_list = [bars for _, bars in inputs]
+    results, elapsed = run_sweep(bars_list, grid, workers=args.workers, sources=[path for path, _ in inputs])
+    results = rank(results, args.rank_by)
+
+    print_table(results, args.top)
+    print(f">> {len(results)} backtests ({len(bars_list)} inputs x {len(grid)} params) "
+          f"in {elapsed:.2f}s = {len(results) / elapsed:.1f} backtests/s")
+    if args.out and results:
+        with open(args.out, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+import os
+import sys
+# 저장소 루트(lib/)를 import 경로에 추가 (pytest 를 어느 디렉터리에서 실행해도 동작하도록)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
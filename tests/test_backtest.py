@@ -0,0 +1,40 @@
+import numpy as np
+from lib.ohlcv import Bars
+from lib.backtest import run_backtest
+from lib.strategy import StrategyEngine, StrategyParams, PaperGateway, OrderFilled, replay_bars
+
+PARAMS = StrategyParams(split_no=5)
+STEP = 10 * 60 * 10**9      # 10분봉: 마지막 봉(20:50)이 LOC 시점 봉
+
+def session_bars(days):
+    """days: 거래일별 {봉 번호: (시가, 고가, 저가, 종가)}, 나머지 봉은 전 봉 종가로 평평하게"""
+    ts, rows = [], []
+    for k, (day, bars) in enumerate(days):
+        open_ts = np.datetime64(f"{day}T14:30", "ns").astype(np.int64)
+        price = bars.get(0, (10.0,) * 4)[0]
+        for i in range(39):
+            row = bars.get(i, (price,) * 4)
+            ts.append(open_ts + i * STEP)
+            rows.append(row)
+            price = row[3]
+    o, h, l, c = (np.array(col) for col in zip(*rows))
+    return Bars("TEST", np.array(ts, dtype=np.int64), o, h, l, c, np.full(len(ts), 1000.0))
+
+def test_replay_bars_and_run_backtest_agree_on_split_buys():
+    bars = session_bars([
+        ("2025-03-06", {0: (10.0, 10.0, 10.0, 10.0), 38: (9.9, 9.9, 9.9, 9.9)}),
+        ("2025-03-07", {0: (10.0, 10.0, 10.0, 10.0), 3: (10.0, 10.0, 9.9, 10.0), 38: (10.2, 10.2, 10.2, 10.2)}),
+    ])
+    result = run_backtest(bars, PARAMS)
+
+    engine = StrategyEngine("TEST", PaperGateway(), PARAMS, reservoir=result.reservoir)
+    fills = []
+    engine.listeners.append(lambda engine, event: fills.append((event.price, event.quantity))
+                            if isinstance(event, OrderFilled) else None)
+    replay_bars(engine, bars)
+
+    assert list(result.fills["reason"]) == ["half", "loc", "half", "loc"]
+    assert fills == [(float(row["price"]), row["qty"]) for row in result.fills]
+    s = engine.state
+    assert (s.quantity, s.used_split) == (result.position[-1], result.used_split[-1])
+    assert np.isclose(s.avg_price, result.avg_price[-1])
@@ -0,0 +1,53 @@
+import os
+import numpy as np
+from lib.ohlcv import Bars, NS_PER_DAY, write_yf_csv
+from lib.bar_store import BarStore
+
+MINUTE = 60 * 10**9
+DAYS = ("2025-03-06", "2025-03-07", "2025-03-10")
+
+def make_bars(minutes=30):
+    ts = np.concatenate([np.datetime64(f"{day}T14:30", "ns").astype(np.int64) + np.arange(minutes) * MINUTE
+                         for day in DAYS])
+    c = 10.0 + np.arange(len(ts)) / 100
+    return Bars("TEST", ts, c, c + 0.1, c - 0.1, c, np.full(len(ts), 1000.0))
+
+def test_reingest_csv_is_noop(tmp_path):
+    path = str(tmp_path / "TEST_1m.csv")
+    write_yf_csv(path, make_bars())
+    store = BarStore(str(tmp_path / "store"))
+    assert store.ingest_csv(path) == ("TEST@1m", 90)
+    assert store.ingest_csv(path) == ("TEST@1m", 0)
+    # 새로 연 저장소 (마지막 시각 캐시 없음) 에서도 중복은 버린다
+    assert BarStore(store.root).ingest_csv(path) == ("TEST@1m", 0)
+    assert len(store.query("TEST@1m")) == 90
+
+def test_uneven_columns_are_trimmed_on_open(tmp_path):
+    bars = make_bars()
+    store = BarStore(str(tmp_path))
+    store.append("TEST@1m", bars)
+    # close 열을 쓰는 중에 종료된 경우: 봉 하나 반만큼 짧다
+    day_path = os.path.join(store.root, "TEST@1m", DAYS[-1])
+    close = os.path.join(day_path, "close.f8")
+    os.truncate(close, os.path.getsize(close) - 4)
+
+    reopened = BarStore(store.root)
+    last_day = reopened.query("TEST@1m", start=bars.ts[60])
+    assert len(last_day) == 29
+    assert np.array_equal(last_day.close, bars.close[60:89])
+    assert all(os.path.getsize(os.path.join(day_path, name)) == 29 * 8 for name in os.listdir(day_path))
+    # 잘린 봉은 다시 넣을 수 있다
+    assert reopened.append("TEST@1m", bars) == 1
+
+def test_query_spans_multiple_days(tmp_path):
+    bars = make_bars()
+    store = BarStore(str(tmp_path))
+    store.append("TEST@1m", bars)
+    assert store.days("TEST@1m") == [int(t // NS_PER_DAY) for t in bars.ts[::30]]
+
+    # 첫날 끝 ~ 셋째 날 중간 ([10, 75) 번째 봉)
+    window = store.query("TEST@1m", start=int(bars.ts[10]), end=int(bars.ts[75]))
+    assert np.array_equal(window.ts, bars.ts[10:75])
+    assert np.array_equal(window.close, bars.close[10:75])
+    assert window.symbol == "TEST"
+    assert len(store.query("TEST@1m", start=int(bars.ts[-1]) + 1)) == 0
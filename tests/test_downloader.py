@@ -0,0 +1,69 @@
+import numpy as np
+from lib.ohlcv import Bars, write_yf_csv
+from lib.bar_store import BarStore
+from lib.downloader import CsvSource, Downloader, to_ns
+
+MINUTE = 60 * 10**9
+OPEN = to_ns("2025-03-06 14:30")
+
+def write_source(directory, minutes=120):
+    ts = OPEN + np.arange(minutes, dtype=np.int64) * MINUTE
+    c = 10.0 + np.arange(minutes) / 100
+    write_yf_csv(str(directory / "TEST_1m.csv"), Bars("TEST", ts, c, c + 0.1, c - 0.1, c, np.full(minutes, 1000.0)))
+    return ts
+
+def at(minute):
+    """OPEN + minute 분 시각 (Downloader clock, epoch 초)"""
+    return lambda: (OPEN + minute * MINUTE) / 1e9
+
+class FlakySource(CsvSource):
+    """처음 failures 번의 요청은 실패"""
+    def __init__(self, directory, failures=1):
+        super().__init__(str(directory))
+        self.failures = failures
+
+    def fetch(self, symbol, interval, start, end):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("timeout")
+        return super().fetch(symbol, interval, start, end)
+
+def test_incremental_refresh_requests_only_new_bars(tmp_path):
+    ts = write_source(tmp_path)
+    store, source = BarStore(str(tmp_path / "store")), CsvSource(str(tmp_path))
+
+    assert Downloader(store, source, clock=at(60)).update("TEST", "1m", start=OPEN) == ("TEST@1m", 1, 60)
+    series, requests, written = Downloader(store, source, clock=at(90)).update("TEST", "1m", start=OPEN)
+    assert (requests, written) == (1, 30)
+    assert source.requests[-1][2:] == (OPEN + 60 * MINUTE, OPEN + 90 * MINUTE)
+    assert np.array_equal(store.query(series).ts, ts[:90])
+
+    # 받을 구간이 없으면 요청하지 않는다
+    assert Downloader(store, source, clock=at(90)).update("TEST", "1m", start=OPEN) == (series, 0, 0)
+    assert len(source.requests) == 2
+
+def test_failed_range_is_retried_next_run(tmp_path):
+    ts = write_source(tmp_path)
+    store, source = BarStore(str(tmp_path / "store")), FlakySource(tmp_path)
+    downloader = Downloader(store, source, clock=at(60))
+
+    assert downloader.update("TEST", "1m", start=OPEN) == ("TEST@1m", 1, 0)
+    assert downloader.covered("TEST@1m") == []
+    assert downloader.update("TEST", "1m", start=OPEN) == ("TEST@1m", 1, 60)
+    assert np.array_equal(store.query("TEST@1m").ts, ts[:60])
+
+def test_earlier_gap_in_the_same_day_is_stored(tmp_path):
+    ts = write_source(tmp_path)
+    store, source = BarStore(str(tmp_path / "store")), CsvSource(str(tmp_path))
+    downloader = Downloader(store, source, clock=at(120))
+    downloader.update("TEST", "1m", start=OPEN, end=OPEN + 30 * MINUTE)
+    downloader.update("TEST", "1m", start=OPEN + 60 * MINUTE, end=OPEN + 90 * MINUTE)
+
+    # 빈 구간 [30, 60) 분은 날짜의 마지막 저장 시각보다 앞이지만 합쳐서 저장된다
+    series, requests, written = downloader.update("TEST", "1m", start=OPEN, end=OPEN + 90 * MINUTE)
+    assert (requests, written) == (1, 30)
+    assert source.requests[-1][2:] == (OPEN + 30 * MINUTE, OPEN + 60 * MINUTE)
+    assert np.array_equal(store.query(series).ts, ts[:90])
+    reopened = BarStore(store.root).query(series)
+    assert np.array_equal(reopened.close, source._bars("TEST", "1m").close[:90])
+    assert downloader.covered(series) == [[OPEN, OPEN + 90 * MINUTE]]
@@ -0,0 +1,103 @@
+from datetime import timedelta
+import numpy as np
+import pytest
+from lib.balance_cache import BalanceCache
+from lib.broker_api import BrokerError
+from lib.fake_broker import FakeBroker, FillModel, SELL as BROKER_SELL
+from lib.ohlcv import Bars
+from lib.portfolio import PortfolioRunner
+from lib.strategy import StrategyParams
+
+# 2025-03-06 14:30 UTC 부터 1분봉
+T0 = np.datetime64("2025-03-06T14:30", "ns").astype(np.int64)
+MINUTE = 60 * 10**9
+
+def make_bars(closes, symbol="TEST"):
+    c = np.asarray(closes, dtype=np.float64)
+    ts = T0 + np.arange(len(c), dtype=np.int64) * MINUTE
+    return Bars(symbol, ts, c.copy(), c.copy(), c.copy(), c.copy(), np.full(len(c), 1000.0))
+
+class RestingSell(FillModel):
+    """시장가 매도를 접수 즉시가 아니라 다음 봉 시가에 체결 (실전처럼 체결이 늦게 보이는 경우)"""
+    def on_submit(self, order, last):
+        if order.side == BROKER_SELL:
+            return None
+        return super().on_submit(order, last)
+
+    def on_bar(self, order, o, h, l, c, day_close):
+        if order.side == BROKER_SELL:
+            return o
+        return super().on_bar(order, o, h, l, c, day_close)
+
+def test_sell_fill_is_not_overwritten_by_stale_balance():
+    broker = FakeBroker([make_bars([10.0, 10.0, 11.5, 11.5, 11.5, 11.5])], fill_model=RestingSell())
+    # 잔고 캐시는 만료되지 않음: 체결 직전에 읽은 스냅샷이 다음 틱까지 남는다
+    balance = BalanceCache(broker, ttl=1e9, clock=lambda: 0.0)
+    runner = PortfolioRunner(broker, ["TEST"], params=StrategyParams(split_no=5), balance=balance)
+    attempts = []
+    create = broker.create_market_sell_order
+    broker.create_market_sell_order = lambda *args: attempts.append(args) or create(*args)
+    engine = runner.engines["TEST"]
+    remain = timedelta(hours=6)
+
+    runner.open_day()
+    runner.tick(remain)             # 0.5회차 매수 (현재가 이상 지정가 → 즉시 체결)
+    runner.tick(remain)             # 체결 반영
+    assert engine.state.quantity == 1
+    broker.advance(2)               # 11.5: 목표 수익
+    runner.tick(remain)             # 전량 매도 주문 (다음 봉에 체결)
+    assert len(attempts) == 1
+    runner.tick(remain)             # 아직 미체결, 잔고 스냅샷(보유 1주) 캐시
+    broker.advance()                # 매도 체결
+    runner.tick(remain)             # 체결 반영: 캐시된 잔고가 수량을 되살리면 안 된다
+    assert engine.state.quantity == 0
+    assert engine.state.avg_price == 0
+    runner.tick(remain)
+
+    assert engine.state.quantity == 0
+    assert engine.state.used_split == 0
+    assert len(attempts) == 1       # 두 번째 전량 매도(APBK0986 거부)가 없어야 한다
+
+def test_rejected_balance_is_not_cached_as_empty_position():
+    broker = FakeBroker([make_bars([10.0] * 6)])
+    balance = BalanceCache(broker, ttl=1e9, clock=lambda: 0.0)
+    runner = PortfolioRunner(broker, ["TEST"], params=StrategyParams(split_no=5), balance=balance)
+    engine = runner.engines["TEST"]
+    remain = timedelta(hours=6)
+    runner.open_day()
+    runner.tick(remain)             # 0.5회차 매수 즉시 체결
+    runner.tick(remain)
+    assert engine.state.quantity == 1
+
+    balance.invalidate()
+    broker.reject_rate = 1.0        # 모든 조회가 EGW00201
+    with pytest.raises(BrokerError):
+        runner.tick(remain)
+    assert (engine.state.quantity, engine.state.avg_price) == (1, 10.0)
+
+    broker.reject_rate = 0.0        # 실패 응답이 캐시되지 않았으므로 다음 조회는 실제 잔고
+    assert balance.position("TEST").quantity == 1
+    runner.tick(remain)
+    assert (engine.state.quantity, engine.state.used_split) == (1, 1)
+
+def test_rejected_quote_is_not_traded_as_a_price():
+    broker = FakeBroker([make_bars(np.linspace(10.0, 10.5, 60))], reject_rate=0.2, seed=3)
+    runner = None
+    while runner is None:           # 시작 현재가 조회도 거부될 수 있다
+        try:
+            runner = PortfolioRunner(broker, ["TEST"], params=StrategyParams(split_no=5))
+        except BrokerError:
+            pass
+    remain = timedelta(hours=6)
+    runner.open_day()
+    for _ in range(59):
+        try:
+            runner.tick(remain)
+        except BrokerError:
+            pass                    # 잔고 조회 거부: 틱 건너뜀
+        broker.advance()
+
+    assert broker.stats["rejects"] > 0
+    assert runner.engines["TEST"].state.quantity > 0
+    # 목표 수익(평단가 * 1.1)에 닿지 않았으므로 매도 주문이 없어야 한다
+    assert not [o for o in broker.orders.values() if o.side == BROKER_SELL]
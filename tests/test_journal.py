@@ -0,0 +1,65 @@
+import json
+import os
+import time
+from lib.journal import Journal, load_journal, JOURNAL_FILE, SNAPSHOT_FILE
+from lib.strategy import (StrategyEngine, StrategyParams, StrategyState, PaperGateway,
+                          SessionOpen, SessionClose, PriceTick, OrderFilled)
+
+HOUR = 3600.0
+
+def state(used_split, reservoir=100.0):
+    s = StrategyState(reservoir)
+    s.used_split = used_split
+    return s.to_dict()
+
+def write_lines(path, name, lines):
+    with open(os.path.join(path, name), "w") as f:
+        f.write("".join(lines))
+
+def record(seq, used_split, symbol="TEST"):
+    return json.dumps({"seq": seq, "ts": seq, "symbol": symbol, "event": "PriceTick", "data": {},
+                       "state": state(used_split)}) + "\n"
+
+def until(condition, timeout=5.0):
+    """writer 스레드가 기록할 때까지 대기"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timeout"
+        time.sleep(0.005)
+
+def test_load_skips_records_in_snapshot_and_torn_last_line(tmp_path):
+    path = str(tmp_path)
+    write_lines(path, SNAPSHOT_FILE, [json.dumps({"seq": 2, "states": {"TEST": state(2)}})])
+    # 스냅샷 후 truncate 전에 종료된 경우: seq 1, 2 는 스냅샷에 이미 반영됨
+    write_lines(path, JOURNAL_FILE, [record(1, 9), record(2, 9), record(3, 3), record(4, 4)[:40]])
+
+    states, seq = load_journal(path)
+    assert seq == 3
+    assert states["TEST"].used_split == 3
+
+def test_snapshot_truncates_journal_and_resume_restores_state(tmp_path):
+    path = str(tmp_path)
+    journal = Journal(path, commit_interval=0.0, snapshot_every=3)
+    engine = journal.attach(StrategyEngine("TEST", PaperGateway(), StrategyParams(split_no=5), reservoir=100.0))
+    engine.handle(SessionOpen(0))
+    engine.handle(PriceTick(1, 10.0, HOUR))
+    engine.handle(OrderFilled(2, engine.state.half_order_no, 10.0, 1))
+
+    # 레코드 3개가 쌓이면 스냅샷을 쓰고 저널을 비운다
+    until(lambda: journal.stats["snapshots"] == 1)
+    assert journal.stats["records"] == 3
+    assert os.path.getsize(os.path.join(path, JOURNAL_FILE)) == 0
+    engine.handle(SessionClose(3))
+    until(lambda: journal.stats["records"] == 4)
+    with open(os.path.join(path, JOURNAL_FILE)) as f:
+        assert [json.loads(line)["seq"] for line in f] == [4]
+
+    # close 없이 종료된 것처럼 복구: 스냅샷(seq 3) + 저널 꼬리(seq 4)
+    states, seq = load_journal(path)
+    assert seq == 4
+    assert states["TEST"].to_dict() == engine.state.to_dict()
+    journal.close()
+
+    with Journal(path, resume=True) as resumed:
+        assert resumed.seq == 4
+        assert resumed.state("TEST").to_dict() == engine.state.to_dict()
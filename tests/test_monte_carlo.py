@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from lib.ohlcv import Bars
+from lib.backtest import run_backtest
+from lib.monte_carlo import simulate, day_factors, RUNNING, TAKE_PROFIT, FLOOR, EXHAUSTED
+from lib.strategy import StrategyParams
+
+def daily_bars(seed, days=120):
+    rng = np.random.default_rng(seed)
+    c = 10.0 * np.cumprod(1 + rng.normal(0.0, 0.03, days))
+    o = np.r_[10.0, c[:-1]] * (1 + rng.normal(0.0, 0.01, days))
+    h = np.maximum(o, c) * (1 + rng.uniform(0.0, 0.02, days))
+    l = np.minimum(o, c) * (1 - rng.uniform(0.0, 0.02, days))
+    ts = np.datetime64("2025-01-02T14:30", "ns").astype(np.int64) + np.arange(days) * 86_400 * 10**9
+    return Bars("TEST", ts, o, h, l, c, np.full(days, 1000.0))
+
+def first_exit(result):
+    """run_backtest 결과의 첫 사이클 종료: (outcome, 거래일 수, 종료 직전 사용 회차)"""
+    reasons = result.fills["reason"]
+    sells = np.flatnonzero((reasons == "tp") | (reasons == "floor"))
+    if len(sells):
+        k = int(result.fills["bar"][sells[0]])
+        outcome = TAKE_PROFIT if reasons[sells[0]] == "tp" else FLOOR
+    elif result.exhausted_ts is not None:
+        k = int(np.searchsorted(result.ts, result.exhausted_ts))
+        outcome = EXHAUSTED
+    else:
+        return RUNNING, len(result.ts), int(result.used_split[-1])
+    return outcome, k + 1, int(result.used_split[k - 1]) if k else 0
+
+@pytest.mark.parametrize("qty", [1, 3])
+@pytest.mark.parametrize("seed", [0, 1, 6])     # 목표 수익 / 예산 소진 후 하한 매도 / 사흘 만에 목표 수익
+def test_single_path_reproduces_backtest_first_exit(seed, qty):
+    bars = daily_bars(seed)
+    params = StrategyParams(split_no=5, qty=qty)
+    # 몬테카를로의 시작 가격은 첫날 시가
+    result = run_backtest(bars, params, reservoir=params.split_no * 2 * float(bars.open[0]) * qty)
+    expected = first_exit(result)
+    assert expected[0] != RUNNING
+
+    mc = simulate(day_factors(bars), params, paths=1, days=len(bars), block=float("inf"), start=0)
+    assert (int(mc.outcome[0]), int(mc.end_day[0]), int(mc.used_split[0])) == expected
@@ -0,0 +1,68 @@
+import asyncio
+import numpy as np
+import pytest
+from lib.ohlcv import Bars
+from lib.price_feed import PriceFeed
+
+pytest.importorskip("websockets")
+from lib.quote_replay import QuoteReplayServer
+
+def make_bars(closes):
+    c = np.asarray(closes, dtype=np.float64)
+    ts = np.datetime64("2025-03-06T14:30", "ns").astype(np.int64) + np.arange(len(c)) * 60 * 10**9
+    return Bars("TEST", ts, c, c, c, c, np.full(len(c), 1000.0))
+
+class RecordingFeed(PriceFeed):
+    """update 의 가격 출처(stream / poll)를 순서대로 기록"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sources = []
+
+    def update(self, symbol, price, source="stream"):
+        self.sources.append(source)
+        super().update(symbol, price, source)
+
+async def until(condition, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timeout"
+        await asyncio.sleep(0.01)
+
+def test_threshold_crossing_wakes_waiter():
+    async def run():
+        server = await QuoteReplayServer({"TEST": make_bars([10.0, 10.5, 11.0, 12.0, 11.8])}).start()
+        feed = PriceFeed(["TEST"], url=server.url)
+        feed.set_thresholds("TEST", above=[11.5], below=[9.0])
+        feed.start()
+        try:
+            crossed = await feed.wait("TEST", 5.0)
+            assert crossed == ("above", 11.5)
+            assert feed.latest("TEST") == 12.0
+            assert feed.cells["TEST"].source == "stream"
+            # 이미 돌파한 가격 위에서 움직이면 다시 깨우지 않는다
+            assert await feed.wait("TEST", 0.2) is None
+        finally:
+            await feed.stop()
+            await server.stop()
+    asyncio.run(run())
+
+def test_falls_back_to_polling_and_reconnects_after_drop():
+    async def poll(symbol):
+        return 9.0
+
+    async def run():
+        server = await QuoteReplayServer({"TEST": make_bars([10.0] * 50)}, drop_after=3).start()
+        feed = RecordingFeed(["TEST"], url=server.url, poll=poll, poll_interval=0.01, reconnect_delay=0.1)
+        feed.set_thresholds("TEST", below=[9.5])
+        feed.start()
+        try:
+            # 연결이 끊기면 폴링 가격(9.0)으로 하향 돌파를 알린다
+            assert await feed.wait("TEST", 5.0) == ("below", 9.5)
+            assert feed.cells["TEST"].source == "poll"
+            # 백오프가 끝나면 다시 연결해서 스트리밍 가격을 받는다
+            await until(lambda: "stream" in feed.sources[feed.sources.index("poll"):])
+            assert server.sent > 3
+        finally:
+            await feed.stop()
+            await server.stop()
+    asyncio.run(run())
@@ -0,0 +1,48 @@
+import time
+import pytest
+from lib.clock import VirtualClock
+from lib.metrics import REGISTRY
+from lib.rate_limit import RequestScheduler, ThrottledBroker, RateLimited
+
+OK = {"rt_cd": "0", "msg_cd": "MCA00000", "output": {"last": "10.0"}}
+LIMITED = {"rt_cd": "1", "msg_cd": "EGW00201", "msg1": "초당 거래건수를 초과하였습니다."}
+
+class Broker:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def fetch_price(self, symbol):
+        self.calls += 1
+        return self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+
+def test_token_bucket_waits_on_injected_clock():
+    clock = VirtualClock(0.0)
+    scheduler = RequestScheduler(rate=2, burst=1, clock=clock)
+    broker = ThrottledBroker(Broker([OK]), scheduler)
+    started = time.monotonic()
+    for _ in range(3):
+        assert broker.fetch_price("TEST") == OK
+    # 초당 2회: 두 번째 / 세 번째 호출은 가상 시각으로 0.5초씩 기다린다
+    assert clock.time() == pytest.approx(1.0)
+    assert time.monotonic() - started < 0.5
+    assert scheduler.stats["calls"] == 3
+
+def test_retry_then_raise_rate_limited():
+    clock = VirtualClock(0.0)
+    scheduler = RequestScheduler(rate=10, max_retries=2, clock=clock)
+    broker = Broker([LIMITED])
+    rejected = REGISTRY.counter("rate_limit_rejected_total").value
+    with pytest.raises(RateLimited) as e:
+        ThrottledBroker(broker, scheduler).fetch_price("TEST")
+
+    assert e.value.response == LIMITED
+    assert broker.calls == 3
+    assert (scheduler.stats["rejected"], scheduler.stats["retried"]) == (3, 2)
+    assert REGISTRY.counter("rate_limit_rejected_total").value - rejected == 3
+    assert clock.time() >= 0.2      # 재시도 간격도 시계로 대기
+
+def test_retry_recovers():
+    scheduler = RequestScheduler(rate=10, clock=VirtualClock(0.0))
+    assert ThrottledBroker(Broker([LIMITED, OK]), scheduler).fetch_price("TEST") == OK
+    assert scheduler.stats["retried"] == 1
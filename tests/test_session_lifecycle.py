@@ -0,0 +1,144 @@
+import asyncio
+import importlib.util
+import json
+import os
+import time
+import numpy as np
+import pytest
+from lib.balance_cache import BalanceCache
+from lib.clock import VirtualClock, SimulationFinished
+from lib.fake_broker import FakeBroker
+from lib.ohlcv import Bars
+from lib.strategy import StrategyParams
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DAYS = ("2025-03-06", "2025-03-07")     # XNYS 정규장 14:30 ~ 21:00 UTC
+
+@pytest.fixture(scope="module")
+def demo():
+    spec = importlib.util.spec_from_file_location("demo", os.path.join(ROOT, "demo0.0.2.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def session_bars(symbol="TEST", price=10.0):
+    """두 거래일의 30분봉 (가격 고정)"""
+    ts = np.concatenate([np.datetime64(f"{day}T14:30", "ns").astype(np.int64) + np.arange(13) * 1800 * 10**9
+                         for day in DAYS])
+    c = np.full(len(ts), price)
+    return Bars(symbol, ts, c.copy(), c.copy(), c.copy(), c.copy(), np.full(len(ts), 1000.0))
+
+def run_two_sessions(demo, broker):
+    start = broker.now / 1e9 - 60
+    until = np.datetime64(f"{DAYS[-1]}T22:00", "s").astype(np.int64)
+    clock = VirtualClock(start, until=float(until), on_advance=broker.advance_to)
+    with pytest.raises(SimulationFinished):
+        demo.main_trading_loop(broker, "TEST", balance=BalanceCache(broker, clock=clock.monotonic),
+                               params=StrategyParams(split_no=5), clock=clock)
+
+def orders_on(broker, day):
+    return [o for o in broker.orders.values() if str(np.datetime64(o.ts, "ns"))[:10] == day]
+
+def test_failed_close_out_still_closes_session(demo, monkeypatch):
+    broker = FakeBroker([session_bars()])
+    close_out = demo.close_out
+    failures = []
+
+    def flaky(*args, **kwargs):
+        if not failures:
+            failures.append(args)
+            raise ConnectionError("close-out failed")
+        return close_out(*args, **kwargs)
+    monkeypatch.setattr(demo, "close_out", flaky)
+    run_two_sessions(demo, broker)
+
+    assert failures
+    # 첫날 마감 정리가 실패해도 다음 세션에 0.5회차 / LOC 주문을 낸다
+    assert len(orders_on(broker, DAYS[0])) == 2
+    assert len(orders_on(broker, DAYS[1])) == 2
+
+def test_orders_pruned_at_close_and_closed_on_exit(demo, monkeypatch):
+    from lib.order_manager import OrderManager
+    broker = FakeBroker([session_bars()])
+    engines, closed = [], []
+    create_engine = demo.create_engine
+    monkeypatch.setattr(demo, "create_engine", lambda *args: engines.append(create_engine(*args)) or engines[-1])
+    monkeypatch.setattr(OrderManager, "close", lambda self: closed.append(self))
+    run_two_sessions(demo, broker)
+
+    orders = engines[0].gateway.orders
+    # 체결된 주문은 마감 후 색인에서 빠지고, 루프가 끝나면 (시뮬레이션 종료 포함) 닫힌다
+    assert len(broker.orders) == 4 and not orders.orders
+    assert closed == [orders]
+
+def test_resume_on_later_day_reopens_stale_session(demo, tmp_path):
+    from lib.journal import Journal, SNAPSHOT_FILE
+    from lib.strategy import OPEN, PENDING, StrategyState
+    # 며칠 전 장중에 종료된 상태: 단계 OPEN, 미체결 0.5회차 주문이 남아 있음
+    stale = StrategyState(100.0)
+    stale.phase = OPEN
+    stale.session_open = np.datetime64("2025-03-03T14:30", "s").astype(np.int64).item()
+    stale.half_order_no, stale.half_status, stale.half_price = "9999999999", PENDING, 10.0
+    with open(tmp_path / SNAPSHOT_FILE, "w") as f:
+        json.dump({"seq": 1, "states": {"TEST": stale.to_dict()}}, f)
+
+    broker = FakeBroker([session_bars()])
+    journal = Journal(str(tmp_path), resume=True)
+    try:
+        start = broker.now / 1e9 - 60
+        clock = VirtualClock(start, until=np.datetime64(f"{DAYS[0]}T22:00", "s").astype(np.int64).item(),
+                             on_advance=broker.advance_to)
+        with pytest.raises(SimulationFinished):
+            demo.main_trading_loop(broker, "TEST", balance=BalanceCache(broker, clock=clock.monotonic),
+                                   params=StrategyParams(split_no=5), journal=journal, clock=clock)
+    finally:
+        journal.close()
+    assert len(orders_on(broker, DAYS[0])) == 2
+
+def test_two_sessions_fill_half_at_open_and_loc_at_close(demo, tmp_path):
+    from lib.journal import Journal, load_journal
+    from lib.strategy import CLOSED
+    broker = FakeBroker([session_bars()])
+    journal = Journal(str(tmp_path))
+    try:
+        start = broker.now / 1e9 - 60
+        clock = VirtualClock(start, until=np.datetime64(f"{DAYS[-1]}T22:00", "s").astype(np.int64).item(),
+                             on_advance=broker.advance_to)
+        with pytest.raises(SimulationFinished):
+            demo.main_trading_loop(broker, "TEST", balance=BalanceCache(broker, clock=clock.monotonic),
+                                   params=StrategyParams(split_no=5), journal=journal, clock=clock)
+    finally:
+        journal.close()
+
+    for day in DAYS:
+        # 가격 고정: 0.5회차는 개장 직후 지정가로, LOC 는 마감 종가로 체결 (34 = LOC)
+        orders = sorted(orders_on(broker, day), key=lambda o: o.ts)
+        assert [(o.order_type, o.status) for o in orders] == [("00", "완료"), ("34", "완료")]
+    assert broker.positions["TEST"][0] == 4
+    state = load_journal(str(tmp_path))[0]["TEST"]
+    assert (state.phase, state.quantity, state.used_split) == (CLOSED, 4, 4)
+
+class SlowOrders(FakeBroker):
+    """주문 응답이 AsyncBroker 의 호출 타임아웃보다 늦게 오는 broker"""
+    def create_order(self, *args, **kwargs):
+        time.sleep(0.2)
+        return super().create_order(*args, **kwargs)
+
+def test_async_loop_does_not_duplicate_slow_orders(demo):
+    from lib.async_broker import AsyncBroker
+    broker = SlowOrders([session_bars()])
+    start = broker.now / 1e9 - 60
+    until = np.datetime64(f"{DAYS[-1]}T22:00", "s").astype(np.int64).item()
+    clock = VirtualClock(start, until=until, on_advance=broker.advance_to)
+
+    async def run():
+        async with AsyncBroker(broker, timeout=0.1) as abroker:
+            await demo.async_main_trading_loop(abroker, "TEST", balance=BalanceCache(broker, clock=clock.monotonic),
+                                               params=StrategyParams(split_no=5), clock=clock)
+    with pytest.raises(SimulationFinished):
+        asyncio.run(run())
+
+    # 주문마다 0.5회차 / LOC 하나씩: 타임아웃이 난 처리와 다음 틱의 처리가 겹치면 같은 주문이 또 나간다
+    for day in DAYS:
+        assert sorted(o.order_type for o in orders_on(broker, day)) == ["00", "34"]
+    assert broker.positions["TEST"][0] == 4
@@ -0,0 +1,144 @@
+import numpy as np
+from lib.fake_broker import FakeBroker
+from lib.ohlcv import Bars
+from lib.broker_api import Position
+from lib.strategy import (StrategyEngine, StrategyParams, PaperGateway, BrokerGateway, order_events,
+                          SessionOpen, SessionClose, PriceTick, PositionUpdate, OrderFilled, OrderRejected,
+                          CLOSED, OPEN, LOC_WINDOW, EXHAUSTED, NONE, PENDING, FILLED, CANCELLED, LOC)
+
+PARAMS = StrategyParams(split_no=5)     # 예산 = 5 * 2 * 시작 가격 10 = 100
+HOUR = 3600.0
+WINDOW = 300.0                          # LOC 구간 (마감 10분 전) 안
+
+def make_engine(quantity=0.0, avg_price=0.0):
+    engine = StrategyEngine("TEST", PaperGateway(), PARAMS, reservoir=100.0)
+    engine.handle(SessionOpen(0))
+    if quantity:
+        engine.handle(PositionUpdate(0, quantity, avg_price))
+    return engine
+
+def test_open_places_half_then_loc_in_window():
+    engine = make_engine()
+    s, gateway = engine.state, engine.gateway
+    assert s.phase == OPEN
+
+    engine.handle(PriceTick(1, 10.0, HOUR))
+    assert s.half_status == PENDING
+    assert gateway.orders[s.half_order_no] == ("buy", "TEST", 10.0, 1)
+
+    engine.handle(PriceTick(2, 9.5, WINDOW))
+    # LOC 구간: 미체결 0.5회차 취소 후 LOC 주문 (보유 없으면 현재가 기준)
+    assert s.phase == LOC_WINDOW
+    assert s.half_status == CANCELLED
+    assert s.half_order_no in gateway.cancelled
+    assert s.loc_status == PENDING
+    assert s.loc_price == 9.5
+
+def test_fills_update_position_and_split():
+    engine = make_engine()
+    s = engine.state
+    engine.handle(PriceTick(1, 10.0, HOUR))
+    engine.handle(OrderFilled(2, s.half_order_no, 10.0, 1))
+    assert (s.quantity, s.avg_price, s.used_split, s.half_status) == (1, 10.0, 1, FILLED)
+
+    engine.handle(PriceTick(3, 9.0, WINDOW))
+    # LOC 지정가 = min(현재가, 평단가 * loc_cap)
+    assert s.loc_price == 9.0
+    engine.handle(OrderFilled(4, s.loc_order_no, 8.0, 1))
+    assert (s.quantity, s.avg_price, s.used_split, s.loc_status) == (2, 9.0, 2, FILLED)
+
+def test_take_profit_sell_fill_starts_new_cycle():
+    engine = make_engine(quantity=2, avg_price=10.0)
+    s, gateway = engine.state, engine.gateway
+    s.used_split = 2
+
+    engine.handle(PriceTick(1, 11.0, HOUR))
+    assert s.sell_status == PENDING
+    assert gateway.orders[s.sell_order_no] == ("sell", "TEST", None, 2)
+    engine.handle(PriceTick(2, 11.2, HOUR))
+    assert sum(1 for order in gateway.orders.values() if order[0] == "sell") == 1     # 미체결 매도는 다시 내지 않음
+
+    engine.handle(OrderFilled(3, s.sell_order_no, 11.2))
+    assert (s.quantity, s.avg_price, s.used_split, s.sell_status) == (0, 0.0, 0, FILLED)
+
+def test_rejected_order_is_placed_again_next_tick():
+    engine = make_engine()
+    s = engine.state
+    engine.handle(PriceTick(1, 10.0, HOUR))
+    rejected = s.half_order_no
+    engine.handle(OrderRejected(2, rejected, "APBK0952"))
+    assert (s.half_order_no, s.half_status) == (None, NONE)
+
+    engine.handle(PriceTick(3, 10.0, HOUR))
+    assert s.half_status == PENDING
+    assert s.half_order_no != rejected
+
+def test_close_cancels_pending_loc_and_next_open_resets_orders():
+    engine = make_engine()
+    s, gateway = engine.state, engine.gateway
+    engine.handle(PriceTick(1, 10.0, WINDOW))
+    loc = s.loc_order_no
+    placed = len(gateway.orders)
+
+    engine.handle(SessionClose(2))
+    assert s.phase == CLOSED
+    assert s.loc_status == CANCELLED
+    assert loc in gateway.cancelled
+    engine.handle(PriceTick(3, 10.0, HOUR))        # 장 마감 후 틱은 무시
+    assert len(gateway.orders) == placed
+
+    engine.handle(SessionOpen(4))
+    assert engine.opened_since(4) and not engine.opened_since(5)
+    assert (s.phase, s.loc_order_no, s.loc_status) == (OPEN, None, NONE)
+
+def test_exhaustion_below_floor_stops_the_engine():
+    engine = make_engine(quantity=9, avg_price=10.5)     # 남은 예산 5.5 < 현재가
+    s, gateway = engine.state, engine.gateway
+    engine.handle(PriceTick(1, 9.0, HOUR))              # 9.0 < 평단가 * loss_floor (9.45)
+
+    assert engine.done and s.phase == EXHAUSTED
+    assert not gateway.orders
+    engine.handle(SessionClose(2))
+    engine.handle(SessionOpen(3))
+    assert s.phase == EXHAUSTED
+
+def test_order_events_treats_empty_position_as_sell_fill():
+    engine = make_engine(quantity=2, avg_price=10.0)
+    engine.handle(PriceTick(1, 11.0, HOUR))
+    sell = engine.state.sell_order_no
+
+    # 주문 조회로는 아직 미체결이어도 잔고가 0 이면 매도 체결
+    assert order_events(engine, {sell: (False, None)}, Position("TEST", 2, 10.0), 2) == []
+    events = order_events(engine, {sell: (False, None)}, Position("TEST"), 2)
+    assert [(type(e), e.order_no, e.quantity) for e in events] == [(OrderFilled, sell, 2)]
+
+def test_loc_order_fills_only_at_day_close():
+    closes = [10.0, 9.0, 9.5, 9.8]
+    ts = np.datetime64("2025-03-06T20:56", "ns").astype(np.int64) + np.arange(len(closes)) * 60 * 10**9
+    c = np.asarray(closes)
+    broker = FakeBroker([Bars("TEST", ts, c.copy(), c.copy(), c.copy(), c.copy(), np.full(len(c), 1000.0))])
+    gateway = BrokerGateway(broker)
+
+    order_no = gateway.buy_loc("TEST", 9.9, 1)
+    assert gateway.orders.get(order_no).order_type == "34"
+    broker.advance()                # 장중 9.0: 지정가 이하여도 체결하지 않음
+    gateway.orders.reconcile()
+    assert gateway.order_status(LOC, order_no) == (False, None)
+
+    broker.advance(2)               # 마지막 봉 종가 9.8 ≤ 9.9
+    gateway.orders.reconcile()
+    assert gateway.order_status(LOC, order_no) == (True, 9.8)
+
+def test_broker_gateway_passes_quantity_through():
+    c = np.full(3, 10.0)
+    ts = np.datetime64("2025-03-06T15:00", "ns").astype(np.int64) + np.arange(len(c)) * 60 * 10**9
+    broker = FakeBroker([Bars("TEST", ts, c.copy(), c.copy(), c.copy(), c.copy(), np.full(len(c), 1000.0))])
+    gateway = BrokerGateway(broker)
+
+    half = gateway.buy_limit("TEST", 10.0, 3)
+    loc = gateway.buy_loc("TEST", 10.0, 2)
+    assert (broker.orders[half].quantity, broker.orders[loc].quantity) == (3, 2)
+    assert (gateway.orders.get(half).quantity, gateway.orders.get(loc).quantity) == (3, 2)
+
+    broker.advance()                # 지정가 매수 3주 체결
+    assert broker.positions["TEST"][0] == 3